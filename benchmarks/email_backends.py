@@ -0,0 +1,211 @@
+# benchmarks/email_backends.py
+"""
+Send throughput of the email backends against local stand-in servers.
+
+Usage:
+    uv run python benchmarks/email_backends.py [--messages 5000] [--pool-size 4]
+
+"mailjet" sends through MailjetBackend to a minimal keep-alive HTTP server
+answering like the Send API; "smtp" and "smtp (no pipelining)" send through
+SMTPBackend to an aiosmtpd server. Both go through send_batch_emails, so
+rendering and packing are included. The servers run in a separate process
+on localhost, so round trips are near zero: a remote relay adds one RTT per
+request (HTTP) or two per message (pipelined SMTP, four without pipelining).
+Locally the single-process aiosmtpd stand-in, not the backend, sets the SMTP
+ceiling.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Offline run: the backends only need placeholder credentials
+for _key in (
+    "DAREY_USERNAME",
+    "DAREY_PASSWORD",
+    "BUSINESS_ID",
+    "ORIGIN_EMAIL",
+    "ORIGIN_NAME",
+    "MAILJET_API_KEY",
+    "MAILJET_API_SECRET",
+):
+    os.environ.setdefault(_key, "benchmark")
+os.environ.setdefault("DOWNLOAD_URL", "https://example.com/learners")
+os.environ["ORIGIN_EMAIL"] = "team@example.com"
+os.environ["TEST_MODE"] = "False"
+
+import httpx  # noqa: E402
+from aiosmtpd.smtp import SMTP  # noqa: E402
+
+from log import logger  # noqa: E402
+from email_sender.backends import use_email_backend  # noqa: E402
+from email_sender.mailjet_client import MailjetBackend, send_batch_emails  # noqa: E402
+from email_sender.smtp_backend import SMTPBackend  # noqa: E402
+
+
+class CountingHandler:
+    def __init__(self, pipelining: bool, count) -> None:
+        self.pipelining = pipelining
+        self.count = count
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        session.host_name = hostname
+        if self.pipelining:
+            responses.insert(-1, "250-PIPELINING")
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        with self.count.get_lock():
+            self.count.value += 1
+        return "250 OK"
+
+
+class SendApiStandIn:
+    """Keep-alive HTTP/1.1 server answering every POST like the Send API."""
+
+    def __init__(self, count) -> None:
+        self.count = count
+
+    async def handle(self, reader, writer) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                body = json.loads(await reader.readexactly(length))
+                with self.count.get_lock():
+                    self.count.value += len(body["Messages"])
+                reply = b'{"Messages":[]}'
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: %d\r\n\r\n%s" % (len(reply), reply)
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def _serve(kind: str, pipelining: bool, ready, count) -> None:
+    async def serve() -> None:
+        loop = asyncio.get_running_loop()
+        if kind == "http":
+            server = await asyncio.start_server(
+                SendApiStandIn(count).handle, "127.0.0.1", 0
+            )
+        else:
+            handler = CountingHandler(pipelining, count)
+            server = await loop.create_server(
+                lambda: SMTP(handler, hostname="localhost"), "127.0.0.1", 0
+            )
+        ready.put(server.sockets[0].getsockname()[1])
+        await asyncio.Event().wait()
+
+    logger.remove()
+    asyncio.run(serve())
+
+
+@contextmanager
+def stand_in(kind: str, pipelining: bool = True):
+    """(port, delivered message counter) of a server in its own process."""
+    ready = multiprocessing.Queue()
+    count = multiprocessing.Value("i", 0)
+    process = multiprocessing.Process(
+        target=_serve, args=(kind, pipelining, ready, count), daemon=True
+    )
+    process.start()
+    try:
+        yield ready.get(timeout=10), count
+    finally:
+        process.terminate()
+        process.join()
+
+
+class LocalTransport(httpx.AsyncBaseTransport):
+    """Route api.mailjet.com requests to the local stand-in."""
+
+    def __init__(self, port: int) -> None:
+        self.port = port
+        self._inner = httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.url = request.url.copy_with(
+            scheme="http", host="127.0.0.1", port=self.port
+        )
+        return await self._inner.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+def make_learners(n: int) -> list[dict]:
+    names = ["ada", "tunde", "ngozi", "emeka", "amaka", "bola", "chidi", "zainab"]
+    return [
+        {"_id": str(i), "email": f"learner{i}@example.com", "firstName": names[i % 8]}
+        for i in range(n)
+    ]
+
+
+async def timed_send(backend, learners: list[dict], batch_size: int) -> float:
+    started = time.perf_counter()
+    with use_email_backend(backend):
+        for i in range(0, len(learners), batch_size):
+            delivered = await send_batch_emails(learners[i : i + batch_size])
+            assert len(delivered) == len(learners[i : i + batch_size])
+    elapsed = time.perf_counter() - started
+    await backend.aclose()
+    return elapsed
+
+
+async def run(n: int, pool_size: int, batch_size: int) -> None:
+    learners = make_learners(n)
+    rows = []
+
+    with stand_in("http") as (port, delivered):
+        backend = MailjetBackend()
+        backend._client = httpx.AsyncClient(transport=LocalTransport(port))
+        elapsed = await timed_send(backend, learners, batch_size)
+        assert delivered.value == n
+        rows.append(("mailjet", elapsed, f"{-(-n // 50)} requests"))
+
+    for pipelining in (True, False):
+        with stand_in("smtp", pipelining) as (port, delivered):
+            backend = SMTPBackend(
+                host="127.0.0.1",
+                port=port,
+                security="none",
+                username="",
+                pool_size=pool_size,
+            )
+            elapsed = await timed_send(backend, learners, batch_size)
+            assert delivered.value == n
+        label = "smtp" if pipelining else "smtp (no pipelining)"
+        rows.append((label, elapsed, f"{backend.connections_opened} sessions"))
+
+    print(f"{n:,} messages, batches of {batch_size}, SMTP pool {pool_size}")
+    for label, elapsed, detail in rows:
+        print(f"  {label:<21} {elapsed:6.2f} s  {n / elapsed:8,.0f} msg/s  ({detail})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    logger.remove()  # keep per-batch logging out of the timing
+    asyncio.run(run(args.messages, args.pool_size, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/importtime.py
+"""
+Cold-start budget for `import main`, measured with `python -X importtime`.
+
+Usage:
+    uv run python benchmarks/importtime.py [--budget-ms 300] [--module main]
+
+Exits non-zero when the cumulative import time exceeds the budget or when a
+module that should be lazily imported (httpx, tenacity, psutil) is pulled in.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be imported just by importing the entrypoint
+DEFERRED = ("httpx", "tenacity", "psutil")
+
+
+def measure(module: str) -> list[tuple[int, int, str]]:
+    """Return (self_us, cumulative_us, name) rows from `-X importtime`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, default=300.0)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    rows = measure(args.module)
+    total_ms = (
+        next((cum for _, cum, name in reversed(rows) if name.strip() == args.module), 0)
+        / 1000
+    )
+    loaded = {name.strip().split(".")[0] for _, _, name in rows}
+    eager = [name for name in DEFERRED if name in loaded]
+
+    print(f"import {args.module}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"Top {args.top} modules by cumulative time:")
+    for self_us, cum_us, name in sorted(rows, key=lambda r: r[1])[-args.top :][::-1]:
+        print(f"  {cum_us / 1000:8.1f} ms  {self_us / 1000:7.1f} ms self  {name}")
+
+    failed = False
+    if total_ms > args.budget_ms:
+        print(f"FAIL: over budget by {total_ms - args.budget_ms:.1f} ms")
+        failed = True
+    if eager:
+        print(f"FAIL: imported eagerly: {', '.join(eager)}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# benchmarks/timestamps.py
+"""
+Inactivity check over 1M `last_loggedin_date` values: old vs new parsing.
+
+Usage:
+    uv run python benchmarks/timestamps.py [--count 1000000] [--distinct 50000]
+
+"before" is the previous per-learner check: `datetime.fromisoformat` after a
+"Z" replace, compared with a cutoff recomputed from `datetime.now()` on every
+call. "after" uses utils.timestamps: the cutoff is computed once, values are
+compared as epoch integers, the exact API format takes the fast path and
+repeated strings hit the cache. Runs with all-distinct and duplicate-heavy
+inputs.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.timestamps import cutoff_epoch, parse_epoch  # noqa: E402
+
+INACTIVE_DAYS = 14
+
+
+def make_timestamps(count: int, distinct: int) -> list[str]:
+    now = datetime.now(timezone.utc)
+    pool = [
+        (now - timedelta(seconds=random.randint(0, 60 * 86400)))
+        .isoformat(timespec="milliseconds")
+        .replace("+00:00", "Z")
+        for _ in range(distinct)
+    ]
+    return [pool[i % distinct] for i in range(count)]
+
+
+def before(values: list[str]) -> int:
+    inactive = 0
+    for value in values:
+        last_login = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        cutoff = datetime.now(timezone.utc) - timedelta(days=INACTIVE_DAYS)
+        inactive += last_login < cutoff
+    return inactive
+
+
+def after(values: list[str]) -> int:
+    cutoff = cutoff_epoch(INACTIVE_DAYS)
+    parse = parse_epoch
+    inactive = 0
+    for value in values:
+        inactive += parse(value) < cutoff
+    return inactive
+
+
+def timed(fn, values: list[str]) -> tuple[int, float]:
+    started = time.perf_counter()
+    result = fn(values)
+    return result, time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--distinct", type=int, default=50_000)
+    args = parser.parse_args()
+
+    for label, distinct in (
+        ("all distinct", args.count),
+        (f"{args.distinct:,} distinct", args.distinct),
+    ):
+        values = make_timestamps(args.count, distinct)
+        parse_epoch.cache_clear()
+        old_count, old = timed(before, values)
+        new_count, new = timed(after, values)
+        # Boundary values may straddle the two cutoffs taken a few ms apart
+        assert abs(old_count - new_count) <= args.count // 1000
+        print(f"{args.count:,} timestamps, {label}")
+        print(f"  before: {old:6.2f} s  {old / args.count * 1e9:6.0f} ns/value")
+        print(f"  after:  {new:6.2f} s  {new / args.count * 1e9:6.0f} ns/value")
+        print(f"  speedup: {old / new:.2f}x  cache: {parse_epoch.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
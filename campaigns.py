@@ -0,0 +1,151 @@
+# campaigns.py
+import asyncio
+import json
+import os
+import uuid
+from typing import Awaitable, Callable, NamedTuple
+
+from config import (
+    Settings,
+    business_scope,
+    get_settings,
+    scoped_path,
+    settings,
+    settings_scope,
+)
+from log import logger, set_request_id
+from utils.http import HttpClientPool, current_client_pool, use_client_pool
+from utils.rate_limit import FairRateLimiter, use_rate_limiter
+from utils.retry import RetryGuard, create_retry_guard, use_retry_guard
+
+
+# Files each run writes: shared by every tenant unless suffixed per business
+TENANT_FILES = ("run_checkpoint_path", "analytics_report_path")
+
+
+class Tenant(NamedTuple):
+    name: str
+    settings: Settings
+
+
+def _expand(value):
+    """Expand ${VAR} references so credentials can stay in the environment."""
+    return os.path.expandvars(value) if isinstance(value, str) else value
+
+
+def tenant_settings(overrides: dict, base: Settings | None = None) -> Settings:
+    """
+    Validated Settings for one tenant: `base` (the global) plus `overrides`.
+
+    Inherited TENANT_FILES paths are suffixed with the tenant's business id.
+    """
+    base = base or get_settings()
+    values = base.model_dump()
+    values.update({key: _expand(value) for key, value in overrides.items()})
+    tenant = Settings.model_validate(values)
+    with settings_scope(tenant):
+        scope = business_scope()
+    for field in TENANT_FILES:
+        path = getattr(tenant, field)
+        if path and field not in overrides:
+            # Tenants would otherwise overwrite each other's files
+            setattr(tenant, field, scoped_path(path, scope))
+    return tenant
+
+
+def load_campaigns(path: str) -> list[Tenant]:
+    """
+    Read tenants from a JSON list of {"name": ..., <setting overrides>}.
+
+    Any Settings field can be overridden per tenant: business_id and Darey
+    credentials, Mailjet keys and sender, thresholds, segment_rules_path,
+    templates_path, reminder_state_path...
+    """
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    if not isinstance(entries, list):
+        raise ValueError(f"{path} must contain a JSON list of tenants")
+
+    tenants: list[Tenant] = []
+    names: set[str] = set()
+    for index, entry in enumerate(entries):
+        overrides = dict(entry)
+        name = str(overrides.pop("name", "") or f"tenant-{index + 1}")
+        if name in names:
+            raise ValueError(f"Duplicate tenant name {name!r} in {path}")
+        names.add(name)
+        tenants.append(Tenant(name, tenant_settings(overrides)))
+    logger.info(f"Loaded {len(tenants)} campaign tenants from {path}")
+    return tenants
+
+
+async def run_tenant(
+    tenant: Tenant,
+    workflow: Callable[[], Awaitable[dict]],
+    pool: HttpClientPool,
+    limiter: FairRateLimiter,
+    guard: RetryGuard | None = None,
+):
+    """Run `workflow` with the tenant's settings, the shared pool and budgets."""
+    set_request_id(str(uuid.uuid4()))
+    with (
+        settings_scope(tenant.settings),
+        use_client_pool(pool),
+        use_rate_limiter(limiter, tenant.name),
+        use_retry_guard(guard or create_retry_guard()),
+        logger.contextualize(tenant=tenant.name),
+    ):
+        logger.info(f"Starting campaign for tenant {tenant.name}")
+        return await workflow()
+
+
+async def run_campaigns(
+    tenants: list[Tenant],
+    workflow: Callable[[], Awaitable[dict]],
+    concurrency: int | None = None,
+) -> dict[str, dict | BaseException]:
+    """
+    Run every tenant's workflow concurrently in this process.
+
+    Tenants share one HTTP client pool (warm connections to Darey and to
+    each Mailjet account) and one Mailjet rate budget granted round-robin,
+    so a large cohort cannot starve a small one, plus one retry budget and
+    set of circuit breakers (utils.retry); an already active pool
+    (daemon mode) is reused and left open. At most `concurrency`
+    tenants run at once (CAMPAIGN_CONCURRENCY); a failing tenant is logged
+    and does not stop the others. Returns {tenant: snapshot or exception}.
+    """
+    limit = max(1, concurrency or settings.campaign_concurrency)
+    pool = current_client_pool()
+    owns_pool = pool is None
+    if pool is None:
+        pool = HttpClientPool(max_connections=settings.http_max_connections)
+    limiter = FairRateLimiter(
+        settings.mailjet_rate_limit, settings.mailjet_rate_burst or None
+    )
+    # One retry budget and set of circuit breakers: an outage is seen once
+    guard = create_retry_guard()
+    slots = asyncio.Semaphore(limit)
+
+    async def guarded(tenant: Tenant):
+        async with slots:
+            return await run_tenant(tenant, workflow, pool, limiter, guard)
+
+    try:
+        outcomes = await asyncio.gather(
+            *(guarded(tenant) for tenant in tenants), return_exceptions=True
+        )
+    finally:
+        if owns_pool:
+            await pool.aclose()
+
+    results: dict[str, dict | BaseException] = {}
+    for tenant, outcome in zip(tenants, outcomes):
+        results[tenant.name] = outcome
+        if isinstance(outcome, BaseException):
+            logger.error(f"Campaign for tenant {tenant.name} failed: {outcome}")
+    failed = sum(isinstance(outcome, BaseException) for outcome in outcomes)
+    logger.bind(messages_granted=dict(limiter.granted)).info(
+        f"Campaigns completed: {len(tenants) - failed} succeeded, {failed} failed"
+    )
+    return results
@@ -0,0 +1,121 @@
+# charts.py
+"""
+Render the weekly engagement charts from a run report.
+
+Usage:
+    uv run python charts.py [reports/latest.json] [--out assets]
+
+Reads the JSON report written by a run with ANALYTICS_REPORT_PATH set (see
+data_processing/analytics.py) and writes learners_bar.png and
+learners_donut.png, so the charts no longer need the full learner dump.
+Needs matplotlib (dev dependency group).
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Highlight the learners who get reminders (same palette as analysis.ipynb)
+COLORS = {
+    "inactive": "#E74C3C",
+    "low_progress": "#F39C12",
+    "completed": "#27AE60",
+    "active": "#95A5A6",
+}
+
+DEFINITIONS = (
+    "Category Definitions\n"
+    "Completed = 100% progress\n"
+    "Active = login ≤{days:g} days & progress ≥{score:g}\n"
+    "Low Progress = login ≤{days:g} days & progress <{score:g}\n"
+    "Inactive = no login in last {days:g} days"
+)
+
+
+def load_report(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def category_counts(report: dict) -> tuple[list[str], list[int]]:
+    """Categories with at least one learner, in chart order."""
+    counts = report["categories"]
+    labels = [label for label in COLORS if counts.get(label)]
+    return labels, [counts[label] for label in labels]
+
+
+def render_charts(report: dict, out_dir: str) -> list[str]:
+    """Write the bar and donut charts for `report`; returns their paths."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    os.makedirs(out_dir, exist_ok=True)
+    labels, counts = category_counts(report)
+    colors = [COLORS[label] for label in labels]
+    total = sum(counts)
+    definitions = DEFINITIONS.format(
+        days=report["inactive_days"], score=report["low_score_threshold"]
+    )
+    box = {"boxstyle": "square", "facecolor": "white", "edgecolor": "black"}
+
+    fig, ax = plt.subplots(figsize=(8, 6))
+    bars = ax.bar(labels, counts, color=colors)
+    ax.bar_label(bars, labels=[f"{count:,}" for count in counts], padding=3)
+    ax.set_title("Learners Engagement Counts", fontsize=16, weight="bold")
+    ax.set_xlabel("Category")
+    ax.set_ylabel("Number of Learners")
+    ax.text(
+        0.98,
+        0.97,
+        definitions,
+        transform=ax.transAxes,
+        fontsize=9,
+        ha="right",
+        va="top",
+        bbox=box,
+    )
+    fig.tight_layout()
+    bar_path = os.path.join(out_dir, "learners_bar.png")
+    fig.savefig(bar_path, dpi=200)
+    plt.close(fig)
+
+    fig, ax = plt.subplots(figsize=(8, 7))
+    ax.pie(
+        counts,
+        labels=labels,
+        colors=colors,
+        autopct="%1.1f%%",
+        startangle=140,
+        pctdistance=0.78,
+        wedgeprops={"width": 0.45, "edgecolor": "white", "linewidth": 1.5},
+    )
+    ax.text(0, 0, f"Total Learners\n{total:,}", ha="center", va="center", fontsize=13)
+    ax.set_title("Learners Weekly Engagement Breakdown", fontsize=16, weight="bold")
+    fig.text(0.02, 0.02, definitions, fontsize=9, va="bottom", bbox=box)
+    fig.tight_layout()
+    donut_path = os.path.join(out_dir, "learners_donut.png")
+    fig.savefig(donut_path, dpi=200)
+    plt.close(fig)
+    return [bar_path, donut_path]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("report", nargs="?", default="reports/latest.json")
+    parser.add_argument("--out", default="assets")
+    args = parser.parse_args()
+
+    report = load_report(args.report)
+    if not report["total"]:
+        print(f"{args.report} counts no learners; nothing to render")
+        return 1
+    for path in render_charts(report, args.out):
+        print(f"Wrote {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,10 @@
 # config.py
+import contextvars
+import hashlib
+import os
+from contextlib import contextmanager
+from typing import Iterator
+
 from pydantic import AnyHttpUrl, SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -26,21 +32,181 @@ class Settings(BaseSettings):
     # Download options
     download_url: AnyHttpUrl
     download_limit: int = 50000
+    download_timeout: float = 60.0  # seconds per read / write of a page request
+    download_connect_timeout: float = 10.0
     batch_size: int = 500
 
+    # Learner source: "http" (Darey API), "ndjson", "parquet" or "sqlite"
+    learner_source: str = "http"
+    learner_source_path: str | None = None  # snapshot / store file for non-http
+
+    # Reuse tokens / downloaded learners across runs in one process (daemon)
+    token_cache_ttl: int = 3000  # seconds; 0 disables
+    learner_cache_path: str | None = None  # SQLite mirror of the Darey API
+    learner_cache_max_age: int = 21600  # seconds before the mirror is refreshed
+    page_cache_dir: str | None = None  # conditional-request cache of API pages
+
+    # Sharded download: >1 splits the page range across concurrent workers
+    download_workers: int = 1
+    max_download_concurrency: int = 8  # server-friendly cap on workers
+
+    # Hedged page requests: duplicate a page GET still running past the
+    # observed latency quantile; at most HEDGE_MAX_EXTRA extra load (0 = off)
+    hedge_quantile: float = 0.95
+    hedge_max_extra: float = 0.1
+    hedge_min_samples: int = 20  # latencies seen before hedging starts
+
+    # Adaptive (AIMD) page / send batch sizing
+    adaptive_min_size: int = 50
+    adaptive_max_size: int = 5000
+    memory_fraction: float = 0.05  # share of the cgroup/host limit one run may buffer
+
     # Learner filtering
     inactive_days: int = 14
     low_score_threshold: int = 50
+    segment_rules_path: str | None = None  # JSON rules file; defaults built in
+
+    # Send order: up to this many learners are held in a priority queue so
+    # the most urgent (long inactive, far along) are mailed first; 0 = page order
+    send_queue_size: int = 10_000
+    urgency_cap_days: int = 60  # inactivity beyond this adds no more urgency
+
+    # Duplicate learners (same _id or normalized email) within a run
+    dedup_enabled: bool = True
+    # Then fall back to a Bloom filter; 0 = a quarter of the memory budget
+    dedup_max_exact_keys: int = 0
+    dedup_bloom_capacity: int = 10_000_000
+    dedup_error_rate: float = 0.001
+
+    # Pre-send address validation (syntax, typo and disposable domains)
+    email_validation: bool = True
+    email_domain_list_path: str | None = None  # JSON {"typos": {}, "disposable": []}
+
+    # Cross-run reminder throttling (disabled when the state path is unset)
+    reminder_state_path: str | None = None  # SQLite file, e.g. state/reminders.db
+    reminder_cooldown_days: int = 21
+    reminder_backoff_factor: float = 2.0
+    reminder_max_count: int = 0  # 0 = no cap
+
+    # Multi-tenant campaigns (JSON list of per-tenant setting overrides)
+    campaigns_path: str | None = None
+    campaign_concurrency: int = 4  # tenants running at once
+    http_max_connections: int = 20  # shared pool size across tenants
+    mailjet_rate_limit: float = 0  # messages/second over all tenants; 0 = unlimited
+    mailjet_rate_burst: int = 0  # defaults to one second's worth (min 1)
+    templates_path: str | None = None  # JSON {name: {subject, body, html}} overrides
+    mailjet_max_messages: int = 50  # per Send API v3.1 request
+    mailjet_max_request_bytes: int = 15 * 1024 * 1024  # JSON body per request
+    render_cache_bytes: int = 8 * 1024 * 1024  # rendered bodies kept (LRU); 0 = off
+
+    # Delivery backend: "mailjet" (Send API v3.1) or "smtp" (relay / own MTA)
+    email_backend: str = "mailjet"
+    smtp_host: str = "in-v3.mailjet.com"
+    smtp_port: int = 587
+    smtp_username: SecretStr | None = None  # defaults to the Mailjet key on its relay
+    smtp_password: SecretStr | None = None
+    smtp_security: str = "starttls"  # "starttls", "tls" (implicit) or "none"
+    smtp_pool_size: int = 4  # persistent sessions per backend
+    smtp_max_messages: int = 10  # per group: one session, sent in sequence
+    # Several providers / accounts: JSON list of {"name", "weight", <overrides>}
+    email_providers_path: str | None = None
+    router_max_error_rate: float = 0.5  # moving average that ejects a provider
+    router_max_latency: float = 10.0  # seconds (moving average) that eject one
+    router_cooldown: float = 60.0  # seconds before an ejected provider is probed
+
+    # Daemon mode (python daemon.py): cron schedule (UTC) + local control API
+    daemon_schedule: str = "0 4 * * *"
+    daemon_host: str = "127.0.0.1"
+    daemon_port: int = 8787
+
+    # Run budgets (0 = unlimited); a run stops gracefully when one runs out
+    run_max_seconds: float = 0  # wall clock
+    run_max_emails: int = 0  # e.g. the Mailjet daily cap
+    run_max_api_calls: int = 0  # Darey + Mailjet requests
+    run_checkpoint_path: str | None = None  # JSON summary read by the next run
+    shutdown_grace_seconds: float = 5.0  # SIGTERM: in-flight sends finish or cancel
+
+    # Analytics: one-pass aggregates written per run (render with charts.py)
+    analytics_report_path: str | None = None  # JSON run report
 
     # Retry / concurrency
     max_retries: int = 3
     retry_delay: int = 5  # seconds between retries
+    retry_budget_ratio: float = 0.2  # run-wide retries per request made...
+    retry_budget_min: int = 10  # ...on top of this many
+    circuit_failure_threshold: int = 5  # consecutive failures opening a host
+    circuit_reset_timeout: float = 30.0  # seconds failing fast before a probe
 
     # Test mode settings
     test_mode: bool = False
     test_email_address: str | None = None
 
 
-# Global settings instance
-# Pylance may warn, but it loads from .env
-settings = Settings()  # type: ignore
+_settings: Settings | None = None
+
+# Per-task Settings (e.g. one campaign tenant); None means the global instance
+_settings_override: contextvars.ContextVar[Settings | None] = contextvars.ContextVar(
+    "settings_override", default=None
+)
+
+
+def get_settings() -> Settings:
+    """Return the process-wide Settings, loading env/.env on first call."""
+    global _settings
+    if _settings is None:
+        # Pylance may warn, but it loads from .env
+        _settings = Settings()  # type: ignore
+    return _settings
+
+
+def current_settings() -> Settings:
+    """The Settings in effect for this task: a scoped override, else the global."""
+    override = _settings_override.get()
+    return get_settings() if override is None else override
+
+
+@contextmanager
+def settings_scope(scoped: Settings) -> Iterator[Settings]:
+    """Make `settings` resolve to `scoped` in this context (and tasks it spawns)."""
+    token = _settings_override.set(scoped)
+    try:
+        yield scoped
+    finally:
+        _settings_override.reset(token)
+
+
+def scoped_path(path: str, scope: str) -> str:
+    """`path` with `scope` before its extension: state/x.db -> state/x-<scope>.db."""
+    root, ext = os.path.splitext(path)
+    return f"{root}-{scope}{ext}"
+
+
+def business_scope() -> str:
+    """Short digest of the business id in effect, safe to use in file names."""
+    business_id = current_settings().business_id.get_secret_value()
+    return hashlib.sha256(business_id.encode()).hexdigest()[:12]
+
+
+class _LazySettings:
+    """
+    Proxy that defers reading env/.env until an attribute is first used.
+
+    Modules keep doing `from config import settings` at import time without
+    paying for validation then; reads, writes (and test patches) are
+    forwarded to the Settings in effect (see `settings_scope`).
+    """
+
+    __slots__ = ()
+
+    def __getattr__(self, name: str):
+        return getattr(current_settings(), name)
+
+    def __setattr__(self, name: str, value) -> None:
+        setattr(current_settings(), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(current_settings(), name)
+
+
+# Global settings instance (resolved lazily)
+settings: Settings = _LazySettings()  # type: ignore[assignment]
@@ -0,0 +1,220 @@
+# daemon.py
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+
+from config import settings
+from log import clear_request_id, logger, set_request_id, setup_logging
+from utils.cron import CronSchedule
+from utils.http import HttpClientPool, use_client_pool
+from utils.shutdown import install_signal_handlers, shutdown
+
+REASONS = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    503: "Service Unavailable",
+}
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class ReminderDaemon:
+    """
+    Long-running scheduler around one reminder workflow.
+
+    Runs `workflow` whenever the cron `schedule` (UTC) fires, or on demand
+    through a small local HTTP API, never two at once. The HTTP client pool
+    lives as long as the daemon, and with TOKEN_CACHE_TTL / LEARNER_CACHE_PATH
+    the Darey token and learner mirror stay warm between runs too.
+
+        GET  /health  liveness
+        GET  /status  last run, next scheduled run
+        POST /run     start a run now (409 while one is in progress)
+    """
+
+    def __init__(
+        self,
+        workflow: Callable[[], Awaitable[object]],
+        schedule: CronSchedule,
+        host: str = "127.0.0.1",
+        port: int = 8787,
+        pool: HttpClientPool | None = None,
+    ) -> None:
+        self.workflow = workflow
+        self.schedule = schedule
+        self.host = host
+        self.port = port
+        self.pool = pool or HttpClientPool(
+            max_connections=settings.http_max_connections
+        )
+        self.status: dict = {
+            "state": "idle",
+            "schedule": schedule.expression,
+            "runs": 0,
+            "next_run": None,
+            "last_trigger": None,
+            "last_started": None,
+            "last_finished": None,
+            "last_duration_s": None,
+            "last_error": None,
+            "last_result": None,
+        }
+        self._run_task: asyncio.Task | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._server: asyncio.AbstractServer | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._run_task is not None and not self._run_task.done()
+
+    def trigger(self, reason: str) -> bool:
+        """Start a run in the background; False if one is running or shutting down."""
+        if self.running or shutdown.requested:
+            return False
+        self._run_task = asyncio.create_task(self._run(reason))
+        return True
+
+    async def _run(self, reason: str) -> None:
+        set_request_id(str(uuid.uuid4()))
+        self.status.update(
+            state="running",
+            last_trigger=reason,
+            last_started=_utc_now().isoformat(),
+            last_error=None,
+        )
+        logger.info(f"Daemon run started ({reason})")
+        started = time.perf_counter()
+        try:
+            with use_client_pool(self.pool):
+                self.status["last_result"] = await self.workflow()
+        except Exception as e:
+            self.status["last_error"] = f"{type(e).__name__}: {e}"
+            logger.error(f"Daemon run failed ({reason}): {e}")
+        finally:
+            self.status.update(
+                state="idle",
+                runs=self.status["runs"] + 1,
+                last_finished=_utc_now().isoformat(),
+                last_duration_s=round(time.perf_counter() - started, 3),
+            )
+            logger.info(f"Daemon run finished ({reason})")
+            clear_request_id()
+
+    async def _scheduler(self) -> None:
+        next_run: datetime | None = None
+        while True:
+            now = _utc_now()
+            # The sleep can end a little early; never fire the same slot twice
+            next_run = self.schedule.next_after(
+                now if next_run is None else max(now, next_run)
+            )
+            self.status["next_run"] = next_run.isoformat()
+            await asyncio.sleep((next_run - now).total_seconds())
+            if not self.trigger("schedule"):
+                logger.warning("Scheduled run skipped: previous run still in progress")
+
+    def _route(self, method: str, path: str) -> tuple[int, dict]:
+        path = path.split("?", 1)[0]
+        routes = {"/health": "GET", "/status": "GET", "/run": "POST"}
+        if path not in routes:
+            return 404, {"error": "not found"}
+        if method != routes[path]:
+            return 405, {"error": f"use {routes[path]}"}
+        if path == "/health":
+            return 200, {"status": "ok", "state": self.status["state"]}
+        if path == "/status":
+            return 200, self.status
+        if shutdown.requested:
+            return 503, {"started": False, "error": "shutting down"}
+        if self.trigger("manual"):
+            return 202, {"started": True}
+        return 409, {"started": False, "error": "run in progress"}
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+            # Headers (and any body) are not needed by these routes
+            while (await reader.readline()).strip():
+                pass
+            status, body = self._route(method, path)
+        except (ValueError, asyncio.TimeoutError):
+            status, body = 400, {"error": "bad request"}
+        payload = json.dumps(body, default=str).encode()
+        head = (
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            "Connection: close\r\n\r\n"
+        )
+        try:
+            writer.write(head.encode() + payload)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def start(self) -> None:
+        """Open the control endpoint and start the scheduler."""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._tasks.append(asyncio.create_task(self._scheduler()))
+        logger.info(
+            f"Daemon listening on http://{self.host}:{self.port} "
+            f"(schedule '{self.schedule.expression}' UTC)"
+        )
+
+    async def stop(self) -> None:
+        """Stop scheduling and serving, wait for a run in progress, close pools."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._run_task is not None:
+            await asyncio.gather(self._run_task, return_exceptions=True)
+        await self.pool.aclose()
+
+    async def serve_forever(self) -> None:
+        """Serve until SIGTERM / SIGINT; a run in progress drains first."""
+        await self.start()
+        try:
+            await shutdown.wait()
+            logger.info("Daemon shutting down")
+        finally:
+            await self.stop()
+
+
+async def run_daemon() -> None:
+    from main import run_once
+
+    install_signal_handlers()
+    if not settings.reminder_state_path:
+        logger.warning(
+            "REMINDER_STATE_PATH is unset: every scheduled run will email "
+            "all matching learners again"
+        )
+    daemon = ReminderDaemon(
+        run_once,
+        CronSchedule(settings.daemon_schedule),
+        host=settings.daemon_host,
+        port=settings.daemon_port,
+    )
+    await daemon.serve_forever()
+    await logger.complete()
+
+
+if __name__ == "__main__":
+    setup_logging()
+    asyncio.run(run_daemon())
@@ -0,0 +1,189 @@
+# data_processing/analytics.py
+import bisect
+import json
+import math
+import os
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from config import settings
+from utils.timestamps import DAY_SECONDS, cutoff_epoch, to_epoch
+
+# Engagement categories of the weekly charts (see analysis.ipynb)
+CATEGORIES = ("inactive", "low_progress", "active", "completed")
+
+# progress_status bins: 0-9, 10-19, ..., 90-99, then 100 on its own
+PROGRESS_EDGES = (0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100, 101)
+
+# Days since last login, coarse enough to read at a glance
+INACTIVITY_EDGES = (0, 1, 3, 7, 14, 30, 60, 90, 180, 365, math.inf)
+
+
+class Histogram:
+    """Fixed-bin counter; values outside [edges[0], edges[-1]) are ignored."""
+
+    def __init__(self, edges: tuple[float, ...]) -> None:
+        self.edges = edges
+        self.counts = [0] * (len(edges) - 1)
+
+    def add(self, value: float) -> None:
+        index = bisect.bisect_right(self.edges, value) - 1
+        if 0 <= index < len(self.counts):
+            self.counts[index] += 1
+
+    def to_dict(self) -> dict:
+        edges = [None if math.isinf(edge) else edge for edge in self.edges]
+        return {"edges": edges, "counts": self.counts}
+
+
+class QuantileSketch:
+    """
+    Approximate quantiles of non-negative values in bounded memory.
+
+    Values are counted in logarithmic buckets (as in DDSketch), so any
+    quantile comes back within `relative_accuracy` of the exact one; memory
+    grows with the log of the value range, not with the number of values.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets: Counter[int] = Counter()
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        if value <= 0:
+            self.zeros += 1
+        else:
+            self.buckets[math.ceil(math.log(value) / self._log_gamma)] += 1
+
+    def quantile(self, q: float) -> float | None:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                # Midpoint of the bucket (gamma^(i-1), gamma^i]
+                return 2 * self._gamma**index / (self._gamma + 1)
+        return 2 * self._gamma ** max(self.buckets) / (self._gamma + 1)
+
+
+class RunAnalytics:
+    """
+    One-pass aggregates over the learners a run reads.
+
+    Fed page by page by `stream_filtered_batches` (after dedup, before the
+    reminder throttle, so the report covers the whole population): counts
+    per engagement category and per rule segment, a progress histogram, the
+    inactivity-days distribution and its quantiles. Only counters are kept,
+    so the run never holds more than the current page.
+    """
+
+    def __init__(
+        self,
+        now: float | None = None,
+        inactive_days: float | None = None,
+        low_score_threshold: float | None = None,
+    ) -> None:
+        self.now = time.time() if now is None else now
+        self.inactive_days = (
+            settings.inactive_days if inactive_days is None else inactive_days
+        )
+        self.low_score_threshold = (
+            settings.low_score_threshold
+            if low_score_threshold is None
+            else low_score_threshold
+        )
+        self._cutoff = cutoff_epoch(self.inactive_days, self.now)
+        self.total = 0
+        self.skipped = 0  # missing _id / email or non-numeric progress
+        self.never_logged_in = 0
+        self.categories: Counter[str] = Counter(
+            {category: 0 for category in CATEGORIES}
+        )
+        self.segments: Counter[str] = Counter()
+        self.progress = Histogram(PROGRESS_EDGES)
+        self.inactivity = Histogram(INACTIVITY_EDGES)
+        self.inactivity_sketch = QuantileSketch()
+
+    def observe(self, page: list[dict], buckets: dict[str, list[dict]]) -> None:
+        """Count one page and its {segment: learners} partition."""
+        for segment, learners in buckets.items():
+            self.segments[segment] += len(learners)
+        for learner in page:
+            self._observe_learner(learner)
+
+    def _observe_learner(self, learner: dict) -> None:
+        self.total += 1
+        try:
+            progress = float(
+                (learner.get("program_data") or {}).get("progress_status", 0)
+            )
+        except (TypeError, ValueError):
+            progress = None
+        if progress is None or not learner.get("_id") or not learner.get("email"):
+            self.skipped += 1
+            return
+        self.progress.add(progress)
+
+        last_login = to_epoch(learner.get("last_loggedin_date"))
+        if last_login is None:
+            self.never_logged_in += 1
+        else:
+            days = max(self.now - last_login, 0) / DAY_SECONDS
+            self.inactivity.add(days)
+            self.inactivity_sketch.add(days)
+
+        if progress >= 100:
+            category = "completed"
+        elif last_login is None or last_login < self._cutoff:
+            category = "inactive"
+        elif progress < self.low_score_threshold:
+            category = "low_progress"
+        else:
+            category = "active"
+        self.categories[category] += 1
+
+    def report(self, run: dict | None = None) -> dict:
+        sketch = self.inactivity_sketch
+        return {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "as_of": datetime.fromtimestamp(self.now, timezone.utc).isoformat(),
+            "inactive_days": self.inactive_days,
+            "low_score_threshold": self.low_score_threshold,
+            "total": self.total,
+            "skipped": self.skipped,
+            "never_logged_in": self.never_logged_in,
+            "categories": dict(self.categories),
+            "segments": dict(self.segments),
+            "progress_histogram": self.progress.to_dict(),
+            "inactivity_days_histogram": self.inactivity.to_dict(),
+            "inactivity_days_quantiles": {
+                f"p{round(q * 100)}": sketch.quantile(q) for q in (0.5, 0.75, 0.9, 0.99)
+            },
+            "run": run or {},
+        }
+
+
+def create_run_analytics() -> RunAnalytics | None:
+    """Aggregates for ANALYTICS_REPORT_PATH, or None when no report is wanted."""
+    return RunAnalytics() if settings.analytics_report_path else None
+
+
+def write_report(path: str, report: dict) -> None:
+    """Atomically write a run report as compact JSON."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    staging = f"{path}.tmp"
+    with open(staging, "w", encoding="utf-8") as f:
+        json.dump(report, f, separators=(",", ":"))
+    os.replace(staging, path)
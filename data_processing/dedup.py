@@ -0,0 +1,143 @@
+# data_processing/dedup.py
+import math
+
+from config import settings
+from log import logger
+from utils.memory import MemoryBudget
+
+_MASK32 = 0xFFFFFFFF
+
+# Measured on CPython 3.12: a 64-bit hash in a set costs ~69 bytes (int
+# object plus its share of the hash table)
+EXACT_KEY_BYTES = 72
+# Share of the run's memory budget the exact set may take; page buffers and
+# batches get the rest
+EXACT_SET_BUDGET_SHARE = 0.25
+
+
+def normalize_email(email: object) -> str | None:
+    """Lower-cased, whitespace-stripped email, or None when empty/not a string."""
+    if not isinstance(email, str):
+        return None
+    email = email.strip().lower()
+    return email or None
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over Python's (per-process) string hash.
+
+    Sized for `capacity` keys at `error_rate` false positives; uses double
+    hashing on the two halves of the 64-bit hash for its k probes.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001) -> None:
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key_hash: int):
+        a = key_hash & _MASK32
+        b = ((key_hash >> 32) & _MASK32) | 1
+        size = self.size
+        for i in range(self.hashes):
+            yield (a + i * b) % size
+
+    def add(self, key_hash: int) -> None:
+        for pos in self._positions(key_hash):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key_hash: int) -> bool:
+        bits = self.bits
+        return all(
+            bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key_hash)
+        )
+
+
+class Deduplicator:
+    """
+    Streaming duplicate filter keyed on `_id` and normalized email.
+
+    A learner is dropped when its `_id` or its email was already seen in
+    this run, so neither a record repeated across pages nor two records
+    sharing an address get a second message. Keys are kept as 64-bit hashes
+    in an exact set up to `max_exact_keys`; beyond that, new keys go into a
+    Bloom filter so memory stays bounded for very large populations, at the
+    cost of rarely dropping a learner that was not a duplicate.
+    """
+
+    def __init__(
+        self,
+        max_exact_keys: int = 2_000_000,
+        bloom_capacity: int = 10_000_000,
+        bloom_error_rate: float = 0.001,
+    ) -> None:
+        self.max_exact_keys = max_exact_keys
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self._exact: set[int] = set()
+        self._bloom: BloomFilter | None = None
+        self.seen = 0
+        self.removed = 0
+
+    def _check_and_add(self, key: str) -> bool:
+        """Return True if `key` was seen before; record it either way."""
+        key_hash = hash(key)
+        if key_hash in self._exact:
+            return True
+        if self._bloom is not None:
+            if key_hash in self._bloom:
+                return True
+            self._bloom.add(key_hash)
+            return False
+        if len(self._exact) >= self.max_exact_keys:
+            logger.info(
+                f"Dedup exact set full ({self.max_exact_keys} keys); "
+                "continuing with a Bloom filter"
+            )
+            self._bloom = BloomFilter(self.bloom_capacity, self.bloom_error_rate)
+            self._bloom.add(key_hash)
+            return False
+        self._exact.add(key_hash)
+        return False
+
+    def filter_page(self, page: list[dict]) -> list[dict]:
+        """Return the page without learners whose `_id` or email was seen."""
+        unique = []
+        for learner in page:
+            self.seen += 1
+            learner_id = learner.get("_id")
+            email = normalize_email(learner.get("email"))
+            # Evaluate both so each key is recorded even when one matches
+            dup_id = learner_id is not None and self._check_and_add(f"id:{learner_id}")
+            dup_email = email is not None and self._check_and_add(f"email:{email}")
+            if dup_id or dup_email:
+                self.removed += 1
+            else:
+                unique.append(learner)
+        return unique
+
+
+def exact_key_capacity(memory: MemoryBudget | None = None) -> int:
+    """Keys the exact set may hold within its share of the memory budget."""
+    memory = memory or MemoryBudget(fraction=settings.memory_fraction)
+    return max(1, int(memory.budget * EXACT_SET_BUDGET_SHARE) // EXACT_KEY_BYTES)
+
+
+def create_deduplicator() -> Deduplicator | None:
+    """
+    Deduplicator from settings, or None when DEDUP_ENABLED is off.
+    DEDUP_MAX_EXACT_KEYS=0 sizes the exact set from the memory budget.
+    """
+    if not settings.dedup_enabled:
+        return None
+    max_exact_keys = settings.dedup_max_exact_keys or exact_key_capacity()
+    logger.debug(
+        f"Dedup exact set holds up to {max_exact_keys} keys "
+        f"(~{max_exact_keys * EXACT_KEY_BYTES // 2**20} MB)"
+    )
+    return Deduplicator(
+        max_exact_keys=max_exact_keys,
+        bloom_capacity=settings.dedup_bloom_capacity,
+        bloom_error_rate=settings.dedup_error_rate,
+    )
@@ -1,19 +1,21 @@
 # data_processing/downloader.py
+import asyncio
+import math
+import time
+
 import httpx
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception
 
 from config import settings
+from data_processing.page_cache import PageCache, create_page_cache
 from log import logger
-from utils.retry import is_transient_error, log_before_retry
+from utils.batching import AdaptiveBatchController, aligned_page_size
+from utils.budget import budget_exhausted, charge_api_call
+from utils.hedging import Hedger, create_hedger
+from utils.http import http_client
+from utils.retry import CircuitOpenError, transient_retry
 
 
-@retry(
-    stop=stop_after_attempt(settings.max_retries),
-    wait=wait_exponential(multiplier=settings.retry_delay, min=1, max=60),
-    retry=retry_if_exception(is_transient_error),
-    before_sleep=log_before_retry,
-    reraise=True,
-)
+@transient_retry("darey")
 async def get_bearer_token() -> str:
     """Retrieve a Bearer token from Darey API asynchronously, with retries on transient errors."""
     url = "https://aiservice.academy.darey.io/ai/api/token"
@@ -26,8 +28,9 @@ async def get_bearer_token() -> str:
         "password": settings.darey_password.get_secret_value(),
     }
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
+    async with http_client("darey-auth", timeout=30.0) as client:
         try:
+            charge_api_call()
             response = await client.post(url, json=payload, headers=headers)
             response.raise_for_status()
             token = response.json()["data"]["access_token"]
@@ -38,45 +41,384 @@ async def get_bearer_token() -> str:
             raise
 
 
-@retry(
-    stop=stop_after_attempt(settings.max_retries),
-    wait=wait_exponential(multiplier=settings.retry_delay, min=1, max=60),
-    retry=retry_if_exception(is_transient_error),
-    before_sleep=log_before_retry,
-    reraise=True,
-)
-async def stream_learners(page_size: int | None = None):
+# (business_id, username) -> (token, monotonic expiry); kept warm in daemon mode
+_token_cache: dict[tuple[str, str], tuple[str, float]] = {}
+
+
+def _token_key() -> tuple[str, str]:
+    return (
+        settings.business_id.get_secret_value(),
+        settings.darey_username.get_secret_value(),
+    )
+
+
+async def bearer_token() -> str:
     """
-    Async generator that yields learners from Darey API in pages.
-    Implements retry on transient errors per request.
+    `get_bearer_token`, reused for TOKEN_CACHE_TTL seconds per business and
+    user so repeated runs in one process skip the login round trip.
     """
-    page = 1
-    limit = page_size or settings.download_limit
+    key = _token_key()
+    cached = _token_cache.get(key)
+    now = time.monotonic()
+    if cached is not None and cached[1] > now:
+        return cached[0]
     token = await get_bearer_token()
+    if settings.token_cache_ttl > 0:
+        _token_cache[key] = (token, now + settings.token_cache_ttl)
+    return token
+
+
+def forget_token(error: Exception | None = None) -> None:
+    """Drop the cached token (all of them without an error, or on a 401)."""
+    if error is None:
+        _token_cache.clear()
+    elif isinstance(error, httpx.HTTPStatusError) and error.response.status_code == 401:
+        _token_cache.pop(_token_key(), None)
+
+
+def page_timeout() -> httpx.Timeout:
+    """
+    Per-request limits for page GETs: a stuck request times out and is
+    retried like any transient error (sequential and sharded paths alike).
+    """
+    return httpx.Timeout(
+        settings.download_timeout, connect=settings.download_connect_timeout
+    )
+
+
+async def _get_page_json(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: dict,
+    cache: PageCache | None = None,
+    hedger: Hedger | None = None,
+) -> tuple[dict, int]:
+    """GET one page as (parsed JSON, body bytes), via the cache and hedger."""
+
+    async def fetch() -> tuple[dict, int]:
+        charge_api_call()
+        if cache is not None:
+            return await cache.get(client, url, headers)
+        response = await client.get(url, headers=headers)
+        response.raise_for_status()
+        return response.json(), _response_size(response)
+
+    if hedger is None:
+        return await fetch()
+    return await hedger.run(fetch)
+
+
+class DownloadReport:
+    """
+    How complete a page stream was, filled in while it runs.
+
+    Failed or skipped pages and early stops (run budget, shutdown, open
+    circuit) are recorded so callers can tell a full read from a partial one
+    that must not replace a complete copy, e.g. the learner cache.
+    """
+
+    def __init__(self) -> None:
+        self.failed_pages: list[int] = []
+        self.stop_reason: str | None = None
+
+    @property
+    def complete(self) -> bool:
+        return not self.failed_pages and self.stop_reason is None
+
+
+async def stream_learners(
+    page_size: int | None = None, controller: AdaptiveBatchController | None = None
+):
+    """Async generator that yields learners from Darey API one by one."""
+    async for learners in stream_learner_pages(page_size, controller):
+        for learner in learners:
+            yield learner
+
+
+async def stream_learner_pages(
+    page_size: int | None = None,
+    controller: AdaptiveBatchController | None = None,
+    report: DownloadReport | None = None,
+):
+    """
+    Async generator that yields pages (lists) of learners from Darey API.
+    Each page request is retried on transient errors (see `_fetch_page`);
+    a page that still fails ends the read, recorded in `report`.
+
+    When a `controller` is given, the page size is re-read from it before
+    every request (aligned so no records are skipped or repeated) and each
+    page's size and latency are fed back to it. Requests go through the
+    Darey circuit breaker and retry budget when a RetryGuard is active, and
+    are revalidated against the on-disk page cache when PAGE_CACHE_DIR is set.
+    """
+    report = report if report is not None else DownloadReport()
+    offset = 0
+    limit = page_size or settings.download_limit
+    token = await bearer_token()
     headers = {
         "Authorization": f"Bearer {token}",
         "x-business-id": settings.business_id.get_secret_value(),
         "Accept": "application/json",
     }
 
-    async with httpx.AsyncClient(timeout=None) as client:
+    cache = create_page_cache()
+    hedger = create_hedger()
+    async with http_client("darey", timeout=page_timeout()) as client:
         while True:
-            url = f"{settings.download_url}?page={page}&limit={limit}"
+            if budget_exhausted():
+                logger.info(
+                    f"Run budget exhausted; not fetching page {offset // limit + 1}"
+                )
+                report.stop_reason = "budget"
+                break
+            if controller is not None:
+                limit = aligned_page_size(offset, controller.page_size, controller.step)
+            page = offset // limit + 1
+            started = time.perf_counter()
             try:
-                response = await client.get(url, headers=headers)
-                response.raise_for_status()
-                data = response.json()
-                learners = data.get("data", {}).get("info", [])
-                if not learners:
-                    logger.info(f"No more learners found on page {page}. Stopping.")
-                    break
-                for learner in learners:
-                    yield learner
-                logger.info(f"Yielded {len(learners)} learners from page {page}")
-                page += 1
+                data, size = await _fetch_page(
+                    client, headers, page, limit, cache, hedger
+                )
             except Exception as e:
-                if is_transient_error(e):
-                    # let tenacity handle retry
-                    raise
+                if controller is not None:
+                    controller.record_failure("page")
+                forget_token(e)
                 logger.error(f"Failed to fetch learners on page {page}: {e}")
+                report.failed_pages.append(page)
+                if isinstance(e, CircuitOpenError):
+                    report.stop_reason = "circuit_open"
                 break
+            learners = data.get("data", {}).get("info", [])
+            if controller is not None:
+                controller.record_page(
+                    len(learners), size, time.perf_counter() - started
+                )
+            if not learners:
+                logger.info(f"No more learners found on page {page}. Stopping.")
+                break
+            yield learners
+            logger.info(f"Yielded {len(learners)} learners from page {page}")
+            offset += limit
+    if cache is not None:
+        cache.log_stats()
+    if hedger is not None:
+        hedger.log_stats()
+
+
+# Metadata keys the learners endpoint may use to report the population size
+TOTAL_KEYS = ("total", "totalCount", "total_count", "count", "totalDocs")
+
+
+def _total_from_meta(data: dict) -> int | None:
+    """Extract the total learner count from a page response, if present."""
+    body = data.get("data", {})
+    for container in (body, body.get("pagination") or {}, data.get("meta") or {}):
+        for key in TOTAL_KEYS:
+            value = container.get(key)
+            if isinstance(value, int) and value >= 0:
+                return value
+    return None
+
+
+@transient_retry("darey")
+async def _fetch_page(
+    client: httpx.AsyncClient,
+    headers: dict,
+    page: int,
+    limit: int,
+    cache: PageCache | None = None,
+    hedger: Hedger | None = None,
+) -> tuple[dict, int]:
+    """
+    Fetch one learners page as (parsed JSON, body bytes), retrying transient
+    errors through the Darey breaker and retry budget.
+    """
+    url = f"{settings.download_url}?page={page}&limit={limit}"
+    return await _get_page_json(client, url, headers, cache, hedger)
+
+
+async def _page_learners(
+    client: httpx.AsyncClient,
+    headers: dict,
+    page: int,
+    limit: int,
+    cache: PageCache | None = None,
+    hedger: Hedger | None = None,
+) -> list[dict]:
+    data, _ = await _fetch_page(client, headers, page, limit, cache, hedger)
+    return data.get("data", {}).get("info", [])
+
+
+async def _probe_last_page(
+    client: httpx.AsyncClient, headers: dict, limit: int, start: int = 1
+) -> int:
+    """
+    Find the last non-empty page when the API reports no total.
+
+    Doubles the page number until an empty page is found, then binary
+    searches the gap: O(log pages) requests instead of a full scan.
+    """
+    low, high = start, start * 2
+    while await _page_learners(client, headers, high, limit):
+        low, high = high, high * 2
+    while high - low > 1:
+        mid = (low + high) // 2
+        if await _page_learners(client, headers, mid, limit):
+            low = mid
+        else:
+            high = mid
+    return low
+
+
+def _split_pages(first: int, last: int, shards: int) -> list[range]:
+    """Split pages [first, last] into up to `shards` contiguous ranges."""
+    total = last - first + 1
+    if total <= 0:
+        return []
+    shards = max(1, min(shards, total))
+    size = math.ceil(total / shards)
+    return [
+        range(start, min(start + size, last + 1))
+        for start in range(first, last + 1, size)
+    ]
+
+
+async def stream_learners_sharded(
+    page_size: int | None = None,
+    workers: int | None = None,
+    controller: AdaptiveBatchController | None = None,
+):
+    """Async generator that yields learners one by one from a sharded download."""
+    async for learners in stream_learner_pages_sharded(page_size, workers, controller):
+        for learner in learners:
+            yield learner
+
+
+async def stream_learner_pages_sharded(
+    page_size: int | None = None,
+    workers: int | None = None,
+    controller: AdaptiveBatchController | None = None,
+    report: DownloadReport | None = None,
+):
+    """
+    Async generator that downloads learner pages with several concurrent workers.
+
+    The first page reveals the total count (or the last page is probed),
+    the remaining pages are split into contiguous ranges, one per worker,
+    and pages are merged as they arrive; pages past the discovered end are
+    read sequentially until an empty one. Records shifting between pages
+    mid-read can be yielded twice: the pipeline's Deduplicator drops them.
+    Pages that failed are logged and skipped, and recorded in `report`.
+    """
+    report = report if report is not None else DownloadReport()
+    limit = page_size or settings.download_limit
+    workers = max(
+        1, min(workers or settings.download_workers, settings.max_download_concurrency)
+    )
+    token = await bearer_token()
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "x-business-id": settings.business_id.get_secret_value(),
+        "Accept": "application/json",
+    }
+    cache = create_page_cache()
+    hedger = create_hedger()
+    # One spare connection per worker for hedged duplicates
+    pool = httpx.Limits(max_connections=workers * 2, max_keepalive_connections=workers)
+    async with http_client("darey", timeout=page_timeout(), limits=pool) as client:
+        try:
+            first, _ = await _fetch_page(client, headers, 1, limit, cache, hedger)
+        except Exception as e:
+            logger.error(f"Failed to fetch learners on page 1: {e}")
+            report.failed_pages.append(1)
+            return
+        learners = first.get("data", {}).get("info", [])
+        if not learners:
+            logger.info("No learners found on page 1. Stopping.")
+            return
+
+        total = _total_from_meta(first)
+        if total is not None:
+            last_page = max(1, math.ceil(total / limit))
+        else:
+            last_page = await _probe_last_page(client, headers, limit)
+        logger.info(
+            f"Sharded download: {last_page} pages of {limit} across {workers} workers"
+        )
+
+        yield learners
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+        shards = _split_pages(2, last_page, workers)
+
+        async def worker(pages: range) -> None:
+            for page in pages:
+                if budget_exhausted():
+                    report.stop_reason = "budget"
+                    break
+                started = time.perf_counter()
+                try:
+                    batch = await _page_learners(
+                        client, headers, page, limit, cache, hedger
+                    )
+                except Exception as e:
+                    if controller is not None:
+                        controller.record_failure("page")
+                    logger.error(f"Failed to fetch learners on page {page}: {e}")
+                    report.failed_pages.append(page)
+                    if isinstance(e, CircuitOpenError):
+                        report.stop_reason = "circuit_open"
+                        break  # the rest of the shard would fail the same way
+                    continue
+                if controller is not None:
+                    controller.record_page(len(batch), 0, time.perf_counter() - started)
+                await queue.put((page, batch))
+            # Sentinel: this shard is done (skipped when cancelled)
+            await queue.put(None)
+
+        tasks = [asyncio.create_task(worker(pages)) for pages in shards]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                item = await queue.get()
+                if item is None:
+                    remaining -= 1
+                    continue
+                page, batch = item
+                yield batch
+                logger.info(f"Yielded {len(batch)} learners from page {page}")
+
+            # Pick up records added after the total was read
+            page = last_page + 1
+            while True:
+                if budget_exhausted():
+                    report.stop_reason = "budget"
+                    break
+                try:
+                    batch = await _page_learners(
+                        client, headers, page, limit, cache, hedger
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to fetch learners on page {page}: {e}")
+                    report.failed_pages.append(page)
+                    break
+                if not batch:
+                    break
+                yield batch
+                page += 1
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if cache is not None:
+                cache.log_stats()
+            if hedger is not None:
+                hedger.log_stats()
+
+
+def _response_size(response: httpx.Response) -> int:
+    """Body size in bytes, or 0 when it cannot be determined."""
+    try:
+        return len(response.content)
+    except TypeError:
+        return 0
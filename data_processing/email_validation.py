@@ -0,0 +1,169 @@
+# data_processing/email_validation.py
+import json
+import re
+from collections import Counter
+
+from config import settings
+from log import logger
+
+# Practical subset of RFC 5321/5322: dot-atom local part, dotted host names
+# and an alphabetic (or IDNA) top-level domain. Quoted local parts and IP
+# literals are valid on paper but never legitimate learner addresses.
+EMAIL_PATTERN = re.compile(
+    r"[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+)*"
+    r"@((?:[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?\.)+"
+    r"(?:[A-Za-z]{2,63}|xn--[A-Za-z0-9-]{1,59}))"
+)
+
+# Misspellings of the providers most learners use -> the intended domain
+TYPO_DOMAINS = {
+    "gmial.com": "gmail.com",
+    "gamil.com": "gmail.com",
+    "gmal.com": "gmail.com",
+    "gmai.com": "gmail.com",
+    "gmaill.com": "gmail.com",
+    "gmail.co": "gmail.com",
+    "gmail.con": "gmail.com",
+    "gmail.cm": "gmail.com",
+    "gnail.com": "gmail.com",
+    "yahooo.com": "yahoo.com",
+    "yaho.com": "yahoo.com",
+    "yahoo.co": "yahoo.com",
+    "yahoo.con": "yahoo.com",
+    "hotmial.com": "hotmail.com",
+    "hotmal.com": "hotmail.com",
+    "hotmail.co": "hotmail.com",
+    "hotmail.con": "hotmail.com",
+    "outlok.com": "outlook.com",
+    "outlook.co": "outlook.com",
+    "outlook.con": "outlook.com",
+    "iclod.com": "icloud.com",
+}
+
+DISPOSABLE_DOMAINS = frozenset(
+    {
+        "10minutemail.com",
+        "guerrillamail.com",
+        "mailinator.com",
+        "maildrop.cc",
+        "sharklasers.com",
+        "tempmail.com",
+        "temp-mail.org",
+        "throwawaymail.com",
+        "trashmail.com",
+        "yopmail.com",
+    }
+)
+
+
+class EmailValidator:
+    """
+    Normalize learner addresses and reject the ones not worth a send.
+
+    Addresses are trimmed (whitespace, a `mailto:` prefix, angle brackets)
+    and their domain lowercased, then matched against EMAIL_PATTERN. The
+    domain verdict (typo of a known provider, disposable, ok) is computed
+    once per domain and cached, so a page of mostly gmail.com addresses
+    costs one regex match and one dict lookup per learner. Rejections are
+    counted by reason for the run report.
+    """
+
+    def __init__(
+        self,
+        typo_domains: dict[str, str] | None = None,
+        disposable_domains: frozenset[str] | set[str] | None = None,
+    ) -> None:
+        self.typo_domains = TYPO_DOMAINS if typo_domains is None else typo_domains
+        self.disposable_domains = (
+            DISPOSABLE_DOMAINS if disposable_domains is None else disposable_domains
+        )
+        self._verdicts: dict[str, str | None] = {}
+        self.checked = 0
+        self.normalized = 0
+        self.rejected: Counter[str] = Counter()
+
+    def _domain_verdict(self, domain: str) -> str | None:
+        verdict = self._verdicts.get(domain, "")
+        if verdict == "":
+            if domain in self.typo_domains:
+                verdict = "typo_domain"
+            elif domain in self.disposable_domains:
+                verdict = "disposable_domain"
+            elif any(len(label) > 63 for label in domain.split(".")):
+                verdict = "malformed"
+            else:
+                verdict = None
+            self._verdicts[domain] = verdict
+        return verdict
+
+    def check(self, raw: object) -> tuple[str | None, str | None]:
+        """(normalized address, None) or (None, rejection reason)."""
+        self.checked += 1
+        if not isinstance(raw, str):
+            return None, "missing" if raw is None else "malformed"
+        email = raw.strip()
+        if email[:7].lower() == "mailto:":
+            email = email[7:]
+        email = email.strip("<> \t")
+        if not email:
+            return None, "missing"
+        if len(email) > 254:
+            return None, "malformed"
+        match = EMAIL_PATTERN.fullmatch(email)
+        if match is None or match.start(1) > 65:  # local part of at most 64
+            return None, "malformed"
+        domain = match.group(1).lower()
+        verdict = self._domain_verdict(domain)
+        if verdict is not None:
+            return None, verdict
+        email = email[: match.start(1)] + domain
+        if email != raw:
+            self.normalized += 1
+        return email, None
+
+    def normalize(self, raw: object, learner_id: object = None) -> str | None:
+        """The normalized address, or None (logged and counted) if rejected."""
+        email, reason = self.check(raw)
+        if reason is not None:
+            self.rejected[reason] += 1
+            hint = self.typo_domains.get(str(raw).rpartition("@")[2].strip().lower())
+            logger.debug(
+                f"Rejected email for learner {learner_id} ({reason})"
+                + (f"; did they mean @{hint}?" if hint else "")
+            )
+        return email
+
+    def stats(self) -> dict:
+        return {
+            "checked": self.checked,
+            "normalized": self.normalized,
+            "rejected": sum(self.rejected.values()),
+            "reasons": dict(self.rejected),
+        }
+
+
+def load_domain_lists(path: str) -> tuple[dict[str, str], set[str]]:
+    """
+    Extra domains from a JSON file {"typos": {"bad": "good"}, "disposable":
+    [...]}, merged over the built-in lists.
+    """
+    with open(path, encoding="utf-8") as f:
+        lists = json.load(f)
+    typos = {
+        **TYPO_DOMAINS,
+        **{k.lower(): v for k, v in lists.get("typos", {}).items()},
+    }
+    disposable = set(DISPOSABLE_DOMAINS) | {
+        d.lower() for d in lists.get("disposable", [])
+    }
+    return typos, disposable
+
+
+def create_email_validator() -> EmailValidator | None:
+    """The validator configured by EMAIL_VALIDATION / EMAIL_DOMAIN_LIST_PATH."""
+    if not settings.email_validation:
+        return None
+    if settings.email_domain_list_path:
+        typos, disposable = load_domain_lists(settings.email_domain_list_path)
+        return EmailValidator(typos, disposable)
+    return EmailValidator()
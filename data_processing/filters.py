@@ -1,17 +1,25 @@
 # data_processing/filters.py
-from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import AsyncGenerator, Any, Dict
 
 from config import settings
 from log import logger
-from data_processing.downloader import stream_learners
-from utils.batching import get_adaptive_batch_size
+from data_processing.analytics import RunAnalytics
+from data_processing.dedup import Deduplicator, create_deduplicator
+from data_processing.priority import SendQueue
+from data_processing.reminder_state import ReminderThrottle
+from data_processing.rules import SegmentClassifier, compile_rules, load_rules
+from data_processing.sources import DareyHttpSource, LearnerSource
+from utils.batching import AdaptiveBatchController, get_adaptive_batch_size
+from utils.timestamps import cutoff_epoch, to_epoch
 
-two_weeks_ago = datetime.now(timezone.utc) - timedelta(days=settings.inactive_days)
 
-batch_size = get_adaptive_batch_size(
-    min_batch=200, max_batch=500, target_memory_fraction=0.05
-)
+@lru_cache(maxsize=1)
+def default_batch_size() -> int:
+    """Memory-based default batch size, computed on first use rather than import."""
+    return get_adaptive_batch_size(
+        min_batch=200, max_batch=500, target_memory_fraction=0.05
+    )
 
 
 def filter_inactive(learner: Dict[str, Any]) -> bool:
@@ -48,18 +56,16 @@ def filter_inactive(learner: Dict[str, Any]) -> bool:
         # No last login recorded -> treat as inactive
         return True
 
-    try:
-        # support ISO strings, convert Z -> +00:00
-        last_login_dt = datetime.fromisoformat(last_login.replace("Z", "+00:00"))
-    except Exception:
+    # cached ISO-8601 parse to epoch seconds (fast path for the API format)
+    last_login_ts = to_epoch(last_login)
+    if last_login_ts is None:
         logger.warning(
             f"Invalid last_loggedin_date for learner {learner.get('_id')}: {last_login}"
         )
         return False
 
     # compute cutoff at call time to avoid stale module-level value
-    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.inactive_days)
-    return last_login_dt < cutoff
+    return last_login_ts < cutoff_epoch(settings.inactive_days)
 
 
 def filter_low_score(learner: dict) -> bool:
@@ -80,34 +86,115 @@ def filter_low_score(learner: dict) -> bool:
     return progress_status < settings.low_score_threshold
 
 
-async def stream_filtered_batches() -> AsyncGenerator[tuple[list[dict], str], None]:
+def classify_page(
+    page: list[dict], classifier: SegmentClassifier | None = None
+) -> dict[str, list[dict]]:
     """
-    Async generator that yields learners filtered and batched according to rules:
-    - Filtering handled by filter_inactive / filter_low_score
-    - Inactive learners and low-score learners separated
-    - Batch size taken from .env via settings.batch_size
-    - No double classification: inactive takes precedence
-    """
-    inactive_batch: list[dict] = []
-    low_score_batch: list[dict] = []
+    Partition one page into {segment: learners} in a single pass.
 
-    async for learner in stream_learners(page_size=batch_size):
-        # Decide category (filter_inactive has precedence)
-        if filter_inactive(learner):
-            inactive_batch.append(learner)
-        elif filter_low_score(learner):
-            low_score_batch.append(learner)
+    Uses the compiled segment rules (default rules when no classifier is
+    given); learners matching no rule are dropped.
+    """
+    return (classifier or compile_rules(load_rules())).partition(page)
+
+
+def split_full_batches(
+    buffer: list[dict], size: int
+) -> tuple[list[list[dict]], list[dict]]:
+    """Slice `buffer` into full batches of `size`, returning (batches, remainder)."""
+    full = len(buffer) - len(buffer) % size
+    batches = [buffer[i : i + size] for i in range(0, full, size)]
+    return batches, buffer[full:]
+
+
+async def stream_filtered_batches(
+    controller: AdaptiveBatchController | None = None,
+    source: LearnerSource | None = None,
+    classifier: SegmentClassifier | None = None,
+    throttle: ReminderThrottle | None = None,
+    deduplicator: Deduplicator | None = None,
+    analytics: RunAnalytics | None = None,
+) -> AsyncGenerator[tuple[list[dict], str], None]:
+    """
+    Async generator that yields (batch, template_type) according to rules:
+    - Learners read page by page from `source` (the Darey API by default)
+    - Repeated `_id`s / emails dropped before classification (DEDUP_ENABLED,
+      or an explicit `deduplicator`)
+    - Each page classified in one pass by the compiled segment rules
+      (see data_processing.rules; the first matching rule wins), after
+      addresses are validated and normalized (EMAIL_VALIDATION)
+    - Every classified page counted by `analytics` when given (the run
+      report; see data_processing.analytics)
+    - Learners still in their reminder cooldown dropped when a `throttle`
+      is given (one state lookup per page)
+    - Batch size taken from the adaptive controller when given, else the
+      memory-based default
+    - With SEND_QUEUE_SIZE > 0, learners wait in a bounded priority queue
+      and batches leave most urgent first (see data_processing.priority);
+      otherwise full batches are cut in page order by slicing
+    """
+    batch_size = default_batch_size()
+    if source is None:
+        source = DareyHttpSource(page_size=batch_size, controller=controller)
+    if classifier is None:
+        classifier = compile_rules(load_rules())
+    if deduplicator is None:
+        deduplicator = create_deduplicator()
+    buffers: dict[str, list[dict]] = {segment: [] for segment in classifier.segments}
+    queue = (
+        SendQueue(settings.send_queue_size) if settings.send_queue_size > 0 else None
+    )
+
+    def current_size() -> int:
+        return controller.batch_size if controller is not None else batch_size
+
+    async for page in source.pages():
+        if deduplicator is not None:
+            page = deduplicator.filter_page(page)
+        # Urgency comes from the facts parsed while classifying
+        scores: dict[int, float] | None = {} if queue is not None else None
+        buckets = classifier.partition(page, scores)
+        if analytics is not None:
+            analytics.observe(page, buckets)
+        if throttle is not None:
+            buckets = throttle.filter_buckets(buckets)
+
+        if queue is not None:
+            for segment, learners in buckets.items():
+                for learner in learners:
+                    queue.push(segment, scores[id(learner)], learner)
+            # Release the most urgent learners once the queue is over capacity
+            while queue.full:
+                segment, batch = queue.pop_batch(current_size())
+                yield batch, classifier.templates[segment]
+            continue
+
+        for segment, learners in buckets.items():
+            buffers[segment].extend(learners)
 
         # Yield batches when full
-        if len(inactive_batch) >= batch_size:
-            yield inactive_batch, "inactive"
-            inactive_batch.clear()
-        if len(low_score_batch) >= batch_size:
-            yield low_score_batch, "low_score"
-            low_score_batch.clear()
+        size = current_size()
+        for segment, buffer in buffers.items():
+            if len(buffer) >= size:
+                batches, buffers[segment] = split_full_batches(buffer, size)
+                for batch in batches:
+                    yield batch, classifier.templates[segment]
 
     # Yield remaining learners
-    if inactive_batch:
-        yield inactive_batch, "inactive"
-    if low_score_batch:
-        yield low_score_batch, "low_score"
+    if queue is not None:
+        for segment, batch in queue.drain(current_size()):
+            yield batch, classifier.templates[segment]
+    for segment, buffer in buffers.items():
+        if buffer:
+            yield buffer, classifier.templates[segment]
+
+    if classifier.validator is not None:
+        stats = classifier.validator.stats()
+        logger.info(
+            f"Email validation rejected {stats['rejected']} of {stats['checked']} "
+            f"addresses {stats['reasons']}; {stats['normalized']} normalized"
+        )
+    if deduplicator is not None:
+        logger.info(
+            f"Dedup removed {deduplicator.removed} of {deduplicator.seen} learners"
+        )
@@ -0,0 +1,145 @@
+# data_processing/page_cache.py
+import hashlib
+import json
+import os
+
+import httpx
+
+from config import settings
+from log import logger
+
+
+def accept_encoding() -> str:
+    """
+    Encodings httpx can decode here: gzip and deflate always, br and zstd
+    when the optional `brotli` / `zstandard` packages are installed.
+    """
+    encodings = ["gzip", "deflate"]
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+        except ImportError:
+            pass
+        else:
+            encodings.append("br")
+    else:
+        encodings.append("br")
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        pass
+    else:
+        encodings.append("zstd")
+    return ", ".join(encodings)
+
+
+class PageCache:
+    """
+    On-disk HTTP cache of learner pages, revalidated with conditional requests.
+
+    Each page body is stored with its ETag / Last-Modified validators; the
+    next request for the same URL sends If-None-Match / If-Modified-Since,
+    and a 304 Not Modified is answered from disk. Responses are negotiated
+    with the best Accept-Encoding available. Counters report how many bytes
+    a 304 (the cached body) or compression (decoded minus wire size) kept
+    off the network.
+    """
+
+    def __init__(self, directory: str, scope: str = "") -> None:
+        self.directory = directory
+        self.scope = scope  # e.g. the business id: tenants never share entries
+        self.accept_encoding = accept_encoding()
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_downloaded = 0  # on the wire
+        self.bytes_saved_cache = 0
+        self.bytes_saved_compression = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        key = hashlib.sha256(f"{self.scope}\n{url}".encode()).hexdigest()[:32]
+        return os.path.join(self.directory, key)
+
+    def _read_meta(self, path: str) -> dict | None:
+        try:
+            with open(f"{path}.meta", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, path: str, body: bytes, meta: dict) -> None:
+        # Body first, then the metadata pointing at it, each replaced atomically
+        for suffix, data in ((".body", body), (".meta", json.dumps(meta).encode())):
+            tmp = f"{path}{suffix}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, f"{path}{suffix}")
+
+    async def get(
+        self, client: httpx.AsyncClient, url: str, headers: dict
+    ) -> tuple[dict, int]:
+        """
+        GET `url` as parsed JSON, revalidating a cached copy.
+        Returns (data, body size in bytes).
+        """
+        path = self._path(url)
+        meta = self._read_meta(path)
+        request_headers = {**headers, "Accept-Encoding": self.accept_encoding}
+        if meta is not None:
+            if meta.get("etag"):
+                request_headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                request_headers["If-Modified-Since"] = meta["last_modified"]
+
+        self.requests += 1
+        response = await client.get(url, headers=request_headers)
+        self.bytes_downloaded += response.num_bytes_downloaded
+        if response.status_code == 304 and meta is not None:
+            try:
+                with open(f"{path}.body", "rb") as f:
+                    body = f.read()
+            except OSError:
+                # Entry lost since the metadata was read: fetch unconditionally
+                os.remove(f"{path}.meta")
+                return await self.get(client, url, headers)
+            self.not_modified += 1
+            self.bytes_saved_cache += len(body)
+            return json.loads(body), len(body)
+
+        response.raise_for_status()
+        body = response.content
+        self.bytes_saved_compression += max(
+            0, len(body) - response.num_bytes_downloaded
+        )
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self._write(path, body, {"etag": etag, "last_modified": last_modified})
+        return response.json(), len(body)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "bytes_downloaded": self.bytes_downloaded,
+            "bytes_saved": self.bytes_saved_cache + self.bytes_saved_compression,
+            "bytes_saved_cache": self.bytes_saved_cache,
+            "bytes_saved_compression": self.bytes_saved_compression,
+        }
+
+    def log_stats(self) -> None:
+        stats = self.stats()
+        logger.bind(page_cache=stats).info(
+            f"Page cache: {stats['not_modified']} of {stats['requests']} pages "
+            f"not modified, {stats['bytes_saved']:,} bytes saved "
+            f"({stats['bytes_downloaded']:,} downloaded)"
+        )
+
+
+def create_page_cache() -> PageCache | None:
+    """The cache at PAGE_CACHE_DIR, or None when it is unset."""
+    if not settings.page_cache_dir:
+        return None
+    return PageCache(settings.page_cache_dir, settings.business_id.get_secret_value())
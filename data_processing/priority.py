@@ -0,0 +1,59 @@
+# data_processing/priority.py
+import heapq
+import itertools
+from typing import Iterator
+
+
+class SendQueue:
+    """
+    Bounded priority queue of classified learners, most urgent first.
+
+    Learners are kept in one max-heap per segment (a batch shares one
+    template). Once more than `capacity` learners are held, the caller
+    takes batches off the top with `pop_batch`, which prefers segments able
+    to fill a whole batch; at the end of the stream `drain` empties the
+    queue in urgency order. With a capacity at least the
+    size of the population, the whole run is sent in urgency order; smaller
+    capacities bound memory and reorder within a sliding window.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self._heaps: dict[str, list[tuple[float, int, dict]]] = {}
+        self._order = itertools.count()  # FIFO among equal scores
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def full(self) -> bool:
+        return self._size > self.capacity
+
+    def push(self, segment: str, score: float, learner: dict) -> None:
+        heap = self._heaps.setdefault(segment, [])
+        heapq.heappush(heap, (-score, next(self._order), learner))
+        self._size += 1
+
+    def pop_batch(self, size: int) -> tuple[str, list[dict]]:
+        """
+        Up to `size` learners from the segment holding the most urgent one.
+
+        Only segments holding a full batch are considered while any does, so
+        a segment is not released in small batches while it is still filling;
+        otherwise (a small capacity, or the end of the stream) the most
+        urgent segment goes out as a partial batch.
+        """
+        heads = [
+            (heap[0][:2], segment) for segment, heap in self._heaps.items() if heap
+        ]
+        full = [head for head in heads if len(self._heaps[head[1]]) >= size]
+        segment = min(full or heads)[1]
+        heap = self._heaps[segment]
+        batch = [heapq.heappop(heap)[2] for _ in range(min(size, len(heap)))]
+        self._size -= len(batch)
+        return segment, batch
+
+    def drain(self, size: int) -> Iterator[tuple[str, list[dict]]]:
+        while self._size:
+            yield self.pop_batch(size)
@@ -0,0 +1,173 @@
+# data_processing/reminder_state.py
+import os
+import sqlite3
+import time
+from typing import Iterable, NamedTuple
+
+from config import settings
+from log import logger
+from utils.timestamps import DAY_SECONDS, to_epoch
+
+# SQLite caps bound parameters per statement (999 on older builds)
+_MAX_PARAMS = 900
+
+
+class ReminderState(NamedTuple):
+    last_reminded: int | None  # epoch seconds
+    times_reminded: int
+    last_activity_seen: int | None  # learner's last login when last reminded
+
+
+class ReminderStateStore:
+    """Per-learner reminder history kept in a local SQLite file across runs."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS reminder_state (
+            learner_id TEXT PRIMARY KEY,
+            last_reminded INTEGER,
+            times_reminded INTEGER NOT NULL DEFAULT 0,
+            last_activity_seen INTEGER,
+            template TEXT
+        )
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(self.SCHEMA)
+
+    def load(self, learner_ids: list[str]) -> dict[str, ReminderState]:
+        """Fetch states for many learners with a few IN queries."""
+        states: dict[str, ReminderState] = {}
+        for i in range(0, len(learner_ids), _MAX_PARAMS):
+            chunk = learner_ids[i : i + _MAX_PARAMS]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                "SELECT learner_id, last_reminded, times_reminded, last_activity_seen "
+                f"FROM reminder_state WHERE learner_id IN ({placeholders})",
+                chunk,
+            )
+            for learner_id, *state in rows:
+                states[learner_id] = ReminderState(*state)
+        return states
+
+    def save(self, rows: Iterable[tuple]) -> int:
+        """Upsert (learner_id, last_reminded, times, last_activity, template) rows."""
+        rows = list(rows)
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO reminder_state VALUES (?, ?, ?, ?, ?)", rows
+            )
+        return len(rows)
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class ReminderThrottle:
+    """
+    Cooldown and backoff policy over the reminder state store.
+
+    A learner is emailed again only after `cooldown_days`, growing by
+    `backoff_factor` for each reminder already sent (21, 42, 84 days...), and
+    never more than `max_reminders` times (0 = no cap). Logging in again
+    after a reminder resets the backoff. Sends are buffered with
+    `mark_reminded` and written in one batch by `flush` at the end of a run.
+    """
+
+    def __init__(
+        self,
+        store: ReminderStateStore,
+        cooldown_days: float = 21,
+        backoff_factor: float = 2.0,
+        max_reminders: int = 0,
+        now: float | None = None,
+    ) -> None:
+        self.store = store
+        self.cooldown_days = cooldown_days
+        self.backoff_factor = backoff_factor
+        self.max_reminders = max_reminders
+        self.now = int(time.time() if now is None else now)
+        self.skipped = 0
+        self._states: dict[str, ReminderState] = {}
+        self._pending: dict[str, tuple] = {}
+
+    def _times(self, state: ReminderState, activity: int | None) -> int:
+        """Reminders counted toward backoff; reset once the learner came back."""
+        if activity is not None and (
+            # A first login since the last reminder counts as coming back too
+            state.last_activity_seen is None or activity > state.last_activity_seen
+        ):
+            return 0
+        return state.times_reminded
+
+    def _eligible(self, state: ReminderState | None, activity: int | None) -> bool:
+        if state is None or state.last_reminded is None:
+            return True
+        times = self._times(state, activity)
+        if self.max_reminders and times >= self.max_reminders:
+            return False
+        wait_days = self.cooldown_days * self.backoff_factor ** max(times - 1, 0)
+        return self.now - state.last_reminded >= wait_days * DAY_SECONDS
+
+    def filter_buckets(self, buckets: dict[str, list[dict]]) -> dict[str, list[dict]]:
+        """Drop learners still in cooldown from every bucket (one bulk lookup)."""
+        ids = [
+            str(learner["_id"]) for learners in buckets.values() for learner in learners
+        ]
+        if not ids:
+            return buckets
+        states = self.store.load(ids)
+        kept: dict[str, list[dict]] = {}
+        for segment, learners in buckets.items():
+            kept[segment] = []
+            for learner in learners:
+                learner_id = str(learner["_id"])
+                state = states.get(learner_id)
+                if self._eligible(state, to_epoch(learner.get("last_loggedin_date"))):
+                    kept[segment].append(learner)
+                    if state is not None:
+                        self._states[learner_id] = state
+                else:
+                    self.skipped += 1
+        return kept
+
+    def mark_reminded(self, learners: list[dict], template: str) -> None:
+        """Buffer the new state of learners whose reminder was sent."""
+        for learner in learners:
+            learner_id = str(learner["_id"])
+            activity = to_epoch(learner.get("last_loggedin_date"))
+            state = self._states.pop(learner_id, None)
+            times = self._times(state, activity) if state is not None else 0
+            self._pending[learner_id] = (
+                learner_id,
+                self.now,
+                times + 1,
+                activity,
+                template,
+            )
+
+    def flush(self) -> int:
+        """Write all buffered sends to the store in one transaction."""
+        written = self.store.save(self._pending.values())
+        self._pending.clear()
+        logger.info(
+            f"Reminder state updated for {written} learners; "
+            f"{self.skipped} skipped by cooldown"
+        )
+        return written
+
+
+def create_reminder_throttle() -> ReminderThrottle | None:
+    """Throttle from settings, or None when REMINDER_STATE_PATH is unset."""
+    if not settings.reminder_state_path:
+        return None
+    return ReminderThrottle(
+        ReminderStateStore(settings.reminder_state_path),
+        cooldown_days=settings.reminder_cooldown_days,
+        backoff_factor=settings.reminder_backoff_factor,
+        max_reminders=settings.reminder_max_count,
+    )
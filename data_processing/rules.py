@@ -0,0 +1,315 @@
+# data_processing/rules.py
+import json
+import time
+from typing import Any, Callable, NamedTuple
+
+from config import settings
+from data_processing.email_validation import EmailValidator, create_email_validator
+from log import logger
+from utils.timestamps import DAY_SECONDS, cutoff_epoch, parse_epoch, to_epoch
+
+# Learner fields that may carry the sign-up date
+CREATED_FIELDS = ("createdAt", "created_at")
+
+# Ordered: the first matching rule wins, so each learner gets one email.
+# Values written as "$name" are read from settings when the rules compile.
+DEFAULT_RULES: list[dict[str, Any]] = [
+    {
+        "segment": "new_this_week",
+        "when": {"completed": False, "joined_within_days": 7},
+    },
+    {
+        "segment": "never_logged_in",
+        "when": {"completed": False, "never_logged_in": True},
+    },
+    {
+        "segment": "stalled",
+        "when": {
+            "completed": False,
+            "progress_gte": 90,
+            "inactive_for_days": "$inactive_days",
+        },
+    },
+    {
+        "segment": "inactive",
+        "when": {"completed": False, "inactive_for_days": "$inactive_days"},
+    },
+    {
+        "segment": "low_score",
+        "when": {"completed": False, "progress_lt": "$low_score_threshold"},
+    },
+]
+
+
+class LearnerFacts(NamedTuple):
+    """Fields shared by all rules, parsed once per learner."""
+
+    progress: float | None  # None when progress_status is not numeric
+    last_login: int | None  # epoch seconds; None when never or invalid
+    never_logged_in: bool
+    created: int | None  # epoch seconds
+
+
+def _created_epoch(learner: dict) -> int | None:
+    for field in CREATED_FIELDS:
+        created = to_epoch(learner.get(field))
+        if created is not None:
+            return created
+    return None
+
+
+def learner_facts(learner: dict, with_created: bool = True) -> LearnerFacts:
+    """
+    Parse the fields rules depend on; invalid values are logged once here.
+    The sign-up date is only parsed `with_created` (a rule needs it).
+    """
+    raw_progress = (learner.get("program_data") or {}).get("progress_status", 0)
+    try:
+        progress: float | None = float(raw_progress)
+    except (TypeError, ValueError):
+        logger.warning(
+            f"Invalid progress_status for learner {learner.get('_id')}: {raw_progress}"
+        )
+        progress = None
+
+    raw_login = learner.get("last_loggedin_date")
+    last_login = (
+        parse_epoch(raw_login) if raw_login and isinstance(raw_login, str) else None
+    )
+    if raw_login and last_login is None:
+        logger.warning(
+            f"Invalid last_loggedin_date for learner {learner.get('_id')}: {raw_login}"
+        )
+
+    created = _created_epoch(learner) if with_created else None
+    return LearnerFacts(progress, last_login, not raw_login, created)
+
+
+def urgency_score(facts: LearnerFacts, now: float, cap_days: float = 60) -> float:
+    """
+    How much a learner needs a nudge now, from 0 to 1 (higher = send first).
+
+    Mostly days inactive, capped at `cap_days` (learners who never logged
+    in count from sign-up, or as fully inactive when that is unknown), then
+    progress stage: the further along, the more is lost if they drop out.
+    """
+    if facts.last_login is not None:
+        days = (now - facts.last_login) / DAY_SECONDS
+    elif facts.never_logged_in:
+        days = (now - facts.created) / DAY_SECONDS if facts.created else cap_days
+    else:
+        days = 0.0  # unparseable login date
+    inactivity = min(max(days, 0.0), cap_days) / cap_days
+    stage = min(max(facts.progress or 0.0, 0.0), 100.0) / 100.0
+    return 0.7 * inactivity + 0.3 * stage
+
+
+Condition = Callable[[LearnerFacts], bool]
+
+
+def resolve_value(value: Any, overrides: dict[str, Any] | None = None) -> Any:
+    """A "$name" value read from `overrides`, else from settings."""
+    if isinstance(value, str) and value.startswith("$"):
+        name = value[1:]
+        if overrides and name in overrides:
+            return overrides[name]
+        return getattr(settings, name)
+    return value
+
+
+def _condition(name: str, value: Any, now: float) -> Condition:
+    """Compile one `when` entry into a predicate over LearnerFacts."""
+    if name == "completed":
+        want = bool(value)
+        return lambda f: (f.progress is not None and f.progress >= 100) == want
+    if name == "progress_lt":
+        limit = float(value)
+        return lambda f: f.progress is not None and f.progress < limit
+    if name == "progress_gte":
+        limit = float(value)
+        return lambda f: f.progress is not None and f.progress >= limit
+    if name == "never_logged_in":
+        want = bool(value)
+        return lambda f: f.never_logged_in == want
+    if name == "inactive_for_days":
+        # Never logged in counts as inactive; an unparseable date does not
+        cutoff = cutoff_epoch(float(value), now)
+        return lambda f: (
+            f.never_logged_in or (f.last_login is not None and f.last_login < cutoff)
+        )
+    if name == "active_within_days":
+        cutoff = cutoff_epoch(float(value), now)
+        return lambda f: f.last_login is not None and f.last_login >= cutoff
+    if name == "joined_within_days":
+        cutoff = cutoff_epoch(float(value), now)
+        return lambda f: f.created is not None and f.created >= cutoff
+    raise ValueError(f"Unknown rule condition: {name}")
+
+
+# Conditions reading LearnerFacts.created, which is parsed only when needed
+CREATED_CONDITIONS = frozenset({"joined_within_days"})
+
+
+def _all_of(conditions: tuple[Condition, ...]) -> Condition:
+    """One predicate chaining `conditions` with `and` (no per-call generator)."""
+    if not conditions:
+        return lambda f: True
+    if len(conditions) == 1:
+        return conditions[0]
+    if len(conditions) == 2:
+        a, b = conditions
+        return lambda f: a(f) and b(f)
+    if len(conditions) == 3:
+        a, b, c = conditions
+        return lambda f: a(f) and b(f) and c(f)
+    return lambda f: all(condition(f) for condition in conditions)
+
+
+class Rule(NamedTuple):
+    segment: str
+    template: str
+    conditions: tuple[Condition, ...]  # besides the ones shared by every rule
+    matches: Condition  # `conditions` chained into one predicate
+
+
+class SegmentClassifier:
+    """
+    Single-pass classifier compiled from an ordered rule list.
+
+    Each learner's fields are parsed once into LearnerFacts (the sign-up date
+    only when a rule uses it), conditions shared by every rule (e.g.
+    `completed: False`) are checked once, then the compiled rules are tried
+    in order; the first match decides the segment. Adding a segment adds one
+    more predicate check, not another pass. With a `validator`, addresses are
+    normalized in place and learners with a rejected address get no segment.
+    """
+
+    def __init__(
+        self,
+        rules: list[Rule],
+        now: float | None = None,
+        urgency_cap_days: float = 60,
+        validator: EmailValidator | None = None,
+        shared: tuple[Condition, ...] = (),
+        needs_created: bool = True,
+    ) -> None:
+        self.rules = rules
+        self.segments = [rule.segment for rule in rules]
+        self.templates = {rule.segment: rule.template for rule in rules}
+        self.now = time.time() if now is None else now
+        self.urgency_cap_days = urgency_cap_days
+        self.validator = validator
+        self.shared = _all_of(shared)
+        self.needs_created = needs_created
+        # (predicate, segment) pairs: cheaper to unpack than Rule attributes
+        self._checks = tuple((rule.matches, rule.segment) for rule in rules)
+
+    def classify(self, learner: dict) -> str | None:
+        """Return the learner's segment, or None if it should not be emailed."""
+        for segment, learners in self.partition([learner]).items():
+            if learners:
+                return segment
+        return None
+
+    def urgency(self, learner: dict) -> float:
+        """Urgency score (see `urgency_score`) as of the classifier's `now`."""
+        return urgency_score(learner_facts(learner), self.now, self.urgency_cap_days)
+
+    def partition(
+        self, page: list[dict], scores: dict[int, float] | None = None
+    ) -> dict[str, list[dict]]:
+        """
+        Split a page into {segment: learners} in one pass. With `scores`,
+        each classified learner's urgency is also stored under `id(learner)`,
+        computed from the facts already parsed for its segment.
+        """
+        buckets: dict[str, list[dict]] = {segment: [] for segment in self.segments}
+        # Hot loop: everything it touches is bound to a local first
+        validator = self.validator
+        shared = self.shared
+        checks = self._checks
+        needs_created = self.needs_created
+        facts_of = learner_facts
+        now, cap_days = self.now, self.urgency_cap_days
+        for learner in page:
+            learner_id = learner.get("_id")
+            email = learner.get("email")
+            if not learner_id or not email:
+                logger.warning(f"Skipping learner without _id or email: {learner_id}")
+                continue
+            if validator is not None:
+                email = validator.normalize(email, learner_id)
+                if email is None:
+                    continue
+                learner["email"] = email
+            facts = facts_of(learner, needs_created)
+            if not shared(facts):
+                continue
+            for matches, segment in checks:
+                if matches(facts):
+                    buckets[segment].append(learner)
+                    if scores is not None:
+                        if facts.never_logged_in and not needs_created:
+                            # Urgency counts from sign-up: parse it for these only
+                            facts = facts._replace(created=_created_epoch(learner))
+                        scores[id(learner)] = urgency_score(facts, now, cap_days)
+                    break
+        return buckets
+
+
+def compile_rules(
+    rules: list[dict[str, Any]] | None = None, now: float | None = None
+) -> SegmentClassifier:
+    """
+    Compile declarative rules into a SegmentClassifier.
+
+    Each rule is {"segment": name, "template": name (defaults to segment),
+    "when": {condition: value, ...}}. "$setting" values and the time cutoffs
+    are resolved here, once per run. Every template must exist (built in or
+    in TEMPLATES_PATH); a typo fails the run here rather than per batch.
+    """
+    from email_sender.templates import get_template
+
+    now = time.time() if now is None else now
+    specs = rules if rules is not None else DEFAULT_RULES
+    whens = [
+        [(name, resolve_value(value)) for name, value in spec.get("when", {}).items()]
+        for spec in specs
+    ]
+    # Conditions every rule has (same value) are checked once per learner
+    shared = (
+        [c for c in whens[0] if all(c in when for when in whens[1:])]
+        if len(whens) > 1
+        else []
+    )
+    compiled = []
+    for spec, when in zip(specs, whens):
+        segment = spec["segment"]
+        template = spec.get("template", segment)
+        if get_template(template) is None:
+            raise ValueError(f"Rule {segment!r} uses unknown template {template!r}")
+        conditions = tuple(
+            _condition(name, value, now)
+            for name, value in when
+            if (name, value) not in shared
+        )
+        compiled.append(Rule(segment, template, conditions, _all_of(conditions)))
+    return SegmentClassifier(
+        compiled,
+        now=now,
+        urgency_cap_days=settings.urgency_cap_days,
+        validator=create_email_validator(),
+        shared=tuple(_condition(name, value, now) for name, value in shared),
+        needs_created=any(
+            name in CREATED_CONDITIONS for when in whens for name, _ in when
+        ),
+    )
+
+
+def load_rules(path: str | None = None) -> list[dict[str, Any]]:
+    """Rules from the JSON file at `path` (or SEGMENT_RULES_PATH), else defaults."""
+    path = path or settings.segment_rules_path
+    if not path:
+        return DEFAULT_RULES
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
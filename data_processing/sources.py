@@ -0,0 +1,284 @@
+# data_processing/sources.py
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from typing import AsyncIterator, Iterable, Iterator, Protocol, runtime_checkable
+
+from config import business_scope, scoped_path, settings
+from data_processing.downloader import (
+    DownloadReport,
+    stream_learner_pages,
+    stream_learner_pages_sharded,
+)
+from log import logger
+from utils.batching import AdaptiveBatchController
+
+
+@runtime_checkable
+class LearnerSource(Protocol):
+    """
+    Anything that can produce learners page by page.
+
+    `pages()` yields non-empty lists of learner dicts, so downstream stages
+    await once per page instead of once per learner.
+    """
+
+    def pages(self) -> AsyncIterator[list[dict]]: ...
+
+
+async def _pages_in_thread(pages: Iterator[list[dict]]) -> AsyncIterator[list[dict]]:
+    """Drive a blocking page iterator from a worker thread, one page at a time."""
+    while True:
+        page = await asyncio.to_thread(next, pages, None)
+        if page is None:
+            return
+        if page:
+            yield page
+
+
+class DareyHttpSource:
+    """
+    Learners from the Darey API, sequential or sharded per `workers`.
+    `complete` tells whether the last read got every page.
+    """
+
+    def __init__(
+        self,
+        page_size: int | None = None,
+        workers: int | None = None,
+        controller: AdaptiveBatchController | None = None,
+    ) -> None:
+        self.page_size = page_size
+        self.workers = workers
+        self.controller = controller
+        self.report = DownloadReport()
+
+    @property
+    def complete(self) -> bool:
+        return self.report.complete
+
+    async def pages(self) -> AsyncIterator[list[dict]]:
+        self.report = DownloadReport()
+        workers = self.workers or settings.download_workers
+        if workers > 1:
+            pages = stream_learner_pages_sharded(
+                self.page_size, workers, self.controller, self.report
+            )
+        else:
+            pages = stream_learner_pages(self.page_size, self.controller, self.report)
+        async for page in pages:
+            yield page
+
+
+class NdjsonSnapshotSource:
+    """Learners from a newline-delimited JSON snapshot (one learner per line)."""
+
+    def __init__(self, path: str, page_size: int = 1000) -> None:
+        self.path = path
+        self.page_size = page_size
+
+    def _read(self) -> Iterator[list[dict]]:
+        page: list[dict] = []
+        with open(self.path, encoding="utf-8") as f:
+            for lineno, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    page.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    logger.warning(
+                        f"Skipping invalid line {lineno} in {self.path}: {e}"
+                    )
+                    continue
+                if len(page) >= self.page_size:
+                    yield page
+                    page = []
+        if page:
+            yield page
+
+    async def pages(self) -> AsyncIterator[list[dict]]:
+        async for page in _pages_in_thread(self._read()):
+            yield page
+
+    @staticmethod
+    def write(path: str, learners: Iterable[dict]) -> int:
+        """Write learners to an NDJSON snapshot, returning the count written."""
+        count = 0
+        with open(path, "w", encoding="utf-8") as f:
+            for learner in learners:
+                f.write(json.dumps(learner, default=str) + "\n")
+                count += 1
+        return count
+
+
+class ParquetSnapshotSource:
+    """Learners from a Parquet snapshot (requires the optional `pyarrow`)."""
+
+    def __init__(self, path: str, page_size: int = 1000) -> None:
+        self.path = path
+        self.page_size = page_size
+
+    def _read(self) -> Iterator[list[dict]]:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError(
+                "Parquet snapshots need pyarrow: `uv add pyarrow`"
+            ) from e
+        for batch in pq.ParquetFile(self.path).iter_batches(batch_size=self.page_size):
+            yield batch.to_pylist()
+
+    async def pages(self) -> AsyncIterator[list[dict]]:
+        async for page in _pages_in_thread(self._read()):
+            yield page
+
+
+class SQLiteLearnerStore:
+    """
+    Learners kept in a local SQLite file as JSON documents keyed by `_id`.
+
+    Pages are read with keyset pagination on rowid, so each page costs the
+    same regardless of how deep into the table it is.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS learners (id TEXT PRIMARY KEY, doc TEXT NOT NULL)"
+    )
+
+    def __init__(self, path: str, page_size: int = 1000) -> None:
+        self.path = path
+        self.page_size = page_size
+
+    def _connect(self) -> sqlite3.Connection:
+        # Pages are read from whichever worker thread asyncio.to_thread picks
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute(self.SCHEMA)
+        return conn
+
+    def upsert(self, learners: Iterable[dict]) -> int:
+        """Insert or replace learners by `_id`; learners without one are skipped."""
+        rows = [
+            (str(learner["_id"]), json.dumps(learner, default=str))
+            for learner in learners
+            if learner.get("_id")
+        ]
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO learners (id, doc) VALUES (?, ?)", rows
+                )
+        finally:
+            conn.close()
+        return len(rows)
+
+    def _read(self) -> Iterator[list[dict]]:
+        conn = self._connect()
+        try:
+            last_rowid = 0
+            while True:
+                rows = conn.execute(
+                    "SELECT rowid, doc FROM learners WHERE rowid > ? "
+                    "ORDER BY rowid LIMIT ?",
+                    (last_rowid, self.page_size),
+                ).fetchall()
+                if not rows:
+                    return
+                last_rowid = rows[-1][0]
+                yield [json.loads(doc) for _, doc in rows]
+        finally:
+            conn.close()
+
+    async def pages(self) -> AsyncIterator[list[dict]]:
+        async for page in _pages_in_thread(self._read()):
+            yield page
+
+
+class CachedLearnerSource:
+    """
+    An upstream source mirrored into a SQLite learner store.
+
+    While the store is younger than `max_age` seconds, pages are read from
+    it; otherwise they stream from `upstream` and are written to a fresh
+    store that replaces the old one only once the read completes, so an
+    abandoned refresh never leaves a partial cache behind. Upstreams with a
+    `complete` attribute (DareyHttpSource) can also report a read that ended
+    early without raising; that one is discarded too.
+    """
+
+    def __init__(
+        self,
+        upstream: LearnerSource,
+        path: str,
+        max_age: float,
+        page_size: int = 1000,
+    ) -> None:
+        self.upstream = upstream
+        self.path = path
+        self.max_age = max_age
+        self.page_size = page_size
+
+    def is_fresh(self) -> bool:
+        try:
+            return time.time() - os.path.getmtime(self.path) < self.max_age
+        except OSError:
+            return False
+
+    async def pages(self) -> AsyncIterator[list[dict]]:
+        if self.is_fresh():
+            logger.info(f"Reading learners from cached store {self.path}")
+            async for page in SQLiteLearnerStore(self.path, self.page_size).pages():
+                yield page
+            return
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        staging = f"{self.path}.tmp"
+        if os.path.exists(staging):
+            os.remove(staging)
+        store = SQLiteLearnerStore(staging)
+        async for page in self.upstream.pages():
+            await asyncio.to_thread(store.upsert, page)
+            yield page
+        if not getattr(self.upstream, "complete", True):
+            os.remove(staging)
+            logger.warning(
+                f"Learner download incomplete; keeping the previous store {self.path}"
+            )
+            return
+        os.replace(staging, self.path)
+        logger.info(f"Refreshed cached learner store {self.path}")
+
+
+def create_learner_source(
+    page_size: int | None = None, controller: AdaptiveBatchController | None = None
+) -> LearnerSource:
+    """
+    Build the learner source selected by `settings.learner_source`; the
+    Darey API is mirrored to LEARNER_CACHE_PATH when that is set, one file
+    per business id so campaign tenants never read each other's learners.
+    """
+    kind = settings.learner_source
+    path = settings.learner_source_path
+    if kind == "http":
+        source = DareyHttpSource(page_size=page_size, controller=controller)
+        if settings.learner_cache_path:
+            return CachedLearnerSource(
+                source,
+                scoped_path(settings.learner_cache_path, business_scope()),
+                settings.learner_cache_max_age,
+                page_size=page_size or 1000,
+            )
+        return source
+    if not path:
+        raise ValueError(f"LEARNER_SOURCE_PATH is required for source '{kind}'")
+    if kind == "ndjson":
+        return NdjsonSnapshotSource(path, page_size=page_size or 1000)
+    if kind == "parquet":
+        return ParquetSnapshotSource(path, page_size=page_size or 1000)
+    if kind == "sqlite":
+        return SQLiteLearnerStore(path, page_size=page_size or 1000)
+    raise ValueError(f"Unknown learner source: {kind}")
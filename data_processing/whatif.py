@@ -0,0 +1,191 @@
+# data_processing/whatif.py
+import os
+import re
+from datetime import datetime, timezone
+from typing import Any, NamedTuple, Sequence
+
+import numpy as np
+
+from data_processing.dedup import create_deduplicator
+from data_processing.email_validation import create_email_validator
+from data_processing.rules import resolve_value, learner_facts, load_rules
+from data_processing.sources import (
+    LearnerSource,
+    NdjsonSnapshotSource,
+    ParquetSnapshotSource,
+    SQLiteLearnerStore,
+)
+from utils.timestamps import cutoff_epoch
+
+_DATE_IN_NAME = re.compile(r"(\d{4})-?(\d{2})-?(\d{2})")
+
+
+class SnapshotArrays(NamedTuple):
+    """
+    The LearnerFacts columns (see data_processing.rules), one entry per
+    learner the pipeline would classify: repeated learners and rejected
+    addresses are dropped first, as in `stream_filtered_batches`.
+    """
+
+    as_of: float  # epoch seconds the snapshot was taken
+    progress: np.ndarray  # float64; NaN when progress_status is not numeric
+    last_login: np.ndarray  # float64 epoch seconds; NaN when missing or invalid
+    never_logged_in: np.ndarray  # bool: no last_loggedin_date at all
+    created: np.ndarray  # float64 epoch seconds; NaN when unknown
+
+
+class VolumeMatrix(NamedTuple):
+    """Emails one snapshot would have produced for each pair of settings."""
+
+    inactive_days: np.ndarray  # (D,)
+    thresholds: np.ndarray  # (T,)
+    segments: dict[str, np.ndarray]  # segment -> (D, T) emails, in rule order
+    total: np.ndarray  # (D, T)
+
+
+def open_snapshot(path: str, page_size: int = 10_000) -> LearnerSource:
+    """A snapshot source picked by file extension (NDJSON, Parquet, SQLite)."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".ndjson", ".jsonl"):
+        return NdjsonSnapshotSource(path, page_size=page_size)
+    if extension == ".parquet":
+        return ParquetSnapshotSource(path, page_size=page_size)
+    if extension in (".db", ".sqlite", ".sqlite3"):
+        return SQLiteLearnerStore(path, page_size=page_size)
+    raise ValueError(f"Unknown snapshot format: {path}")
+
+
+def snapshot_time(path: str) -> float:
+    """When a snapshot was taken: a date in its name (UTC), else its mtime."""
+    match = _DATE_IN_NAME.search(os.path.basename(path))
+    if match:
+        try:
+            day = datetime(*map(int, match.groups()), tzinfo=timezone.utc)
+            return day.timestamp()
+        except ValueError:
+            pass
+    return os.path.getmtime(path)
+
+
+def _nan(value: float | None) -> float:
+    return np.nan if value is None else float(value)
+
+
+async def load_snapshot(source: LearnerSource, as_of: float) -> SnapshotArrays:
+    """
+    Read a snapshot page by page into columns; learner dicts are not kept.
+    Dedup (DEDUP_ENABLED) and address validation (EMAIL_VALIDATION) apply
+    as in a run, and fields are parsed by `learner_facts` itself.
+    """
+    deduplicator = create_deduplicator()
+    validator = create_email_validator()
+    progress: list[float] = []
+    last_login: list[float] = []
+    never: list[bool] = []
+    created: list[float] = []
+    async for page in source.pages():
+        if deduplicator is not None:
+            page = deduplicator.filter_page(page)
+        for learner in page:
+            learner_id = learner.get("_id")
+            email = learner.get("email")
+            if not learner_id or not email:
+                continue
+            if validator is not None and validator.normalize(email, learner_id) is None:
+                continue
+            facts = learner_facts(learner)
+            progress.append(_nan(facts.progress))
+            last_login.append(_nan(facts.last_login))
+            never.append(facts.never_logged_in)
+            created.append(_nan(facts.created))
+    return SnapshotArrays(
+        as_of,
+        np.asarray(progress, dtype=np.float64),
+        np.asarray(last_login, dtype=np.float64),
+        np.asarray(never, dtype=bool),
+        np.asarray(created, dtype=np.float64),
+    )
+
+
+def condition_mask(
+    name: str, value: Any, now: float, snapshot: SnapshotArrays
+) -> np.ndarray:
+    """
+    Vectorized twin of `rules._condition`: which learners meet one `when`
+    entry. NaN compares False, matching the None checks there.
+    """
+    if name == "completed":
+        return (snapshot.progress >= 100) == bool(value)
+    if name == "progress_lt":
+        return snapshot.progress < float(value)
+    if name == "progress_gte":
+        return snapshot.progress >= float(value)
+    if name == "never_logged_in":
+        return snapshot.never_logged_in == bool(value)
+    if name == "inactive_for_days":
+        cutoff = cutoff_epoch(float(value), now)
+        return snapshot.never_logged_in | (snapshot.last_login < cutoff)
+    if name == "active_within_days":
+        return snapshot.last_login >= cutoff_epoch(float(value), now)
+    if name == "joined_within_days":
+        return snapshot.created >= cutoff_epoch(float(value), now)
+    raise ValueError(f"Unknown rule condition: {name}")
+
+
+def sweep(
+    snapshot: SnapshotArrays,
+    inactive_days: Sequence[float],
+    thresholds: Sequence[float],
+    rules: list[dict[str, Any]] | None = None,
+) -> VolumeMatrix:
+    """
+    Evaluate the segment rules (SEGMENT_RULES_PATH or the defaults) for
+    every pair of settings at once.
+
+    "$inactive_days" / "$low_score_threshold" take each grid value; the
+    first matching rule wins, so each learner gets one email, as in
+    `SegmentClassifier`. Each distinct condition is one boolean mask over
+    the whole snapshot, computed once and combined with array operations
+    instead of re-running the pipeline per grid cell. Reminder throttling
+    is not modelled: it depends on the send history, not on the snapshot.
+    """
+    specs = rules if rules is not None else load_rules()
+    days = np.asarray(inactive_days, dtype=np.float64)
+    limits = np.asarray(thresholds, dtype=np.float64)
+    now = snapshot.as_of
+    masks: dict[tuple[str, Any], np.ndarray] = {}
+    segments = {
+        spec["segment"]: np.zeros((len(days), len(limits)), dtype=np.int64)
+        for spec in specs
+    }
+
+    for row, day in enumerate(days):
+        for col, limit in enumerate(limits):
+            overrides = {"inactive_days": day, "low_score_threshold": limit}
+            unmatched = np.ones(len(snapshot.progress), dtype=bool)
+            for spec in specs:
+                matched = unmatched.copy()
+                for name, value in spec.get("when", {}).items():
+                    key = (name, resolve_value(value, overrides))
+                    if key not in masks:
+                        masks[key] = condition_mask(*key, now, snapshot)
+                    matched &= masks[key]
+                segments[spec["segment"]][row, col] += np.count_nonzero(matched)
+                unmatched &= ~matched
+
+    total = sum(segments.values(), np.zeros((len(days), len(limits)), np.int64))
+    return VolumeMatrix(days, limits, segments, total)
+
+
+async def simulate(
+    paths: Sequence[str],
+    inactive_days: Sequence[float],
+    thresholds: Sequence[float],
+) -> list[tuple[str, float, VolumeMatrix]]:
+    """Sweep each snapshot in `paths`, oldest first: [(path, as_of, matrix)]."""
+    results = []
+    for path in sorted(paths, key=snapshot_time):
+        as_of = snapshot_time(path)
+        snapshot = await load_snapshot(open_snapshot(path), as_of)
+        results.append((path, as_of, sweep(snapshot, inactive_days, thresholds)))
+    return results
@@ -0,0 +1,67 @@
+# email_sender/backends.py
+import contextvars
+from contextlib import contextmanager
+from typing import Iterator, Protocol, runtime_checkable
+
+from config import settings
+
+
+@runtime_checkable
+class EmailBackend(Protocol):
+    """
+    Something that delivers Mailjet-shaped messages ({"From", "To",
+    "Subject", "TextPart", "HTMLPart"}).
+
+    `send_batch_emails` packs messages into groups of at most `max_messages`
+    (and `max_request_bytes` of JSON) and hands each group to `send`, which
+    reports per message whether it was accepted. Backends hold their
+    connections between calls; `aclose` releases them.
+    """
+
+    name: str
+    max_messages: int
+    max_request_bytes: int
+
+    async def send(self, messages: list[dict], batch_id: str) -> list[bool]: ...
+
+    async def aclose(self) -> None: ...
+
+
+_backend: contextvars.ContextVar[EmailBackend | None] = contextvars.ContextVar(
+    "email_backend", default=None
+)
+
+
+def current_email_backend() -> EmailBackend | None:
+    """The backend active in this context, if any."""
+    return _backend.get()
+
+
+@contextmanager
+def use_email_backend(backend: EmailBackend) -> Iterator[EmailBackend]:
+    """Send through `backend` in this context (and tasks it spawns)."""
+    token = _backend.set(backend)
+    try:
+        yield backend
+    finally:
+        _backend.reset(token)
+
+
+def create_email_backend() -> EmailBackend:
+    """
+    The backend selected by EMAIL_BACKEND, with the settings in effect, or a
+    router over the providers listed in EMAIL_PROVIDERS_PATH.
+    """
+    if settings.email_providers_path:
+        from email_sender.router import load_router
+
+        return load_router(settings.email_providers_path)
+    if settings.email_backend == "mailjet":
+        from email_sender.mailjet_client import MailjetBackend
+
+        return MailjetBackend()
+    if settings.email_backend == "smtp":
+        from email_sender.smtp_backend import SMTPBackend
+
+        return SMTPBackend()
+    raise ValueError(f"Unknown email backend: {settings.email_backend}")
@@ -2,14 +2,41 @@
 import asyncio
 import httpx
 import traceback
+import weakref
 from typing import Iterator
 
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception
-
 from config import settings
 from log import logger
-from email_sender.templates import INACTIVE_TEMPLATE, LOW_SCORE_TEMPLATE
-from utils.retry import is_transient_error, log_before_retry
+from email_sender.backends import create_email_backend, current_email_backend
+from email_sender.packing import fixed_chunk_requests, message_size, pack_messages
+from email_sender.render_cache import render_cache
+from email_sender.templates import get_template
+from utils.budget import charge_api_call
+from utils.http import current_client_pool
+from utils.rate_limit import acquire_budget
+from utils.retry import transient_retry
+from utils.shutdown import drain
+
+
+class BatchSendError(Exception):
+    """Some chunks of a batch raised; `delivered` are the learners that went out."""
+
+    def __init__(self, errors: list[BaseException], delivered: list[dict]) -> None:
+        super().__init__(f"{len(errors)} chunk(s) failed, first: {errors[0]!r}")
+        self.errors = errors
+        self.delivered = delivered
+
+
+# Circuit breaker key per Mailjet client: each account fails (and recovers)
+# on its own, so one throttled or broken account never blocks the others
+_accounts: "weakref.WeakKeyDictionary[httpx.AsyncClient, str]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def breaker_key(client: httpx.AsyncClient, *args, **kwargs) -> str:
+    """`mailjet:<api key prefix>` for clients made by a MailjetBackend."""
+    return _accounts.get(client, "mailjet")
 
 
 def chunked(iterable: list[dict], size: int) -> Iterator[list[dict]]:
@@ -18,28 +45,77 @@ def chunked(iterable: list[dict], size: int) -> Iterator[list[dict]]:
         yield iterable[i : i + size]
 
 
+class MailjetBackend:
+    """
+    Email backend for the Mailjet Send API v3.1: one request per group of
+    messages, accepted or rejected as a whole.
+
+    Uses the shared client for the account when a pool is active (campaigns,
+    daemon), otherwise its own client, kept until `aclose`.
+    """
+
+    name = "mailjet"
+
+    def __init__(self, api_key: str | None = None, api_secret: str | None = None):
+        self.auth = (
+            api_key or settings.mailjet_api_key.get_secret_value(),
+            api_secret or settings.mailjet_api_secret.get_secret_value(),
+        )
+        self.account = f"mailjet:{self.auth[0][:8]}"
+        self.max_messages = settings.mailjet_max_messages
+        self.max_request_bytes = settings.mailjet_max_request_bytes
+        self._client: httpx.AsyncClient | None = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        pool = current_client_pool()
+        if pool is not None:
+            # One pooled client per Mailjet account when running campaigns
+            client = pool.get(f"mailjet:{self.auth[0]}", auth=self.auth, timeout=30.0)
+        else:
+            if self._client is None:
+                self._client = httpx.AsyncClient(auth=self.auth, timeout=30.0)
+            client = self._client
+        _accounts[client] = self.account
+        return client
+
+    async def send(self, messages: list[dict], batch_id: str) -> list[bool]:
+        accepted = await _send_email(
+            self._get_client(), {"Messages": messages}, batch_id
+        )
+        return [accepted is True] * len(messages)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
 async def send_batch_emails(
     learners: list[dict], template_type: str = "inactive"
-) -> None:
+) -> list[dict]:
     """
-    Send emails to learners in true Mailjet batches.
+    Send emails to learners in true Mailjet batches, through the active
+    email backend (EMAIL_BACKEND: the Send API by default, or SMTP).
     Each API call can contain up to 50 messages.
+
+    Returns the learners whose message the backend accepted. On shutdown,
+    chunks still in flight at the deadline are cancelled and left out; if a
+    chunk raised, BatchSendError carries the learners delivered by the others.
     """
-    template_map = {"inactive": INACTIVE_TEMPLATE, "low_score": LOW_SCORE_TEMPLATE}
-    template = template_map.get(template_type)
+    template = get_template(template_type)
     if not template:
         logger.error(f"Unknown template_type: {template_type}")
-        return
-
-    async with httpx.AsyncClient(
-        auth=(
-            settings.mailjet_api_key.get_secret_value(),
-            settings.mailjet_api_secret.get_secret_value(),
-        ),
-        timeout=30.0,
-    ) as client:
+        return []
+
+    cache = render_cache()
+    backend = current_email_backend()
+    owns_backend = backend is None
+    if backend is None:
+        backend = create_email_backend()
+    try:
         # Build all messages for learners
         messages: list[dict] = []
+        recipients: list[dict] = []  # learner behind each message
         for learner in learners:
             to_email = (
                 settings.test_email_address
@@ -61,6 +137,7 @@ async def send_batch_emails(
                     f"Learner {learner.get('_id', 'no_id')} has no firstName"
                 )
 
+            text, html = cache.render(template, first_name=name)
             msg = {
                 "From": {
                     "Email": settings.origin_email.get_secret_value(),
@@ -68,46 +145,79 @@ async def send_batch_emails(
                 },
                 "To": [{"Email": to_email, "Name": name}],
                 "Subject": template["subject"],
-                "TextPart": template["body"].format(first_name=name),
-                "HTMLPart": template.get("html", template["body"]).format(
-                    first_name=name
-                ),
+                "TextPart": text,
+                "HTMLPart": html,
             }
             messages.append(msg)
+            recipients.append(learner)
 
-        # Chunk messages into Mailjet-compliant sub-batches (≤ 50 each)
+        # Pack messages into Mailjet-compliant requests (≤ 50 each, and
+        # within the request size limit)
+        sizes = [message_size(msg) for msg in messages]
+        limits = (backend.max_messages, backend.max_request_bytes)
+        chunks = pack_messages(sizes, *limits)
+        fixed = fixed_chunk_requests(sizes, *limits)
+        if len(chunks) < fixed:
+            logger.bind(requests=len(chunks), fixed_chunk_requests=fixed).info(
+                f"Packed {len(messages)} {template_type} messages into "
+                f"{len(chunks)} requests ({fixed - len(chunks)} fewer than "
+                "size-safe fixed chunks)"
+            )
         tasks = []
-        for idx, chunk in enumerate(chunked(messages, 50), start=1):
-            payload = {"Messages": chunk}
+        for idx, chunk in enumerate(chunks, start=1):
+            group = [messages[i] for i in chunk]
             tasks.append(
-                asyncio.create_task(
-                    _send_email(client, payload, f"{template_type}_batch_{idx}")
-                )
+                asyncio.create_task(backend.send(group, f"{template_type}_batch_{idx}"))
             )
 
-        await asyncio.gather(*tasks)
+        outcomes = await drain(tasks)
+    finally:
+        if owns_backend:
+            await backend.aclose()
 
+    delivered: list[dict] = []
+    errors: list[BaseException] = []
+    for indices, outcome in zip(chunks, outcomes):
+        chunk = [recipients[i] for i in indices]
+        if isinstance(outcome, list):
+            delivered.extend(r for r, ok in zip(chunk, outcome) if ok)
+        elif isinstance(outcome, asyncio.CancelledError):
+            logger.warning(
+                f"{template_type} chunk of {len(chunk)} cancelled at shutdown; "
+                "its learners stay pending for the next run"
+            )
+        elif isinstance(outcome, BaseException):
+            errors.append(outcome)
+    if errors:
+        raise BatchSendError(errors, delivered)
+    return delivered
 
-@retry(
-    stop=stop_after_attempt(settings.max_retries),
-    wait=wait_exponential(multiplier=settings.retry_delay, min=1, max=60),
-    retry=retry_if_exception(is_transient_error),
-    before_sleep=log_before_retry,
-    reraise=True,
-)
-async def _send_email(client: httpx.AsyncClient, payload: dict, batch_id: str) -> None:
-    """Send one Mailjet batch (up to 50 messages) with retries and detailed logging."""
+
+@transient_retry(breaker_key)
+async def _send_email(client: httpx.AsyncClient, payload: dict, batch_id: str) -> bool:
+    """
+    Send one Mailjet batch (up to 50 messages) with retries and detailed logging.
+    Returns whether Mailjet accepted it. A 429 is raised so it is retried
+    after `Retry-After`; it does not count against the account's breaker.
+    """
     url = "https://api.mailjet.com/v3.1/send"
+    # Global send budget shared by campaign tenants (no-op otherwise)
+    await acquire_budget(len(payload["Messages"]))
+    charge_api_call()
     try:
         resp = await client.post(url, json=payload)
+        if resp.status_code == 429:
+            logger.warning(f"Batch {batch_id} rate limited by Mailjet")
+            resp.raise_for_status()
         if resp.status_code != 200:
             logger.error(
                 f"Batch {batch_id} failed | Status: {resp.status_code} | Response: {resp.text}"
             )
-        else:
-            logger.info(
-                f"Batch {batch_id} sent successfully ({len(payload['Messages'])} messages)"
-            )
+            return False
+        logger.info(
+            f"Batch {batch_id} sent successfully ({len(payload['Messages'])} messages)"
+        )
+        return True
     except Exception as e:
         tb = traceback.format_exc()
         logger.error(
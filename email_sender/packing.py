@@ -0,0 +1,65 @@
+# email_sender/packing.py
+import json
+
+from log import logger
+
+# `{"Messages":[` ... `]}` around the comma-separated messages
+ENVELOPE_BYTES = len(b'{"Messages":[]}')
+
+
+def message_size(message: dict) -> int:
+    """Bytes `message` adds to a request body, encoded the way httpx sends JSON."""
+    encoded = json.dumps(
+        message, ensure_ascii=False, separators=(",", ":"), allow_nan=False
+    )
+    return len(encoded.encode("utf-8"))
+
+
+def pack_messages(sizes: list[int], max_count: int, max_bytes: int) -> list[list[int]]:
+    """
+    Group message indices into requests of at most `max_count` messages and
+    `max_bytes` of JSON body, first-fit.
+
+    Each message goes into the first request that still has room for it, so
+    a long body does not close a request that later short ones can fill.
+    Messages keep their order within a request and earlier messages land
+    in earlier requests, so the most urgent learners go out first. A
+    message too large for any request is sent on its own and logged;
+    Mailjet will reject it.
+    """
+    chunks: list[list[int]] = []
+    used: list[int] = []  # body bytes per chunk so far
+    open_chunks: list[int] = []  # chunks below max_count, in creation order
+    for index, size in enumerate(sizes):
+        for position, chunk_id in enumerate(open_chunks):
+            # +1 for the comma separating it from the previous message
+            if used[chunk_id] + 1 + size <= max_bytes:
+                chunks[chunk_id].append(index)
+                used[chunk_id] += 1 + size
+                if len(chunks[chunk_id]) >= max_count:
+                    del open_chunks[position]
+                break
+        else:
+            if ENVELOPE_BYTES + size > max_bytes:
+                logger.warning(
+                    f"Message {index} is {size} bytes, over the {max_bytes}-byte "
+                    "request limit; sending it alone"
+                )
+            chunks.append([index])
+            used.append(ENVELOPE_BYTES + size)
+            if max_count > 1:
+                open_chunks.append(len(chunks) - 1)
+    return chunks
+
+
+def fixed_chunk_requests(sizes: list[int], max_count: int, max_bytes: int) -> int:
+    """
+    Requests needed by fixed-count chunks small enough for the largest
+    message to fill every slot: the count-only alternative that never
+    exceeds `max_bytes`.
+    """
+    if not sizes:
+        return 0
+    per_request = (max_bytes - ENVELOPE_BYTES) // (max(sizes) + 1)
+    per_request = max(1, min(max_count, per_request))
+    return -(-len(sizes) // per_request)
@@ -0,0 +1,78 @@
+# email_sender/render_cache.py
+import sys
+from collections import OrderedDict
+
+from config import settings
+from log import logger
+
+
+class RenderCache:
+    """
+    Byte-bounded LRU of rendered (text, html) bodies.
+
+    First names repeat heavily across a cohort, so most learners share a
+    rendering already made for someone else. Entries are keyed on the
+    template's own body strings plus every personalization variable, so
+    tenants with different templates of the same name never share bodies and
+    new variables only need to be passed to `render`. Size is the memory
+    held by the rendered strings; least recently used bodies are evicted
+    beyond `max_bytes` (0 disables caching).
+    """
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, tuple[str, str, int]] = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def render(self, template: dict, **variables: str) -> tuple[str, str]:
+        """(text, html) for `template` formatted with `variables`."""
+        body = template["body"]
+        html = template.get("html", body)
+        key = (body, html, *sorted(variables.items()))
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+        self.misses += 1
+        text, rendered_html = body.format(**variables), html.format(**variables)
+        size = sys.getsizeof(text) + sys.getsizeof(rendered_html)
+        if size <= self.max_bytes:
+            self._entries[key] = (text, rendered_html, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+        return text, rendered_html
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+
+_cache: RenderCache | None = None
+
+
+def render_cache() -> RenderCache:
+    """The process-wide cache, sized by RENDER_CACHE_BYTES on first use."""
+    global _cache
+    if _cache is None:
+        _cache = RenderCache(settings.render_cache_bytes)
+        logger.debug(f"Render cache of {settings.render_cache_bytes} bytes created")
+    return _cache
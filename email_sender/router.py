@@ -0,0 +1,220 @@
+# email_sender/router.py
+import json
+import time
+from typing import Callable
+
+from config import current_settings, settings, settings_scope
+from log import logger
+from email_sender.backends import EmailBackend, create_email_backend
+
+
+class Provider:
+    """One backend behind the router, with its weight and health statistics."""
+
+    def __init__(self, name: str, backend: EmailBackend, weight: int = 1) -> None:
+        self.name = name
+        self.backend = backend
+        self.weight = max(1, weight)
+        self.current = 0  # smooth weighted round-robin state
+        self.requests = 0
+        self.failures = 0
+        self.messages = 0
+        self.error_rate = 0.0  # EWMA of failed requests
+        self.latency = 0.0  # EWMA of request seconds
+        self.ejected_until: float | None = None
+        self.probing = False
+
+    def state(self, now: float) -> str:
+        if self.ejected_until is None:
+            return "healthy"
+        return "ejected" if now < self.ejected_until else "half-open"
+
+    def stats(self, now: float) -> dict:
+        return {
+            "state": self.state(now),
+            "weight": self.weight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "messages": self.messages,
+            "error_rate": round(self.error_rate, 4),
+            "latency_ms": round(self.latency * 1000, 1),
+        }
+
+
+class EmailRouter:
+    """
+    Email backend spreading groups of messages over several providers
+    (Mailjet accounts, SMTP relays) by smooth weighted round-robin.
+
+    Each provider keeps moving averages of its error rate and latency. One
+    whose error rate passes `max_error_rate`, or whose latency passes
+    `max_latency` seconds, is ejected for `cooldown` seconds; after that a
+    single probe group decides whether it comes back. A group that raises
+    (after the backend's own transient retries) or is rejected as a whole
+    fails over to the next provider, so an outage at one costs one attempt
+    per group rather than the batch. Partial rejections are per-recipient
+    verdicts and are returned as they are.
+    """
+
+    name = "router"
+
+    def __init__(
+        self,
+        providers: list[Provider],
+        max_error_rate: float = 0.5,
+        max_latency: float = 10.0,
+        cooldown: float = 60.0,
+        min_requests: int = 3,
+        smoothing: float = 0.2,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if not providers:
+            raise ValueError("EmailRouter needs at least one provider")
+        self.providers = providers
+        self.max_error_rate = max_error_rate
+        self.max_latency = max_latency
+        self.cooldown = cooldown
+        self.min_requests = min_requests
+        self.smoothing = smoothing
+        self._clock = clock
+        self.failovers = 0
+        self.max_messages = min(p.backend.max_messages for p in providers)
+        self.max_request_bytes = min(p.backend.max_request_bytes for p in providers)
+
+    def _available(self, now: float, exclude: set[str]) -> list[Provider]:
+        candidates = [p for p in self.providers if p.name not in exclude]
+        usable = [
+            p
+            for p in candidates
+            if p.state(now) == "healthy"
+            or (p.state(now) == "half-open" and not p.probing)
+        ]
+        if usable or not candidates:
+            return usable
+        # Everything is ejected: the one that comes back first beats failing
+        return [min(candidates, key=lambda p: p.ejected_until)]
+
+    def _pick(self, exclude: set[str]) -> Provider | None:
+        candidates = self._available(self._clock(), exclude)
+        if not candidates:
+            return None
+        total = sum(p.weight for p in candidates)
+        for provider in candidates:
+            provider.current += provider.weight
+        chosen = max(candidates, key=lambda p: p.current)
+        chosen.current -= total
+        return chosen
+
+    def _record(self, provider: Provider, failed: bool, seconds: float) -> None:
+        alpha = self.smoothing
+        provider.requests += 1
+        provider.failures += failed
+        provider.error_rate += alpha * (failed - provider.error_rate)
+        provider.latency += alpha * (seconds - provider.latency)
+        now = self._clock()
+        if provider.probing:
+            provider.probing = False
+            if failed:
+                provider.ejected_until = now + self.cooldown
+                logger.warning(f"Email provider {provider.name} failed its probe")
+                return
+            provider.ejected_until = None
+            provider.error_rate = 0.0
+            logger.info(f"Email provider {provider.name} is healthy again")
+            return
+        if provider.ejected_until is not None or provider.requests < self.min_requests:
+            return
+        reason = None
+        if provider.error_rate > self.max_error_rate:
+            reason = f"error rate {provider.error_rate:.0%}"
+        elif provider.latency > self.max_latency:
+            reason = f"latency {provider.latency:.1f}s"
+        if reason is not None:
+            provider.ejected_until = now + self.cooldown
+            logger.warning(
+                f"Ejecting email provider {provider.name} for {self.cooldown:g}s "
+                f"({reason})"
+            )
+
+    async def send(self, messages: list[dict], batch_id: str) -> list[bool]:
+        tried: set[str] = set()
+        error: BaseException | None = None
+        while (provider := self._pick(tried)) is not None:
+            tried.add(provider.name)
+            if provider.state(self._clock()) == "half-open":
+                provider.probing = True
+            started = self._clock()
+            try:
+                results = await provider.backend.send(messages, batch_id)
+            except Exception as e:
+                self._record(provider, True, self._clock() - started)
+                error = e
+            except BaseException:
+                # Cancelled (e.g. at shutdown): no verdict on the provider
+                provider.probing = False
+                raise
+            else:
+                failed = not any(results)
+                self._record(provider, failed, self._clock() - started)
+                if not failed:
+                    provider.messages += sum(results)
+                    return results
+                error = None
+            if len(tried) < len(self.providers):
+                self.failovers += 1
+                logger.warning(
+                    f"Batch {batch_id} failed on {provider.name}; failing over"
+                )
+        if error is not None:
+            raise error
+        return [False] * len(messages)
+
+    def stats(self) -> dict:
+        now = self._clock()
+        return {
+            "failovers": self.failovers,
+            "providers": {p.name: p.stats(now) for p in self.providers},
+        }
+
+    async def aclose(self) -> None:
+        for provider in self.providers:
+            await provider.backend.aclose()
+
+
+def load_router(path: str) -> EmailRouter:
+    """
+    Build a router from a JSON list of providers:
+    {"name": ..., "weight": 2, <setting overrides>}.
+
+    Overrides are Settings fields applied while that provider's backend is
+    created, e.g. {"email_backend": "mailjet", "mailjet_api_key": "${KEY_B}",
+    "mailjet_api_secret": "${SECRET_B}"} or an SMTP relay's smtp_* fields.
+    """
+    from campaigns import tenant_settings
+
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"{path} must contain a non-empty JSON list of providers")
+
+    providers: list[Provider] = []
+    names: set[str] = set()
+    for index, entry in enumerate(entries):
+        overrides = dict(entry)
+        name = str(overrides.pop("name", "") or f"provider-{index + 1}")
+        if name in names:
+            raise ValueError(f"Duplicate email provider name {name!r} in {path}")
+        names.add(name)
+        weight = int(overrides.pop("weight", 1))
+        scoped = tenant_settings(
+            {"email_providers_path": None, **overrides}, base=current_settings()
+        )
+        with settings_scope(scoped):
+            providers.append(Provider(name, create_email_backend(), weight))
+    logger.info(f"Loaded {len(providers)} email providers from {path}")
+    return EmailRouter(
+        providers,
+        max_error_rate=settings.router_max_error_rate,
+        max_latency=settings.router_max_latency,
+        cooldown=settings.router_cooldown,
+    )
@@ -1,4 +1,8 @@
 # email_sender/templates.py
+import json
+from functools import lru_cache
+
+from config import settings
 
 INACTIVE_TEMPLATE = {
     "subject": "We’ve missed you on 3MTT — let’s get you back on track",
@@ -88,3 +92,165 @@ The 3MTT Support Team
 </html>
 """,
 }
+
+
+NEVER_LOGGED_IN_TEMPLATE = {
+    "subject": "Your 3MTT learning dashboard is ready — let’s get started",
+    "body": """\
+Hello {first_name},
+
+Your place on the 3MTT programme is confirmed, but it looks like you haven’t logged into your Darey.io learning dashboard yet. Your first module is waiting for you.
+
+Here’s how to get started:
+- Log in to your LMS here → https://3mtt.academy.darey.io/
+- Complete your profile and open your first module
+- Set aside 30 minutes today for your first lesson
+
+The first step is the most important one — we’re here to help you take it.
+
+[Start Learning Now]
+
+Welcome aboard,
+
+The 3MTT Support Team
+""",
+    "html": """\
+<html>
+  <body style="font-family: Arial, sans-serif; background-color: #DFFFD6; padding: 20px;">
+    <div style="max-width: 600px; margin: auto; background-color: white; padding: 20px; border-radius: 8px;">
+      <h2 style="color: #4CAF50;">Hello {first_name},</h2>
+      <p>Your place on the 3MTT programme is confirmed, but it looks like you haven’t logged into your Darey.io learning dashboard yet. Your first module is waiting for you.</p>
+      <p><strong>Here’s how to get started:</strong></p>
+      <ul>
+        <li>Log in to your LMS here → <a href="https://3mtt.academy.darey.io/">3MTT Dashboard</a></li>
+        <li>Complete your profile and open your first module</li>
+        <li>Set aside 30 minutes today for your first lesson</li>
+      </ul>
+      <p>The first step is the most important one — we’re here to help you take it.</p>
+      <p style="margin: 20px 0;">
+        <a href="https://3mtt.academy.darey.io/" style="background-color: #A8E6A1; color: #000; padding: 10px 15px; text-decoration: none; border-radius: 5px;">Start Learning Now</a>
+      </p>
+      <p style="margin-top: 20px;">Welcome aboard,<br><strong>The 3MTT Support Team</strong></p>
+    </div>
+  </body>
+</html>
+""",
+}
+
+
+STALLED_TEMPLATE = {
+    "subject": "You’re almost there — finish your 3MTT programme",
+    "body": """\
+Hello {first_name},
+
+You’ve completed over 90% of your 3MTT programme — that’s a huge achievement! We noticed you haven’t logged in for a while, and only a few steps stand between you and completion.
+
+Here’s how to cross the finish line:
+- Log in to your LMS here → https://3mtt.academy.darey.io/
+- Pick up the remaining modules from your dashboard
+- Submit any outstanding assessments
+
+You’ve done the hard work already. Let’s finish strong together.
+
+[Complete My Programme]
+
+Almost there,
+
+The 3MTT Support Team
+""",
+    "html": """\
+<html>
+  <body style="font-family: Arial, sans-serif; background-color: #DFFFD6; padding: 20px;">
+    <div style="max-width: 600px; margin: auto; background-color: white; padding: 20px; border-radius: 8px;">
+      <h2 style="color: #4CAF50;">Hello {first_name},</h2>
+      <p>You’ve completed over 90% of your 3MTT programme — that’s a huge achievement! We noticed you haven’t logged in for a while, and only a few steps stand between you and completion.</p>
+      <p><strong>Here’s how to cross the finish line:</strong></p>
+      <ul>
+        <li>Log in to your LMS here → <a href="https://3mtt.academy.darey.io/">3MTT Dashboard</a></li>
+        <li>Pick up the remaining modules from your dashboard</li>
+        <li>Submit any outstanding assessments</li>
+      </ul>
+      <p>You’ve done the hard work already. Let’s finish strong together.</p>
+      <p style="margin: 20px 0;">
+        <a href="https://3mtt.academy.darey.io/" style="background-color: #A8E6A1; color: #000; padding: 10px 15px; text-decoration: none; border-radius: 5px;">Complete My Programme</a>
+      </p>
+      <p style="margin-top: 20px;">Almost there,<br><strong>The 3MTT Support Team</strong></p>
+    </div>
+  </body>
+</html>
+""",
+}
+
+
+NEW_THIS_WEEK_TEMPLATE = {
+    "subject": "Welcome to 3MTT — make the most of your first week",
+    "body": """\
+Hello {first_name},
+
+Welcome to the 3MTT programme! Your first week sets the pace for the rest of your journey, so here are a few tips to start strong.
+
+Make the most of your first week:
+- Log in to your LMS here → https://3mtt.academy.darey.io/
+- Explore the Knowledge Base and your programme outline
+- Plan a regular time each day for learning
+
+We’re excited to have you with us and we’re here to support you every step of the way.
+
+[Go to My Dashboard]
+
+Welcome to the community,
+
+The 3MTT Support Team
+""",
+    "html": """\
+<html>
+  <body style="font-family: Arial, sans-serif; background-color: #DFFFD6; padding: 20px;">
+    <div style="max-width: 600px; margin: auto; background-color: white; padding: 20px; border-radius: 8px;">
+      <h2 style="color: #4CAF50;">Hello {first_name},</h2>
+      <p>Welcome to the 3MTT programme! Your first week sets the pace for the rest of your journey, so here are a few tips to start strong.</p>
+      <p><strong>Make the most of your first week:</strong></p>
+      <ul>
+        <li>Log in to your LMS here → <a href="https://3mtt.academy.darey.io/">3MTT Dashboard</a></li>
+        <li>Explore the Knowledge Base and your programme outline</li>
+        <li>Plan a regular time each day for learning</li>
+      </ul>
+      <p>We’re excited to have you with us and we’re here to support you every step of the way.</p>
+      <p style="margin: 20px 0;">
+        <a href="https://3mtt.academy.darey.io/" style="background-color: #A8E6A1; color: #000; padding: 10px 15px; text-decoration: none; border-radius: 5px;">Go to My Dashboard</a>
+      </p>
+      <p style="margin-top: 20px;">Welcome to the community,<br><strong>The 3MTT Support Team</strong></p>
+    </div>
+  </body>
+</html>
+""",
+}
+
+
+# Template name -> template, as referenced by segment rules
+TEMPLATES = {
+    "inactive": INACTIVE_TEMPLATE,
+    "low_score": LOW_SCORE_TEMPLATE,
+    "never_logged_in": NEVER_LOGGED_IN_TEMPLATE,
+    "stalled": STALLED_TEMPLATE,
+    "new_this_week": NEW_THIS_WEEK_TEMPLATE,
+}
+
+
+@lru_cache(maxsize=32)
+def load_templates(path: str) -> dict[str, dict]:
+    """Read a JSON file of {name: {subject, body, html}} template overrides."""
+    with open(path, encoding="utf-8") as f:
+        templates = json.load(f)
+    for name, template in templates.items():
+        if not {"subject", "body"} <= template.keys():
+            raise ValueError(f"Template {name!r} in {path} needs subject and body")
+    return templates
+
+
+def get_template(name: str) -> dict | None:
+    """Template by name; TEMPLATES_PATH entries (per tenant) take precedence."""
+    if settings.templates_path:
+        template = load_templates(settings.templates_path).get(name)
+        if template is not None:
+            return template
+    return TEMPLATES.get(name)
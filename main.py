@@ -1,10 +1,10 @@
 # main.py
 import asyncio
+import time
 import uuid
+from contextlib import aclosing
 
 from log import setup_logging, logger, set_request_id, clear_request_id
-from email_sender.mailjet_client import send_batch_emails
-from data_processing.filters import stream_filtered_batches
 
 setup_logging()
 
@@ -12,21 +12,177 @@ setup_logging()
 # For DRY RUN purposes, replace send_batch_emails with a mock function
 async def dry_send_batch_emails(learners, template_type):
     logger.info(f"[DRY RUN] Would send {len(learners)} {template_type} emails")
+    return learners
+
+
+async def run_workflow() -> dict:
+    """
+    Download, classify and email learners once, under the settings in effect
+    (the global ones, or a campaign tenant's), within the RUN_MAX_* budgets.
+    Returns the run summary (controller snapshot plus budget usage).
+    """
+    # Heavy imports (pydantic settings, httpx, tenacity, pipeline modules) are
+    # deferred to the first run so importing this module stays cheap
+    from config import settings
+    from email_sender.backends import create_email_backend, use_email_backend
+    from email_sender.mailjet_client import send_batch_emails
+    from email_sender.render_cache import render_cache
+    from data_processing.analytics import create_run_analytics, write_report
+    from data_processing.filters import default_batch_size, stream_filtered_batches
+    from data_processing.sources import create_learner_source
+    from data_processing.reminder_state import create_reminder_throttle
+    from utils.batching import AdaptiveBatchController
+    from utils.budget import (
+        create_run_budget,
+        read_checkpoint,
+        use_budget,
+        write_checkpoint,
+    )
+    from utils.retry import (
+        CircuitOpenError,
+        create_retry_guard,
+        current_retry_guard,
+        use_retry_guard,
+    )
+
+    batch_size = default_batch_size()
+    controller = AdaptiveBatchController(
+        page_size=batch_size,
+        batch_size=batch_size,
+        min_size=settings.adaptive_min_size,
+        max_size=settings.adaptive_max_size,
+        target_memory_fraction=settings.memory_fraction,
+    )
+
+    source = create_learner_source(page_size=batch_size, controller=controller)
+    throttle = create_reminder_throttle()
+    budget = create_run_budget()
+    # Campaign tenants share one guard (see campaigns.run_campaigns)
+    retry_guard = current_retry_guard() or create_retry_guard()
+    analytics = create_run_analytics()
+    # One backend per run, so SMTP sessions / HTTP connections stay warm
+    email_backend = create_email_backend()
+
+    checkpoint_path = settings.run_checkpoint_path
+    previous = read_checkpoint(checkpoint_path) if checkpoint_path else None
+    if previous and not previous.get("completed", True):
+        logger.info(
+            f"Previous run stopped early ({previous.get('stop_reason')}) after "
+            f"{previous.get('emails_sent')} emails; continuing from there"
+        )
+        if throttle is None:
+            logger.warning(
+                "REMINDER_STATE_PATH is unset: learners mailed by the previous "
+                "run will be mailed again"
+            )
+
+    try:
+        with (
+            use_budget(budget),
+            use_email_backend(email_backend),
+            use_retry_guard(retry_guard),
+        ):
+            async with aclosing(
+                stream_filtered_batches(
+                    controller, source, throttle=throttle, analytics=analytics
+                )
+            ) as batches:
+                async for learners_batch, template_type in batches:
+                    allowed = budget.email_allowance(
+                        len(learners_batch), per_call=settings.mailjet_max_messages
+                    )
+                    if allowed == 0:
+                        break
+                    # Batches leave most urgent first: trimming drops the least
+                    learners_batch = learners_batch[:allowed]
+                    started = time.perf_counter()
+                    try:
+                        delivered = await send_batch_emails(
+                            learners_batch, template_type=template_type
+                        )
+                        controller.record_send(
+                            len(learners_batch), time.perf_counter() - started
+                        )
+                    except Exception as e:
+                        controller.record_failure("send")
+                        logger.error(
+                            f"Failed to send batch emails ({template_type}): {e}"
+                        )
+                        # Chunks that did go out before the failure still count
+                        delivered = getattr(e, "delivered", [])
+                        errors = getattr(e, "errors", [e])
+                        if budget.stop_reason is None and any(
+                            isinstance(error, CircuitOpenError) for error in errors
+                        ):
+                            # Mailjet is down: stop rather than fail every batch;
+                            # unsent learners are picked up by the next run
+                            budget.stop_reason = "circuit_open"
+                    budget.record_emails(len(delivered))
+                    # Test-mode sends go to TEST_EMAIL_ADDRESS, not the learners
+                    if throttle is not None and not settings.test_mode:
+                        throttle.mark_reminded(delivered, template_type)
+                    if budget.exhausted():
+                        break
+    finally:
+        # Also on errors and cancellation: learners already mailed must be
+        # recorded, or the next run would email them again. Reminder state
+        # is the checkpoint: the next run skips learners mailed here.
+        if throttle is not None:
+            throttle.flush()
+            throttle.store.close()
+        await email_backend.aclose()
+
+    summary = {
+        **controller.snapshot(),
+        **budget.summary(),
+        "render_cache": render_cache().stats(),
+        "retries": retry_guard.stats(),
+    }
+    if hasattr(email_backend, "stats"):
+        summary["email_providers"] = email_backend.stats()
+    if checkpoint_path:
+        write_checkpoint(checkpoint_path, summary)
+    if analytics is not None:
+        write_report(settings.analytics_report_path, analytics.report(summary))
+    logger.bind(**summary).info(
+        "Workflow completed"
+        if budget.stop_reason is None
+        else f"Workflow stopped early ({budget.stop_reason})"
+    )
+    return summary
+
+
+async def run_once() -> dict:
+    """One reminder run: every campaign tenant when CAMPAIGNS_PATH is set."""
+    from config import settings
+
+    if settings.campaigns_path:
+        from campaigns import load_campaigns, run_campaigns
+
+        results = await run_campaigns(
+            load_campaigns(settings.campaigns_path), run_workflow
+        )
+        failed = [name for name, r in results.items() if isinstance(r, BaseException)]
+        if failed:
+            raise RuntimeError(f"Campaigns failed for: {', '.join(failed)}")
+        return results
+    return await run_workflow()
 
 
 async def main():
+    from utils.shutdown import install_signal_handlers
+
     # Assign a request ID for structured logging
     set_request_id(str(uuid.uuid4()))
+    # SIGTERM / SIGINT (e.g. a cancelled CI job) stop the run gracefully:
+    # in-flight sends drain, reminder state and the checkpoint are saved
+    install_signal_handlers()
     logger.info("Starting 3MTT learner email reminder workflow")
-
-    async for learners_batch, template_type in stream_filtered_batches():
-        try:
-            await send_batch_emails(learners_batch, template_type=template_type)
-        except Exception as e:
-            logger.error(f"Failed to send batch emails ({template_type}): {e}")
-
-    logger.info("Workflow completed")
-    clear_request_id()
+    try:
+        await run_once()
+    finally:
+        await logger.complete()
+        clear_request_id()
 
 
 if __name__ == "__main__":
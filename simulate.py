@@ -0,0 +1,101 @@
+# simulate.py
+"""
+What-if send volumes for other INACTIVE_DAYS / LOW_SCORE_THRESHOLD values.
+
+Usage:
+    uv run python simulate.py snapshots/*.ndjson \
+        [--inactive-days 7 14 21 30] [--thresholds 30 40 50 60] [--json]
+
+Each snapshot (NDJSON, Parquet or SQLite, e.g. weekly copies of
+LEARNER_CACHE_PATH) is read once, deduplicated and address-checked as in a
+run, and the segment rules (SEGMENT_RULES_PATH or the defaults) are
+evaluated for the whole grid at once (see data_processing/whatif.py).
+Prints the average weekly emails per pair of settings, the current ones
+marked with *. Reminder throttling is not modelled. A date in the file name (e.g.
+learners-2025-09-01.ndjson) says when the snapshot was taken, else its
+modification time is used. Needs numpy (dev dependency group).
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime, timezone
+
+from config import settings
+from data_processing.whatif import simulate
+
+
+def format_table(days, thresholds, volumes, current: tuple[float, float]) -> str:
+    """Rows per inactive_days, columns per threshold; `current` marked with *."""
+    width = max(8, *(len(f"{value:,.0f}") + 2 for value in volumes.flat))
+    header = "days \\ score" + "".join(f"{t:>{width}g}" for t in thresholds)
+    lines = [header]
+    for row, day in enumerate(days):
+        cells = ""
+        for col, threshold in enumerate(thresholds):
+            mark = "*" if (day, threshold) == current else " "
+            cells += f"{volumes[row, col]:>{width - 1},.0f}{mark}"
+        lines.append(f"{day:>12g}" + cells)
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("snapshots", nargs="+")
+    parser.add_argument(
+        "--inactive-days", type=float, nargs="+", default=[7, 14, 21, 30, 45, 60]
+    )
+    parser.add_argument(
+        "--thresholds", type=float, nargs="+", default=[20, 30, 40, 50, 60, 70]
+    )
+    parser.add_argument("--json", action="store_true", help="machine-readable output")
+    args = parser.parse_args()
+
+    results = asyncio.run(simulate(args.snapshots, args.inactive_days, args.thresholds))
+    if not results:
+        return 1
+    first = results[0][2]
+    average = sum(matrix.total for _, _, matrix in results) / len(results)
+
+    if args.json:
+        print(
+            json.dumps(
+                {
+                    "inactive_days": first.inactive_days.tolist(),
+                    "thresholds": first.thresholds.tolist(),
+                    "average_total": average.tolist(),
+                    "snapshots": [
+                        {
+                            "path": path,
+                            "as_of": datetime.fromtimestamp(
+                                as_of, timezone.utc
+                            ).isoformat(),
+                            "segments": {
+                                segment: volumes.tolist()
+                                for segment, volumes in matrix.segments.items()
+                            },
+                            "total": matrix.total.tolist(),
+                        }
+                        for path, as_of, matrix in results
+                    ],
+                }
+            )
+        )
+        return 0
+
+    current = (float(settings.inactive_days), float(settings.low_score_threshold))
+    days, thresholds = first.inactive_days.tolist(), first.thresholds.tolist()
+    for path, as_of, matrix in results:
+        line = f"{datetime.fromtimestamp(as_of, timezone.utc).date()}  {path}"
+        if current[0] in days and current[1] in thresholds:
+            emails = matrix.total[days.index(current[0]), thresholds.index(current[1])]
+            line += f": {emails:,} emails at the current settings"
+        print(line)
+    print(f"\nAverage emails per snapshot over {len(results)} snapshot(s):\n")
+    print(format_table(days, thresholds, average, current))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
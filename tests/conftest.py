@@ -13,6 +13,59 @@ def settings():
     return app_settings
 
 
+class FakeClock:
+    """Monotonic clock stand-in: tests move time by changing `now`."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class PagedSource:
+    """In-memory LearnerSource serving fixed pages."""
+
+    def __init__(self, pages: list[list[dict]]):
+        self._pages = pages
+
+    async def pages(self):
+        for page in self._pages:
+            yield page
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    """A fake clock starting at 0, advanced by hand."""
+    return FakeClock()
+
+
+@pytest.fixture
+def paged_source() -> type[PagedSource]:
+    """Factory for in-memory learner sources: `paged_source([page, ...])`."""
+    return PagedSource
+
+
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    """Cached bearer tokens must not leak between tests."""
+    from data_processing.downloader import forget_token
+
+    forget_token()
+    yield
+    forget_token()
+
+
+@pytest.fixture(autouse=True)
+def reset_shutdown():
+    """A shutdown requested by one test must not stop the next."""
+    from utils.shutdown import shutdown
+
+    shutdown.reset()
+    yield
+    shutdown.reset()
+
+
 @pytest.fixture
 def mock_get_bearer_token(monkeypatch):
     """Fixture to mock get_bearer_token to always return a fixed token."""
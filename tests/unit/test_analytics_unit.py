@@ -0,0 +1,145 @@
+# tests/unit/test_analytics_unit.py
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import charts
+from data_processing.analytics import (
+    Histogram,
+    QuantileSketch,
+    RunAnalytics,
+    write_report,
+)
+from data_processing.filters import stream_filtered_batches
+from data_processing.rules import compile_rules
+
+pytestmark = pytest.mark.unit
+
+NOW = time.time()
+
+
+def _learner(_id, days_ago=None, progress=0, email="x@test.com"):
+    login = None
+    if days_ago is not None:
+        login = (
+            datetime.fromtimestamp(NOW, timezone.utc) - timedelta(days=days_ago)
+        ).isoformat()
+    return {
+        "_id": _id,
+        "email": email,
+        "last_loggedin_date": login,
+        "program_data": {"progress_status": progress},
+    }
+
+
+def test_histogram_bins_values_by_left_edge():
+    hist = Histogram((0, 10, 100))
+    for value in (0, 9.9, 10, 99, 100, -1):
+        hist.add(value)
+    assert hist.counts == [2, 2]
+
+
+def test_quantile_sketch_within_relative_accuracy():
+    rng = random.Random(7)
+    values = [rng.expovariate(1 / 30) for _ in range(20_000)] + [0.0] * 500
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+
+    ordered = sorted(values)
+    for q in (0.5, 0.9, 0.99):
+        exact = ordered[round(q * (len(ordered) - 1))]
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.02)
+    assert sketch.quantile(0.01) == 0.0
+    # Memory follows the value range, not the number of values
+    assert len(sketch.buckets) < 1000
+    assert QuantileSketch().quantile(0.5) is None
+
+
+def test_run_analytics_counts_categories_and_distributions():
+    analytics = RunAnalytics(now=NOW, inactive_days=14, low_score_threshold=50)
+    page = [
+        _learner("1", days_ago=30, progress=20),  # inactive
+        _learner("2", days_ago=2, progress=10),  # low_progress
+        _learner("3", days_ago=2, progress=70),  # active
+        _learner("4", days_ago=90, progress=100),  # completed
+        _learner("5", progress=0),  # never logged in -> inactive
+        _learner("6", days_ago=1, email=None),  # skipped
+    ]
+    analytics.observe(page, {"inactive": page[:1] + page[4:5], "low_score": page[1:2]})
+
+    report = analytics.report({"emails_sent": 3})
+    assert report["total"] == 6 and report["skipped"] == 1
+    assert report["never_logged_in"] == 1
+    assert report["categories"] == {
+        "inactive": 2,
+        "low_progress": 1,
+        "active": 1,
+        "completed": 1,
+    }
+    assert report["segments"] == {"inactive": 2, "low_score": 1}
+    assert report["progress_histogram"]["counts"][-1] == 1  # the 100% learner
+    assert sum(report["inactivity_days_histogram"]["counts"]) == 4
+    assert report["inactivity_days_histogram"]["edges"][-1] is None  # open-ended
+    assert report["inactivity_days_quantiles"]["p50"] == pytest.approx(2, rel=0.05)
+    assert report["run"] == {"emails_sent": 3}
+    json.dumps(report)  # serializable as is
+
+
+@pytest.mark.asyncio
+async def test_stream_feeds_analytics_with_the_whole_population(
+    mocker, settings, paged_source
+):
+    mocker.patch.object(settings, "send_queue_size", 0)
+    pages = [
+        [_learner(str(i), days_ago=30, email=f"u{i}@test.com") for i in range(3)],
+        [
+            _learner(str(i), days_ago=1, progress=100, email=f"u{i}@test.com")
+            for i in range(3, 5)
+        ],
+    ]
+    analytics = RunAnalytics(now=NOW, inactive_days=14, low_score_threshold=50)
+
+    batches = [
+        batch
+        async for batch in stream_filtered_batches(
+            source=paged_source(pages),
+            classifier=compile_rules(now=NOW),
+            analytics=analytics,
+        )
+    ]
+
+    assert sum(len(batch) for batch, _ in batches) == 3
+    # Completed learners are not mailed but still counted
+    assert analytics.total == 5
+    assert analytics.categories["completed"] == 2
+    assert analytics.segments["inactive"] == 3
+
+
+def test_report_round_trip_and_chart_counts(tmp_path):
+    analytics = RunAnalytics(now=NOW, inactive_days=14, low_score_threshold=50)
+    analytics.observe([_learner("1", days_ago=30), _learner("2", days_ago=1)], {})
+    path = tmp_path / "reports" / "latest.json"
+
+    write_report(str(path), analytics.report())
+
+    report = charts.load_report(str(path))
+    # Empty categories are left out of the charts
+    assert charts.category_counts(report) == (["inactive", "low_progress"], [1, 1])
+
+
+def test_render_charts_writes_pngs(tmp_path):
+    pytest.importorskip("matplotlib")
+    analytics = RunAnalytics(now=NOW, inactive_days=14, low_score_threshold=50)
+    analytics.observe([_learner("1", days_ago=30), _learner("2", days_ago=1)], {})
+
+    paths = charts.render_charts(analytics.report(), str(tmp_path))
+
+    assert [p.rsplit("/", 1)[-1] for p in paths] == [
+        "learners_bar.png",
+        "learners_donut.png",
+    ]
+    assert (tmp_path / "learners_donut.png").stat().st_size > 0
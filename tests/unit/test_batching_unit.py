@@ -0,0 +1,83 @@
+# tests/unit/test_batching_unit.py
+import pytest
+
+from utils.batching import AdaptiveBatchController, aligned_page_size
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture
+def controller(mocker):
+    """Controller with a fixed 5% budget of 1 GB as its memory headroom."""
+    memory = mocker.Mock()
+    memory.headroom.return_value = int((1 << 30) * 0.05)
+    memory.snapshot.return_value = {}
+    return AdaptiveBatchController(
+        page_size=200, batch_size=200, step=50, memory=memory
+    )
+
+
+@pytest.mark.parametrize(
+    "offset,target,step,expected",
+    [
+        (0, 300, 50, 300),  # start of stream: any multiple works
+        (200, 300, 50, 200),  # 300 does not divide 200, 250 neither
+        (600, 300, 50, 300),
+        (150, 1000, 50, 150),
+        (50, 49, 50, 50),  # never below one step
+    ],
+)
+def test_aligned_page_size(offset, target, step, expected):
+    assert aligned_page_size(offset, target, step) == expected
+
+
+def test_additive_increase_when_latency_stable(controller):
+    controller.record_page(200, 100_000, 1.0)
+    controller.record_page(250, 125_000, 1.25)
+    assert controller.page_size == 300
+
+
+def test_multiplicative_decrease_on_latency_spike(controller):
+    controller.record_page(200, 100_000, 1.0)
+    assert controller.page_size == 250
+    # 4x slower per learner than the moving average
+    controller.record_page(250, 125_000, 5.0)
+    assert controller.page_size == 125
+
+
+def test_send_batch_size_adapts_independently(controller):
+    controller.record_send(200, 2.0)
+    controller.record_send(250, 2.5)
+    assert controller.batch_size == 300
+    assert controller.page_size == 200
+
+
+def test_failure_halves_size(controller):
+    controller.record_failure("send")
+    assert controller.batch_size == 100
+    controller.record_failure("page")
+    assert controller.page_size == 100
+
+
+def test_observed_record_size_caps_sizes(controller):
+    # 1 GB * 5% = ~53.7 MB budget; 100 KB learners -> 536 learners -> 178 per slot
+    controller.record_page(200, 200 * 100_000, 1.0)
+    controller.bytes_per_learner = 100_000
+    controller.record_send(200, 1.0)
+    assert controller.batch_size <= controller.memory_cap // 3
+    assert controller.snapshot()["bytes_per_learner"] == 100_000
+
+
+def test_sizes_never_below_min(controller):
+    for _ in range(10):
+        controller.record_failure("page")
+    assert controller.page_size == controller.min_size
+
+
+def test_shrinking_headroom_shrinks_sizes(controller):
+    controller.record_send(200, 1.0)
+    assert controller.batch_size == 250
+    controller.memory.headroom.return_value = 150 * 500 * 3
+    controller.record_page(200, 200 * 500, 1.0)
+    assert controller.batch_size == 150
+    assert controller.page_size == 150
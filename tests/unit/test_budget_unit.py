@@ -0,0 +1,124 @@
+# tests/unit/test_budget_unit.py
+import json
+
+import pytest
+
+from data_processing import downloader
+from utils.budget import (
+    RunBudget,
+    budget_exhausted,
+    charge_api_call,
+    read_checkpoint,
+    use_budget,
+    write_checkpoint,
+)
+
+pytestmark = pytest.mark.unit
+
+
+def test_time_budget(clock):
+    budget = RunBudget(max_seconds=60, clock=clock)
+    assert budget.exhausted() is None
+    clock.now += 60
+    assert budget.exhausted() == "time"
+    assert budget.summary()["completed"] is False
+
+
+def test_email_allowance_respects_email_and_call_limits():
+    budget = RunBudget(max_emails=120, max_api_calls=5)
+    assert budget.email_allowance(100) == 100
+    budget.record_emails(100)
+    budget.charge_api_call(4)
+    assert budget.email_allowance(100) == 20  # 20 emails left
+    budget.record_emails(20)
+    assert budget.email_allowance(1) == 0
+    assert budget.stop_reason == "emails"
+
+
+def test_api_call_allowance_counts_mailjet_chunks():
+    budget = RunBudget(max_api_calls=3)
+    budget.charge_api_call(2)
+    assert budget.email_allowance(500) == 50  # one more call of 50 messages
+
+
+def test_unlimited_budget_never_exhausts():
+    budget = RunBudget()
+    budget.charge_api_call(10_000)
+    budget.record_emails(10_000)
+    assert budget.exhausted() is None
+    assert budget.email_allowance(7) == 7
+
+
+def test_module_helpers_use_scoped_budget():
+    charge_api_call()  # no budget: no-op
+    assert budget_exhausted() is None
+    budget = RunBudget(max_api_calls=1)
+    with use_budget(budget):
+        charge_api_call()
+        assert budget_exhausted() == "api_calls"
+    assert budget.api_calls == 1
+
+
+def test_checkpoint_roundtrip(tmp_path):
+    path = str(tmp_path / "state" / "last_run.json")
+    assert read_checkpoint(path) is None
+    write_checkpoint(path, {"completed": False, "stop_reason": "emails"})
+    checkpoint = read_checkpoint(path)
+    assert checkpoint["stop_reason"] == "emails" and "finished_at" in checkpoint
+
+    (tmp_path / "bad.json").write_text("{")
+    assert read_checkpoint(str(tmp_path / "bad.json")) is None
+
+
+@pytest.mark.asyncio
+async def test_downloader_stops_when_api_budget_runs_out(mocker):
+    mocker.patch(
+        "data_processing.downloader.get_bearer_token", return_value="fake-token"
+    )
+    response = mocker.Mock()
+    response.raise_for_status.return_value = None
+    response.json.return_value = {"data": {"info": [{"_id": "1"}]}}  # never ends
+    get = mocker.patch(
+        "httpx.AsyncClient.get", new_callable=mocker.AsyncMock, return_value=response
+    )
+
+    with use_budget(RunBudget(max_api_calls=3)):
+        pages = [page async for page in downloader.stream_learner_pages(page_size=1)]
+
+    assert len(pages) == 3
+    assert get.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_run_workflow_stops_at_email_budget_and_checkpoints(
+    mocker, settings, tmp_path, paged_source
+):
+    from main import run_workflow
+
+    learners = [
+        {"_id": str(i), "email": f"u{i}@test.com", "program_data": {}}
+        for i in range(10)
+    ]
+    mocker.patch(
+        "data_processing.sources.create_learner_source",
+        return_value=paged_source([learners[:5], learners[5:]]),
+    )
+    mocker.patch("data_processing.filters.default_batch_size", return_value=4)
+    sent = []
+
+    async def fake_send(batch, template_type):
+        sent.extend(batch)
+        return batch
+
+    mocker.patch("email_sender.mailjet_client.send_batch_emails", new=fake_send)
+    checkpoint = tmp_path / "last_run.json"
+    mocker.patch.object(settings, "run_max_emails", 6)
+    mocker.patch.object(settings, "run_checkpoint_path", str(checkpoint))
+    mocker.patch.object(settings, "reminder_state_path", None)
+    mocker.patch.object(settings, "send_queue_size", 0)
+
+    summary = await run_workflow()
+
+    assert len(sent) == 6
+    assert summary["stop_reason"] == "emails" and summary["emails_sent"] == 6
+    assert json.loads(checkpoint.read_text())["completed"] is False
@@ -0,0 +1,130 @@
+# tests/unit/test_campaigns_unit.py
+import asyncio
+import json
+
+import pytest
+
+from campaigns import Tenant, load_campaigns, run_campaigns, tenant_settings
+from config import settings, settings_scope
+from email_sender.templates import INACTIVE_TEMPLATE, get_template
+from utils.http import http_client
+
+pytestmark = pytest.mark.unit
+
+
+def test_load_campaigns_builds_validated_tenant_settings(tmp_path, monkeypatch):
+    monkeypatch.setenv("COHORT_B_ID", "biz-b")
+    path = tmp_path / "campaigns.json"
+    path.write_text(
+        json.dumps(
+            [
+                {"name": "cohort-a", "business_id": "biz-a", "inactive_days": 7},
+                {"business_id": "${COHORT_B_ID}"},
+            ]
+        )
+    )
+
+    a, b = load_campaigns(str(path))
+
+    assert (a.name, b.name) == ("cohort-a", "tenant-2")
+    assert a.settings.business_id.get_secret_value() == "biz-a"
+    assert a.settings.inactive_days == 7
+    assert b.settings.business_id.get_secret_value() == "biz-b"
+    assert b.settings.inactive_days == settings.inactive_days
+    # Unset fields inherit the global settings
+    assert a.settings.download_url == settings.download_url
+
+
+def test_load_campaigns_rejects_bad_files(tmp_path):
+    path = tmp_path / "campaigns.json"
+    path.write_text(json.dumps([{"name": "x"}, {"name": "x"}]))
+    with pytest.raises(ValueError, match="Duplicate tenant"):
+        load_campaigns(str(path))
+
+    path.write_text(json.dumps([{"name": "x", "inactive_days": "soon"}]))
+    with pytest.raises(ValueError):
+        load_campaigns(str(path))
+
+
+def test_tenant_run_files_are_scoped_per_business(mocker):
+    mocker.patch.object(settings, "run_checkpoint_path", "state/run.json")
+    a = tenant_settings({"business_id": "biz-a"})
+    b = tenant_settings({"business_id": "biz-b"})
+    own = tenant_settings({"business_id": "biz-c", "run_checkpoint_path": "c.json"})
+
+    assert a.run_checkpoint_path.startswith("state/run-")
+    assert a.run_checkpoint_path.endswith(".json")
+    assert a.run_checkpoint_path != b.run_checkpoint_path
+    assert own.run_checkpoint_path == "c.json"
+    assert settings.run_checkpoint_path == "state/run.json"
+
+
+def test_tenant_reports_are_scoped_per_business(mocker):
+    mocker.patch.object(settings, "analytics_report_path", "reports/latest.json")
+    a = tenant_settings({"business_id": "biz-a"})
+    b = tenant_settings({"business_id": "biz-b"})
+
+    assert a.analytics_report_path.startswith("reports/latest-")
+    assert a.analytics_report_path != b.analytics_report_path
+    assert settings.analytics_report_path == "reports/latest.json"
+
+
+def test_settings_scope_overrides_proxy():
+    scoped = tenant_settings({"low_score_threshold": 5})
+    with settings_scope(scoped):
+        assert settings.low_score_threshold == 5
+    assert settings.low_score_threshold != 5
+
+
+def test_get_template_prefers_tenant_templates(tmp_path):
+    path = tmp_path / "templates.json"
+    path.write_text(json.dumps({"inactive": {"subject": "Hi", "body": "Yo"}}))
+    with settings_scope(tenant_settings({"templates_path": str(path)})):
+        assert get_template("inactive")["subject"] == "Hi"
+        assert get_template("low_score") is not None
+    assert get_template("inactive") is INACTIVE_TEMPLATE
+
+
+@pytest.mark.asyncio
+async def test_run_campaigns_isolates_settings_and_shares_pool():
+    tenants = [
+        Tenant(f"t{i}", tenant_settings({"inactive_days": i})) for i in range(1, 4)
+    ]
+    clients = {}
+    running = 0
+    peak = 0
+
+    async def workflow():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)  # let the other tenants interleave
+        async with http_client("darey") as client:
+            clients[settings.inactive_days] = client
+        running -= 1
+        return {"inactive_days": settings.inactive_days}
+
+    results = await run_campaigns(tenants, workflow, concurrency=2)
+
+    assert results == {f"t{i}": {"inactive_days": i} for i in range(1, 4)}
+    assert peak == 2
+    assert len(set(map(id, clients.values()))) == 1  # one shared client
+    assert all(client.is_closed for client in clients.values())
+
+
+@pytest.mark.asyncio
+async def test_run_campaigns_isolates_failures():
+    tenants = [
+        Tenant("ok", tenant_settings({"business_id": "ok"})),
+        Tenant("bad", tenant_settings({"business_id": "bad"})),
+    ]
+
+    async def workflow():
+        if settings.business_id.get_secret_value() == "bad":
+            raise RuntimeError("boom")
+        return {}
+
+    results = await run_campaigns(tenants, workflow)
+
+    assert results["ok"] == {}
+    assert isinstance(results["bad"], RuntimeError)
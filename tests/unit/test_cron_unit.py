@@ -0,0 +1,47 @@
+# tests/unit/test_cron_unit.py
+from datetime import datetime, timezone
+
+import pytest
+
+from utils.cron import CronSchedule
+
+pytestmark = pytest.mark.unit
+
+
+def _at(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize(
+    "expression,moment,expected",
+    [
+        ("0 4 * * *", _at(2025, 1, 1, 3, 59), _at(2025, 1, 1, 4, 0)),
+        ("0 4 * * *", _at(2025, 1, 1, 4, 0), _at(2025, 1, 2, 4, 0)),
+        ("*/15 * * * *", _at(2025, 1, 1, 10, 7, 30), _at(2025, 1, 1, 10, 15)),
+        ("@hourly", _at(2025, 1, 1, 23, 30), _at(2025, 1, 2, 0, 0)),
+        # Monday 04:00; 2025-01-01 is a Wednesday
+        ("0 4 * * 1", _at(2025, 1, 1), _at(2025, 1, 6, 4, 0)),
+        ("0 9 * * 1-5", _at(2025, 1, 3, 10), _at(2025, 1, 6, 9, 0)),
+        ("30 8 1 */3 *", _at(2025, 2, 10), _at(2025, 4, 1, 8, 30)),
+        ("0 0 29 2 *", _at(2025, 3, 1), _at(2028, 2, 29)),
+        # day of month OR weekday when both are restricted (the 15th, or Sundays)
+        ("0 0 15 * 0", _at(2025, 1, 1), _at(2025, 1, 5)),
+        ("0 0 * * 7", _at(2025, 1, 1), _at(2025, 1, 5)),
+        ("0 12 * 12 *", _at(2025, 12, 31, 13), _at(2026, 12, 1, 12)),
+    ],
+)
+def test_next_after(expression, moment, expected):
+    assert CronSchedule(expression).next_after(moment) == expected
+
+
+@pytest.mark.parametrize(
+    "expression", ["* * * *", "60 * * * *", "* 24 * * *", "*/0 * * * *", "a * * * *"]
+)
+def test_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_never_firing_expression():
+    with pytest.raises(ValueError, match="never fires"):
+        CronSchedule("0 0 31 2 *").next_after(_at(2025, 1, 1))
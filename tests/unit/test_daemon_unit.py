@@ -0,0 +1,157 @@
+# tests/unit/test_daemon_unit.py
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from daemon import ReminderDaemon
+from utils.cron import CronSchedule
+from utils.http import current_client_pool
+
+pytestmark = pytest.mark.unit
+
+
+async def _request(port: int, method: str, path: str) -> tuple[int, dict]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, body = raw.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+
+@pytest.fixture
+async def daemon():
+    release = asyncio.Event()
+    pools = []
+
+    async def workflow():
+        pools.append(current_client_pool())
+        await release.wait()
+        return {"emails": 3}
+
+    # Far-future schedule so only manual runs happen
+    instance = ReminderDaemon(workflow, CronSchedule("0 0 1 1 *"), port=0)
+    instance.release, instance.pools = release, pools
+    await instance.start()
+    yield instance
+    release.set()
+    await instance.stop()
+
+
+@pytest.mark.asyncio
+async def test_control_endpoint_triggers_and_reports_runs(daemon):
+    assert await _request(daemon.port, "GET", "/health") == (
+        200,
+        {"status": "ok", "state": "idle"},
+    )
+
+    assert (await _request(daemon.port, "POST", "/run"))[0] == 202
+    await asyncio.sleep(0)
+    status, body = await _request(daemon.port, "POST", "/run")
+    assert (status, body["started"]) == (409, False)
+
+    daemon.release.set()
+    await daemon._run_task
+    status, body = await _request(daemon.port, "GET", "/status")
+    assert status == 200
+    assert body["state"] == "idle" and body["runs"] == 1
+    assert body["last_trigger"] == "manual" and body["last_result"] == {"emails": 3}
+    assert body["next_run"] is not None
+    assert daemon.pools == [daemon.pool]  # runs use the daemon's warm pool
+
+
+@pytest.mark.asyncio
+async def test_control_endpoint_rejects_unknown_requests(daemon):
+    assert (await _request(daemon.port, "GET", "/nope"))[0] == 404
+    assert (await _request(daemon.port, "GET", "/run"))[0] == 405
+
+
+@pytest.mark.asyncio
+async def test_failed_run_is_recorded():
+    async def workflow():
+        raise RuntimeError("darey down")
+
+    daemon = ReminderDaemon(workflow, CronSchedule("@daily"), port=0)
+    assert daemon.trigger("schedule")
+    await daemon._run_task
+    assert daemon.status["last_error"] == "RuntimeError: darey down"
+    assert daemon.status["runs"] == 1 and daemon.status["state"] == "idle"
+    await daemon.stop()
+
+
+@pytest.mark.asyncio
+async def test_scheduler_fires_when_due(mocker):
+    ran = asyncio.Event()
+
+    async def workflow():
+        ran.set()
+
+    daemon = ReminderDaemon(workflow, CronSchedule("* * * * *"), port=0)
+    real_sleep = asyncio.sleep
+
+    async def no_wait(_):
+        await real_sleep(0)
+
+    mocker.patch("daemon.asyncio.sleep", side_effect=no_wait)
+    await daemon.start()
+    await asyncio.wait_for(ran.wait(), timeout=1)
+    await daemon.stop()
+    assert daemon.status["last_trigger"] == "schedule"
+
+
+@pytest.mark.asyncio
+async def test_scheduler_never_fires_a_slot_twice_after_an_early_wakeup(mocker):
+    async def workflow():
+        pass
+
+    daemon = ReminderDaemon(workflow, CronSchedule("* * * * *"), port=0)
+    # The clock reads just before the slot every time: each sleep ends early
+    mocker.patch(
+        "daemon._utc_now",
+        return_value=datetime(2025, 9, 1, 3, 59, 59, 900000, tzinfo=timezone.utc),
+    )
+    slots = []
+
+    async def early_wakeup(_):
+        slots.append(daemon.status["next_run"])
+        if len(slots) == 3:
+            raise asyncio.CancelledError
+
+    mocker.patch("daemon.asyncio.sleep", side_effect=early_wakeup)
+    mocker.patch.object(daemon, "trigger", return_value=True)
+    with pytest.raises(asyncio.CancelledError):
+        await daemon._scheduler()
+    assert slots == [
+        "2025-09-01T04:00:00+00:00",
+        "2025-09-01T04:01:00+00:00",
+        "2025-09-01T04:02:00+00:00",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_shutdown_refuses_new_runs_and_ends_serve_forever():
+    from utils.shutdown import shutdown
+
+    finished = []
+
+    async def workflow():
+        await asyncio.sleep(0.01)
+        finished.append(True)
+
+    instance = ReminderDaemon(workflow, CronSchedule("0 0 1 1 *"), port=0)
+    serving = asyncio.create_task(instance.serve_forever())
+    while instance._server is None:
+        await asyncio.sleep(0)
+    assert instance.trigger("manual")
+
+    shutdown.request("SIGTERM", grace=1)
+    status, body = instance._route("POST", "/run")
+    assert (status, body["error"]) == (503, "shutting down")
+    assert instance.trigger("schedule") is False
+
+    await asyncio.wait_for(serving, timeout=2)
+    # The run in progress was allowed to finish
+    assert finished == [True]
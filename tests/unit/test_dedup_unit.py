@@ -0,0 +1,99 @@
+# tests/unit/test_dedup_unit.py
+import pytest
+
+from data_processing.dedup import (
+    EXACT_KEY_BYTES,
+    BloomFilter,
+    Deduplicator,
+    create_deduplicator,
+    exact_key_capacity,
+    normalize_email,
+)
+from data_processing.filters import stream_filtered_batches
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.mark.parametrize(
+    "email,expected",
+    [
+        ("  Ada@Example.COM ", "ada@example.com"),
+        ("ada@example.com", "ada@example.com"),
+        ("   ", None),
+        (None, None),
+        (42, None),
+    ],
+)
+def test_normalize_email(email, expected):
+    assert normalize_email(email) == expected
+
+
+def test_filter_page_drops_repeated_ids_and_emails():
+    dedup = Deduplicator()
+    first = dedup.filter_page(
+        [
+            {"_id": "1", "email": "a@test.com"},
+            {"_id": "2", "email": " A@Test.com"},  # same address, other record
+            {"_id": "3", "email": "c@test.com"},
+        ]
+    )
+    second = dedup.filter_page(
+        [
+            {"_id": "3", "email": "c@test.com"},  # repeated across pages
+            {"_id": "4", "email": None},
+            {"_id": None, "email": "e@test.com"},
+        ]
+    )
+    assert [learner["_id"] for learner in first] == ["1", "3"]
+    assert [learner["_id"] for learner in second] == ["4", None]
+    assert (dedup.seen, dedup.removed) == (6, 2)
+
+
+def test_switches_to_bloom_filter_when_exact_set_is_full():
+    dedup = Deduplicator(max_exact_keys=10, bloom_capacity=1000)
+    page = [{"_id": str(i), "email": f"u{i}@test.com"} for i in range(200)]
+    assert len(dedup.filter_page(page)) == 200
+    assert len(dedup._exact) == 10 and dedup._bloom is not None
+    # Keys in either tier are recognised as duplicates
+    assert dedup.filter_page(page) == []
+
+
+def test_exact_set_is_sized_from_the_memory_budget(mocker, settings):
+    # A 512 MB container: 5% budget, a quarter of it for exact keys
+    memory = mocker.Mock(budget=512 * 2**20 // 20)
+    capacity = exact_key_capacity(memory)
+    assert capacity * EXACT_KEY_BYTES <= memory.budget // 4
+    assert capacity > 90_000
+
+    mocker.patch("data_processing.dedup.exact_key_capacity", return_value=1234)
+    mocker.patch.object(settings, "dedup_enabled", True)
+    mocker.patch.object(settings, "dedup_max_exact_keys", 0)
+    assert create_deduplicator().max_exact_keys == 1234
+    mocker.patch.object(settings, "dedup_max_exact_keys", 50)
+    assert create_deduplicator().max_exact_keys == 50
+
+
+def test_bloom_filter_false_positive_rate():
+    bloom = BloomFilter(capacity=10_000, error_rate=0.01)
+    for i in range(10_000):
+        bloom.add(hash(f"in:{i}"))
+    assert all(hash(f"in:{i}") in bloom for i in range(10_000))
+    false_positives = sum(hash(f"out:{i}") in bloom for i in range(10_000))
+    assert false_positives < 300  # ~1% expected
+
+
+@pytest.mark.asyncio
+async def test_stream_filtered_batches_dedups_before_classifying(
+    learners, paged_source
+):
+    source = paged_source([learners, [dict(learners[0]), {**learners[1], "_id": "99"}]])
+
+    dedup = Deduplicator()
+    ids = [
+        learner["_id"]
+        async for batch, _ in stream_filtered_batches(source=source, deduplicator=dedup)
+        for learner in batch
+    ]
+
+    assert sorted(ids) == ["1", "2", "4"]
+    assert dedup.removed == 2
@@ -3,6 +3,12 @@ import pytest
 import httpx
 
 from data_processing import downloader
+from utils.retry import (
+    RetryBudget,
+    RetryGuard,
+    use_retry_guard,
+    wait_configured_exponential,
+)
 
 
 @pytest.mark.asyncio
@@ -44,6 +50,34 @@ async def test_get_bearer_token_failure(mocker):
         await downloader.get_bearer_token()
 
 
+@pytest.mark.asyncio
+async def test_bearer_token_is_cached_until_ttl_or_401(mocker, settings):
+    mocker.patch.object(settings, "token_cache_ttl", 60)
+    login = mocker.patch(
+        "data_processing.downloader.get_bearer_token", side_effect=["t1", "t2"]
+    )
+
+    assert await downloader.bearer_token() == "t1"
+    assert await downloader.bearer_token() == "t1"
+    assert login.call_count == 1
+
+    unauthorized = httpx.HTTPStatusError(
+        "unauthorized", request=mocker.Mock(), response=mocker.Mock(status_code=401)
+    )
+    downloader.forget_token(unauthorized)
+    assert await downloader.bearer_token() == "t2"
+
+
+@pytest.mark.asyncio
+async def test_bearer_token_not_cached_when_ttl_is_zero(mocker, settings):
+    mocker.patch.object(settings, "token_cache_ttl", 0)
+    login = mocker.patch(
+        "data_processing.downloader.get_bearer_token", side_effect=["t1", "t2"]
+    )
+    assert [await downloader.bearer_token() for _ in range(2)] == ["t1", "t2"]
+    assert login.call_count == 2
+
+
 @pytest.mark.asyncio
 async def test_stream_learners_single_page(mocker):
     """Should yield learners from a single page and stop."""
@@ -118,27 +152,72 @@ async def test_stream_learners_multiple_pages(mocker):
 
 
 @pytest.mark.asyncio
-async def test_stream_learners_transient_error(mocker):
-    """Should raise on transient error so tenacity can retry."""
-    err = httpx.ConnectTimeout("timeout")
+async def test_stream_learners_retries_a_timed_out_page(mocker, settings):
+    """A page whose first attempt times out is retried and the stream goes on."""
+    pages = {1: [{"_id": "1"}], 2: [{"_id": "2"}]}
+    serve, requested = _paged_get(mocker, pages)
+    timed_out = set()
 
     async def fake_get(url, headers):
-        raise err
+        if "page=2&" in url and not timed_out:
+            timed_out.add(url)
+            raise httpx.ReadTimeout("read timed out")
+        return await serve(url, headers)
 
     mocker.patch(
         "data_processing.downloader.get_bearer_token", return_value="fake-token"
     )
     mocker.patch(
-        "httpx.AsyncClient.get",
-        new_callable=mocker.AsyncMock,
-        side_effect=fake_get,
+        "httpx.AsyncClient.get", new_callable=mocker.AsyncMock, side_effect=fake_get
     )
-    mocker.patch("data_processing.downloader.is_transient_error", return_value=True)
+    mocker.patch.object(settings, "max_retries", 3)
+    mocker.patch.object(wait_configured_exponential, "__call__", return_value=0)
+    guard = RetryGuard(RetryBudget())
+    report = downloader.DownloadReport()
+
+    with use_retry_guard(guard):
+        results = [
+            learner["_id"]
+            async for page in downloader.stream_learner_pages(
+                page_size=1, report=report
+            )
+            for learner in page
+        ]
+
+    assert results == ["1", "2"]
+    assert requested == [1, 2, 3]  # page 2 once more after the timeout
+    assert report.complete
+    assert guard.budget.stats() == {"requests": 4, "retries": 1, "denied": 0}
 
-    with pytest.raises(httpx.ConnectTimeout):
-        results = []
-        async for learner in downloader.stream_learners(page_size=1):
-            results.append(learner)
+
+@pytest.mark.asyncio
+async def test_stream_learners_ends_after_retries_are_exhausted(mocker, settings):
+    """A page failing every attempt ends the read, reported incomplete."""
+
+    async def fake_get(url, headers):
+        raise httpx.ConnectTimeout("timeout")
+
+    mocker.patch(
+        "data_processing.downloader.get_bearer_token", return_value="fake-token"
+    )
+    get = mocker.patch(
+        "httpx.AsyncClient.get", new_callable=mocker.AsyncMock, side_effect=fake_get
+    )
+    mocker.patch.object(settings, "max_retries", 2)
+    mocker.patch.object(wait_configured_exponential, "__call__", return_value=0)
+    guard = RetryGuard(RetryBudget(), failure_threshold=5)
+    report = downloader.DownloadReport()
+
+    with use_retry_guard(guard):
+        results = [
+            page async for page in downloader.stream_learner_pages(1, report=report)
+        ]
+
+    assert results == [] and get.await_count == 2
+    assert report.failed_pages == [1]
+    # Both attempts went through the Darey breaker and the retry budget
+    assert guard.breaker("darey").failures == 2
+    assert guard.budget.stats() == {"requests": 2, "retries": 1, "denied": 0}
 
 
 @pytest.mark.asyncio
@@ -162,10 +241,143 @@ async def test_stream_learners_non_transient_error(mocker):
         new_callable=mocker.AsyncMock,
         side_effect=fake_get,
     )
-    mocker.patch("data_processing.downloader.is_transient_error", return_value=False)
 
     results = []
     async for learner in downloader.stream_learners(page_size=1):
         results.append(learner)
 
     assert results == []
+
+    report = downloader.DownloadReport()
+    async for _ in downloader.stream_learner_pages(page_size=1, report=report):
+        pass
+    assert report.failed_pages == [1] and not report.complete
+
+
+# -----------------------------
+# Sharded download tests
+# -----------------------------
+def _paged_get(mocker, pages: dict[int, list[dict]], meta: dict | None = None):
+    """Build a fake AsyncClient.get serving `pages` by the ?page= query param."""
+    requested = []
+
+    async def fake_get(url, headers):
+        page = int(url.split("page=")[1].split("&")[0])
+        requested.append(page)
+        resp = mocker.Mock()
+        resp.raise_for_status.return_value = None
+        body = {"info": pages.get(page, [])}
+        if page == 1 and meta:
+            body.update(meta)
+        resp.json.return_value = {"data": body}
+        return resp
+
+    return fake_get, requested
+
+
+@pytest.mark.parametrize(
+    "first,last,shards,expected",
+    [
+        (2, 9, 4, [range(2, 4), range(4, 6), range(6, 8), range(8, 10)]),
+        (2, 4, 8, [range(2, 3), range(3, 4), range(4, 5)]),
+        (2, 1, 4, []),
+    ],
+)
+def test_split_pages(first, last, shards, expected):
+    assert downloader._split_pages(first, last, shards) == expected
+
+
+@pytest.mark.asyncio
+async def test_stream_learners_sharded_uses_total(mocker):
+    """Should fetch every page once across workers."""
+    pages = {
+        1: [{"_id": "1"}, {"_id": "2"}],
+        2: [{"_id": "3"}, {"_id": "4"}],
+        3: [{"_id": "4"}, {"_id": "5"}],  # "4" shifted pages mid-read
+        4: [{"_id": "6"}],
+    }
+    fake_get, requested = _paged_get(mocker, pages, meta={"total": 7})
+    mocker.patch(
+        "data_processing.downloader.get_bearer_token", return_value="fake-token"
+    )
+    mocker.patch(
+        "httpx.AsyncClient.get", new_callable=mocker.AsyncMock, side_effect=fake_get
+    )
+
+    results = [
+        learner["_id"]
+        async for learner in downloader.stream_learners_sharded(page_size=2, workers=3)
+    ]
+
+    # Repeats are left to the pipeline's Deduplicator
+    assert sorted(results) == ["1", "2", "3", "4", "4", "5", "6"]
+    assert sorted(requested) == [1, 2, 3, 4, 5]  # 5 = tail check past the total
+
+
+@pytest.mark.asyncio
+async def test_stream_learners_sharded_reports_skipped_pages(mocker):
+    """A page that fails is skipped, and the read is reported incomplete."""
+    pages = {page: [{"_id": str(page)}] for page in range(1, 5)}
+    serve, _ = _paged_get(mocker, pages, meta={"total": 4})
+
+    async def fake_get(url, headers):
+        if "page=3&" in url:
+            response = mocker.Mock(status_code=400)
+            raise httpx.HTTPStatusError("bad", request=mocker.Mock(), response=response)
+        return await serve(url, headers)
+
+    mocker.patch(
+        "data_processing.downloader.get_bearer_token", return_value="fake-token"
+    )
+    mocker.patch(
+        "httpx.AsyncClient.get", new_callable=mocker.AsyncMock, side_effect=fake_get
+    )
+    report = downloader.DownloadReport()
+
+    results = [
+        learner["_id"]
+        async for page in downloader.stream_learner_pages_sharded(
+            page_size=1, workers=2, report=report
+        )
+        for learner in page
+    ]
+
+    assert sorted(results) == ["1", "2", "4"]
+    assert report.failed_pages == [3] and not report.complete
+
+
+@pytest.mark.asyncio
+async def test_stream_learners_sharded_probes_without_total(mocker):
+    """Should probe for the last page when the API reports no total."""
+    pages = {page: [{"_id": str(page)}] for page in range(1, 6)}
+    fake_get, _ = _paged_get(mocker, pages)
+    mocker.patch(
+        "data_processing.downloader.get_bearer_token", return_value="fake-token"
+    )
+    mocker.patch(
+        "httpx.AsyncClient.get", new_callable=mocker.AsyncMock, side_effect=fake_get
+    )
+
+    results = [
+        learner["_id"]
+        async for learner in downloader.stream_learners_sharded(page_size=1, workers=2)
+    ]
+
+    assert sorted(results) == ["1", "2", "3", "4", "5"]
+
+
+@pytest.mark.asyncio
+async def test_stream_learners_sharded_empty(mocker):
+    """Should stop immediately when the first page is empty."""
+    fake_get, requested = _paged_get(mocker, {})
+    mocker.patch(
+        "data_processing.downloader.get_bearer_token", return_value="fake-token"
+    )
+    mocker.patch(
+        "httpx.AsyncClient.get", new_callable=mocker.AsyncMock, side_effect=fake_get
+    )
+
+    results = [learner async for learner in downloader.stream_learners_sharded()]
+
+    assert results == []
+    assert requested == [1]
@@ -0,0 +1,206 @@
+# tests/unit/test_email_backends_unit.py
+import asyncio
+
+import pytest
+import pytest_asyncio
+from aiosmtpd.smtp import SMTP
+
+import email_sender.mailjet_client as mj
+from email_sender.backends import create_email_backend, use_email_backend
+from email_sender.smtp_backend import (
+    SMTPBackend,
+    SMTPConnection,
+    _dot_stuff,
+    build_message,
+)
+
+pytestmark = pytest.mark.unit
+
+
+class RecordingHandler:
+    """aiosmtpd handler keeping accepted envelopes; rejects `reject` recipients."""
+
+    def __init__(self, pipelining: bool = False, reject: set[str] = frozenset()):
+        self.pipelining = pipelining
+        self.reject = reject
+        self.envelopes = []
+        self.sessions = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        session.host_name = hostname
+        if self.pipelining:
+            responses.insert(-1, "250-PIPELINING")
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.reject:
+            return "550 5.1.1 mailbox unavailable"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.envelopes.append(envelope)
+        return "250 OK"
+
+
+@pytest_asyncio.fixture
+async def smtp_server():
+    servers = []
+
+    async def start(handler: RecordingHandler) -> int:
+        def factory():
+            handler.sessions += 1
+            return SMTP(handler, hostname="localhost")
+
+        server = await asyncio.get_running_loop().create_server(factory, "127.0.0.1", 0)
+        servers.append(server)
+        return server.sockets[0].getsockname()[1]
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def _message(to: str, text: str = "Hello") -> dict:
+    return {
+        "From": {"Email": "team@3mtt.test", "Name": "3MTT"},
+        "To": [{"Email": to, "Name": "Ada"}],
+        "Subject": "Reminder",
+        "TextPart": text,
+        "HTMLPart": f"<p>{text}</p>",
+    }
+
+
+def _backend(port: int, **kwargs) -> SMTPBackend:
+    return SMTPBackend(
+        host="127.0.0.1", port=port, security="none", username="", **kwargs
+    )
+
+
+def test_build_message_and_dot_stuffing():
+    sender, recipients, data = build_message(_message("a@test.com", ".leading dot"))
+
+    assert sender == "team@3mtt.test" and recipients == ["a@test.com"]
+    assert b"Subject: Reminder" in data and b"multipart/alternative" in data
+    stuffed = _dot_stuff(b".a\r\n.b")
+    assert stuffed == b"..a\r\n..b\r\n.\r\n"
+
+
+@pytest.mark.asyncio
+async def test_smtp_backend_reuses_one_session_across_sends(smtp_server):
+    handler = RecordingHandler()
+    backend = _backend(await smtp_server(handler), pool_size=2)
+
+    first = await backend.send([_message(f"u{i}@test.com") for i in range(3)], "b1")
+    second = await backend.send([_message("u3@test.com")], "b2")
+    await backend.aclose()
+
+    assert first == [True] * 3 and second == [True]
+    assert [e.rcpt_tos for e in handler.envelopes] == [
+        [f"u{i}@test.com"] for i in range(4)
+    ]
+    assert backend.connections_opened == 1 and handler.sessions == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("pipelining", [False, True])
+async def test_rejected_recipient_is_reported_and_session_continues(
+    smtp_server, pipelining
+):
+    handler = RecordingHandler(pipelining=pipelining, reject={"bad@test.com"})
+    backend = _backend(await smtp_server(handler))
+
+    results = await backend.send(
+        [_message("a@test.com"), _message("bad@test.com"), _message("b@test.com")],
+        "batch",
+    )
+    connection = backend._idle[0]
+    await backend.aclose()
+
+    assert connection.pipelining is pipelining
+    assert results == [True, False, True]
+    assert [e.rcpt_tos for e in handler.envelopes] == [["a@test.com"], ["b@test.com"]]
+
+
+@pytest.mark.asyncio
+async def test_out_of_sequence_data_reply_rejects_the_message(mocker):
+    # DATA answered 250 instead of 354: no error reply to report
+    connection = SMTPConnection("localhost", 25)
+    connection._reader = asyncio.StreamReader()
+    connection._reader.feed_data(b"250 OK\r\n250 OK\r\n250 OK\r\n250 OK\r\n")
+    connection._writer = mocker.Mock(drain=mocker.AsyncMock())
+
+    assert await connection.send("from@test.com", ["a@test.com"], b"body") is False
+    assert connection._writer.write.call_args.args[0] == b"RSET\r\n"
+
+
+def test_smtp_group_size_follows_settings(mocker, settings):
+    mocker.patch.object(settings, "smtp_max_messages", 25)
+    assert SMTPBackend(host="localhost", username="u").max_messages == 25
+    assert SMTPBackend(host="localhost", username="u", max_messages=3).max_messages == 3
+
+
+@pytest.mark.asyncio
+async def test_pool_caps_concurrent_sessions(smtp_server):
+    handler = RecordingHandler(pipelining=True)
+    backend = _backend(await smtp_server(handler), pool_size=2)
+
+    results = await asyncio.gather(
+        *(
+            backend.send([_message(f"g{g}m{i}@test.com") for i in range(5)], f"g{g}")
+            for g in range(6)
+        )
+    )
+    await backend.aclose()
+
+    assert all(r == [True] * 5 for r in results)
+    assert len(handler.envelopes) == 30
+    assert backend.connections_opened == 2 and handler.sessions == 2
+
+
+@pytest.mark.asyncio
+async def test_send_batch_emails_over_smtp_returns_accepted_learners(
+    mocker, smtp_server
+):
+    mocker.patch.object(mj.settings, "test_mode", False)
+    mocker.patch.object(mj.settings, "test_email_address", None)
+    handler = RecordingHandler(pipelining=True, reject={"u1@test.com"})
+    backend = _backend(await smtp_server(handler), max_messages=2)
+    learners = [
+        {"_id": str(i), "email": f"u{i}@test.com", "firstName": "ada"} for i in range(5)
+    ]
+
+    with use_email_backend(backend):
+        delivered = await mj.send_batch_emails(learners, template_type="inactive")
+    await backend.aclose()
+
+    assert [learner["_id"] for learner in delivered] == ["0", "2", "3", "4"]
+    assert b"Ada" in handler.envelopes[0].content
+
+
+@pytest.mark.asyncio
+async def test_mailjet_backend_reports_whole_request(mocker):
+    calls = []
+
+    async def fake_send_email(client, payload, batch_id):
+        calls.append((batch_id, len(payload["Messages"])))
+        return batch_id == "ok"
+
+    mocker.patch("email_sender.mailjet_client._send_email", new=fake_send_email)
+    backend = mj.MailjetBackend()
+
+    assert await backend.send([_message("a@test.com")] * 2, "ok") == [True, True]
+    assert await backend.send([_message("a@test.com")], "down") == [False]
+    await backend.aclose()
+    assert calls == [("ok", 2), ("down", 1)]
+
+
+def test_create_email_backend_follows_settings(mocker):
+    from config import settings
+
+    assert isinstance(create_email_backend(), mj.MailjetBackend)
+    mocker.patch.object(settings, "email_backend", "smtp")
+    assert isinstance(create_email_backend(), SMTPBackend)
+    mocker.patch.object(settings, "email_backend", "carrier-pigeon")
+    with pytest.raises(ValueError, match="carrier-pigeon"):
+        create_email_backend()
@@ -0,0 +1,92 @@
+# tests/unit/test_email_validation_unit.py
+import json
+
+import pytest
+
+from data_processing.email_validation import (
+    EmailValidator,
+    create_email_validator,
+    load_domain_lists,
+)
+from data_processing.rules import compile_rules
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        ("ada@example.com", "ada@example.com"),
+        ("  Ada.Obi@Example.COM ", "Ada.Obi@example.com"),
+        ("mailto:<tunde+3mtt@mail.example.ng>", "tunde+3mtt@mail.example.ng"),
+    ],
+)
+def test_valid_addresses_are_normalized(raw, expected):
+    assert EmailValidator().check(raw) == (expected, None)
+
+
+@pytest.mark.parametrize(
+    "raw, reason",
+    [
+        (None, "missing"),
+        ("   ", "missing"),
+        ("ada.example.com", "malformed"),
+        ("ada@example", "malformed"),
+        ("ada..obi@example.com", "malformed"),
+        ("ada@-example.com", "malformed"),
+        ("a" * 65 + "@example.com", "malformed"),
+        ("ada@gmial.com", "typo_domain"),
+        ("ada@Mailinator.com", "disposable_domain"),
+    ],
+)
+def test_bad_addresses_are_rejected_with_a_reason(raw, reason):
+    assert EmailValidator().check(raw) == (None, reason)
+
+
+def test_domain_verdicts_are_cached_and_rejections_counted():
+    validator = EmailValidator()
+    for i in range(5):
+        validator.normalize(f"u{i}@gmail.com")
+    validator.normalize("x@gmial.com", "7")
+    validator.normalize("broken", "8")
+
+    assert list(validator._verdicts) == ["gmail.com", "gmial.com"]
+    assert validator.stats() == {
+        "checked": 7,
+        "normalized": 0,
+        "rejected": 2,
+        "reasons": {"typo_domain": 1, "malformed": 1},
+    }
+
+
+def test_domain_list_file_extends_built_ins(mocker, settings, tmp_path):
+    path = tmp_path / "domains.json"
+    path.write_text(
+        json.dumps({"typos": {"YAHO.CO": "yahoo.com"}, "disposable": ["burner.test"]})
+    )
+    typos, disposable = load_domain_lists(str(path))
+    assert typos["yaho.co"] == "yahoo.com" and "gmial.com" in typos
+    assert "burner.test" in disposable and "yopmail.com" in disposable
+
+    mocker.patch.object(settings, "email_domain_list_path", str(path))
+    assert create_email_validator().check("a@burner.test") == (
+        None,
+        "disposable_domain",
+    )
+    mocker.patch.object(settings, "email_validation", False)
+    assert create_email_validator() is None
+
+
+def test_classifier_drops_rejected_and_normalizes_kept_addresses():
+    classifier = compile_rules([{"segment": "inactive", "when": {"completed": False}}])
+    page = [
+        {"_id": "1", "email": " Ada@GMAIL.com", "completed": False},
+        {"_id": "2", "email": "tunde@gmial.com", "completed": False},
+        {"_id": "3", "email": "not-an-address", "completed": False},
+    ]
+
+    buckets = classifier.partition(page)
+
+    assert buckets["inactive"] == [page[0]]
+    assert page[0]["email"] == "Ada@gmail.com"
+    assert classifier.validator.stats()["rejected"] == 2
@@ -1,11 +1,13 @@
 # tests/unit/test_filters_unit.py
 import pytest
-from unittest.mock import patch
 from datetime import datetime, timedelta, timezone
 
+from data_processing.rules import compile_rules
 from data_processing.filters import (
+    classify_page,
     filter_inactive,
     filter_low_score,
+    split_full_batches,
     stream_filtered_batches,
 )
 
@@ -154,73 +156,92 @@ def test_filter_low_score(learner, threshold, expected, settings):
 
 
 @pytest.mark.asyncio
-async def test_stream_filtered_batches_classification(learners):
-    """Learners are classified via filter_inactive and filter_low_score."""
-
-    async def fake_stream_learners(page_size: int):
-        for learner in learners:
-            yield learner
-
-    # Mark 1 & 4 as inactive, 2 as low_score
-    inactive_side_effects = [True, False, False, True, False, False]
-
-    # Compute only for learners that will actually reach low_score check
-    # (i.e. when inactive_side_effects[i] is False)
-    low_score_side_effects = []
-    for idx, learner in enumerate(learners):
-        if not inactive_side_effects[idx]:
-            if learner["_id"] == "2":
-                low_score_side_effects.append(True)  # learner 2 → low_score
-            else:
-                low_score_side_effects.append(False)  # everyone else → not low_score
-
-    with (
-        patch("data_processing.filters.stream_learners", new=fake_stream_learners),
-        patch(
-            "data_processing.filters.filter_inactive", side_effect=inactive_side_effects
-        ),
-        patch(
-            "data_processing.filters.filter_low_score",
-            side_effect=low_score_side_effects,
-        ),
-    ):
-        results = []
-        async for batch, category in stream_filtered_batches():
-            results.append((batch, category))
+async def test_stream_filtered_batches_classification(learners, paged_source):
+    """Learners are classified by the default segment rules, inactive first."""
+
+    source = paged_source([learners[:4], learners[4:]])
 
-        assert len(results) == 2
+    results = []
+    async for batch, category in stream_filtered_batches(source=source):
+        results.append((batch, category))
 
-        inactive_batch, inactive_cat = results[0]
-        low_score_batch, low_score_cat = results[1]
+    assert len(results) == 2
 
-        assert inactive_cat == "inactive"
-        assert [learner["_id"] for learner in inactive_batch] == ["1", "4"]
+    inactive_batch, inactive_cat = results[0]
+    low_score_batch, low_score_cat = results[1]
 
-        assert low_score_cat == "low_score"
-        assert [learner["_id"] for learner in low_score_batch] == ["2"]
+    assert inactive_cat == "inactive"
+    assert [learner["_id"] for learner in inactive_batch] == ["1", "4"]
+
+    assert low_score_cat == "low_score"
+    assert [learner["_id"] for learner in low_score_batch] == ["2"]
 
 
 @pytest.mark.asyncio
-async def test_stream_filtered_batches_flush_remainders(learners):
+async def test_stream_filtered_batches_flush_remainders(learners, paged_source):
     """Remainders are yielded at the end even if not full batch."""
 
-    async def fake_stream_learners(page_size: int):
-        for learner in learners:
-            yield learner
+    source = paged_source([learners[:4], learners[4:]])
+    # A catch-all rule: every learner with an _id and email is "inactive"
+    classifier = compile_rules([{"segment": "inactive", "when": {}}])
 
-    with (
-        patch("data_processing.filters.stream_learners", new=fake_stream_learners),
-        patch("data_processing.filters.filter_inactive", return_value=True),
-        patch("data_processing.filters.filter_low_score", return_value=False),
+    results = []
+    async for batch, category in stream_filtered_batches(
+        source=source, classifier=classifier
     ):
-        results = []
-        async for batch, category in stream_filtered_batches():
-            results.append((batch, category))
-
-        # All learners should end up in the "inactive" remainder batch
-        assert len(results) == 1
-        batch, category = results[0]
-        assert category == "inactive"
-        assert [learner["_id"] for learner in batch] == [
-            learner["_id"] for learner in learners
-        ]
+        results.append((batch, category))
+
+    # All valid learners should end up in the "inactive" remainder batch
+    assert len(results) == 1
+    batch, category = results[0]
+    assert category == "inactive"
+    # Sent most urgent first (send queue), so compare membership
+    assert sorted(learner["_id"] for learner in batch) == ["1", "2", "3", "4"]
+
+
+def test_classify_page_single_pass(learners):
+    """Page partitioning matches the per-learner filters, inactive first."""
+    buckets = classify_page(learners)
+    assert [learner["_id"] for learner in buckets["inactive"]] == ["1", "4"]
+    assert [learner["_id"] for learner in buckets["low_score"]] == ["2"]
+    for learner in learners:
+        if learner["_id"] in ("1", "4"):
+            assert filter_inactive(learner)
+        if learner["_id"] == "2":
+            assert filter_low_score(learner) and not filter_inactive(learner)
+
+
+@pytest.mark.parametrize(
+    "n,size,expected_batches,expected_rest",
+    [(10, 3, [3, 3, 3], 1), (6, 3, [3, 3], 0), (2, 3, [], 2)],
+)
+def test_split_full_batches(n, size, expected_batches, expected_rest):
+    buffer = [{"_id": str(i)} for i in range(n)]
+    batches, rest = split_full_batches(buffer, size)
+    assert [len(batch) for batch in batches] == expected_batches
+    assert len(rest) == expected_rest
+    assert [learner for batch in batches for learner in batch] + rest == buffer
+
+
+@pytest.mark.asyncio
+async def test_stream_filtered_batches_emits_full_batches_by_page(mocker, paged_source):
+    """A page larger than the batch size is cut into several full batches."""
+    mocker.patch("data_processing.filters.default_batch_size", return_value=2)
+    old_login = (now - timedelta(days=40)).isoformat()
+    page = [
+        {"_id": str(i), "email": f"u{i}@test.com", "last_loggedin_date": old_login}
+        for i in range(5)
+    ]
+
+    results = [
+        (category, [learner["_id"] for learner in batch])
+        async for batch, category in stream_filtered_batches(
+            source=paged_source([page])
+        )
+    ]
+
+    assert results == [
+        ("inactive", ["0", "1"]),
+        ("inactive", ["2", "3"]),
+        ("inactive", ["4"]),
+    ]
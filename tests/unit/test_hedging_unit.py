@@ -0,0 +1,122 @@
+# tests/unit/test_hedging_unit.py
+import asyncio
+
+import httpx
+import pytest
+
+from data_processing import downloader
+from utils.hedging import Hedger, create_hedger
+
+pytestmark = pytest.mark.unit
+
+
+def _warm(hedger: Hedger, latency: float = 0.01, samples: int = 20) -> None:
+    for _ in range(samples):
+        hedger._latencies.append(latency)
+    hedger.calls += samples
+
+
+@pytest.mark.asyncio
+async def test_no_hedge_until_enough_samples():
+    hedger = Hedger(min_samples=3)
+    calls = []
+
+    async def call():
+        calls.append(1)
+        return "page"
+
+    assert [await hedger.run(call) for _ in range(3)] == ["page"] * 3
+    assert len(calls) == 3 and hedger.hedged == 0
+    assert hedger.threshold() is not None
+
+
+@pytest.mark.asyncio
+async def test_slow_call_is_hedged_and_the_first_answer_wins():
+    hedger = Hedger(quantile=0.95, max_extra=0.5)
+    _warm(hedger)
+    started = []
+    cancelled = []
+
+    async def call():
+        attempt = len(started)
+        started.append(attempt)
+        try:
+            await asyncio.sleep(5 if attempt == 0 else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(attempt)
+            raise
+        return attempt
+
+    assert await asyncio.wait_for(hedger.run(call), timeout=1) == 1
+    assert started == [0, 1] and cancelled == [0]
+    assert hedger.stats()["hedged"] == 1 and hedger.stats()["hedge_wins"] == 1
+
+
+@pytest.mark.asyncio
+async def test_extra_load_is_capped():
+    hedger = Hedger(max_extra=0.1, min_samples=1)
+    _warm(hedger, samples=1)
+    hedger.calls = 9  # one more call makes 10: room for exactly one hedge
+    started = []
+
+    async def call():
+        started.append(1)
+        await asyncio.sleep(0.05)
+        return "page"
+
+    await hedger.run(call)
+    await hedger.run(call)
+    assert hedger.hedged == 1 and len(started) == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_duplicate_falls_back_to_the_other():
+    hedger = Hedger(max_extra=1.0)
+    _warm(hedger)
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        if len(attempts) == 2:
+            raise httpx.ConnectError("refused")
+        await asyncio.sleep(0.05)
+        return "primary"
+
+    assert await hedger.run(call) == "primary"
+
+    async def always_fails():
+        await asyncio.sleep(0.05)
+        raise httpx.ReadTimeout("timeout")
+
+    with pytest.raises(httpx.ReadTimeout):
+        await hedger.run(always_fails)
+
+
+def test_create_hedger_follows_settings(mocker, settings):
+    assert create_hedger().quantile == settings.hedge_quantile
+    mocker.patch.object(settings, "hedge_max_extra", 0)
+    assert create_hedger() is None
+
+
+@pytest.mark.asyncio
+async def test_page_requests_have_bounded_timeouts(mocker, settings):
+    seen = {}
+    real_client = httpx.AsyncClient
+
+    def client_factory(**kwargs):
+        seen.update(kwargs)
+        return real_client(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(200, json={"data": {"info": []}})
+            )
+        )
+
+    mocker.patch("utils.http.httpx.AsyncClient", side_effect=client_factory)
+    mocker.patch.object(downloader, "get_bearer_token", return_value="token")
+    mocker.patch.object(settings, "download_timeout", 30.0)
+
+    async for _ in downloader.stream_learner_pages(page_size=2):
+        pass
+
+    timeout = seen["timeout"]
+    assert timeout.read == 30.0 and timeout.connect == settings.download_connect_timeout
@@ -0,0 +1,79 @@
+# tests/unit/test_memory_unit.py
+import pytest
+
+from utils import memory
+from utils.memory import MemoryBudget, cgroup_memory_limit, cgroup_memory_usage
+
+pytestmark = pytest.mark.unit
+
+GB = 1 << 30
+
+
+@pytest.fixture
+def cgroup_v2(tmp_path):
+    (tmp_path / "memory.max").write_text(f"{2 * GB}\n")
+    (tmp_path / "memory.current").write_text(f"{GB // 2}\n")
+    return tmp_path
+
+
+@pytest.fixture
+def cgroup_v1(tmp_path):
+    (tmp_path / "memory").mkdir()
+    (tmp_path / "memory" / "memory.limit_in_bytes").write_text(f"{GB}\n")
+    (tmp_path / "memory" / "memory.usage_in_bytes").write_text(f"{GB // 4}\n")
+    return tmp_path
+
+
+def test_cgroup_v2_limit_and_usage(cgroup_v2):
+    assert cgroup_memory_limit(str(cgroup_v2)) == 2 * GB
+    assert cgroup_memory_usage(str(cgroup_v2)) == GB // 2
+
+
+def test_cgroup_v1_limit_and_usage(cgroup_v1):
+    assert cgroup_memory_limit(str(cgroup_v1)) == GB
+    assert cgroup_memory_usage(str(cgroup_v1)) == GB // 4
+
+
+@pytest.mark.parametrize("raw", ["max\n", f"{1 << 62}\n"])
+def test_unlimited_cgroup_is_none(tmp_path, raw):
+    (tmp_path / "memory").mkdir()
+    if raw == "max\n":
+        (tmp_path / "memory.max").write_text(raw)
+    else:
+        (tmp_path / "memory" / "memory.limit_in_bytes").write_text(raw)
+    assert cgroup_memory_limit(str(tmp_path)) is None
+
+
+def test_missing_cgroup_files(tmp_path):
+    assert cgroup_memory_limit(str(tmp_path)) is None
+    assert cgroup_memory_usage(str(tmp_path)) is None
+
+
+def test_total_memory_prefers_cgroup_limit(mocker, cgroup_v2):
+    mocker.patch.object(memory, "physical_memory", return_value=16 * GB)
+    assert memory.total_memory(str(cgroup_v2)) == 2 * GB
+
+
+def test_budget_headroom_tracks_cgroup_usage(mocker, cgroup_v2):
+    mocker.patch.object(memory, "physical_memory", return_value=16 * GB)
+    budget = MemoryBudget(fraction=0.5, reserve_fraction=0.1, root=str(cgroup_v2))
+    assert budget.budget == GB
+    assert budget.headroom() == GB  # 2 GB - 0.5 GB used - 0.2 GB reserve
+
+    (cgroup_v2 / "memory.current").write_text(f"{int(1.6 * GB)}\n")
+    budget.refresh_interval = 0
+    assert budget.headroom() == 2 * GB - int(1.6 * GB) - int(0.2 * GB)
+
+
+def test_headroom_never_negative(mocker, cgroup_v2):
+    mocker.patch.object(memory, "physical_memory", return_value=16 * GB)
+    (cgroup_v2 / "memory.current").write_text(f"{2 * GB}\n")
+    assert MemoryBudget(root=str(cgroup_v2)).headroom() == 0
+
+
+def test_stdlib_fallback_without_psutil(mocker, tmp_path):
+    mocker.patch.object(memory, "psutil", None)
+    assert memory.physical_memory() > 0
+    assert memory.available_memory() > 0
+    assert memory.current_rss() > 0
+    assert MemoryBudget(root=str(tmp_path)).headroom() >= 0
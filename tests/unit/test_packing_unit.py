@@ -0,0 +1,102 @@
+# tests/unit/test_packing_unit.py
+import json
+import random
+
+import pytest
+
+import email_sender.mailjet_client as mj
+from email_sender.packing import (
+    ENVELOPE_BYTES,
+    fixed_chunk_requests,
+    message_size,
+    pack_messages,
+)
+
+pytestmark = pytest.mark.unit
+
+
+def _body(messages: list[dict]) -> bytes:
+    """The request body exactly as httpx encodes `json=`."""
+    return json.dumps(
+        {"Messages": messages}, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def test_count_limit_keeps_order():
+    chunks = pack_messages([100] * 120, max_count=50, max_bytes=10**9)
+
+    assert [len(chunk) for chunk in chunks] == [50, 50, 20]
+    assert [i for chunk in chunks for i in chunk] == list(range(120))
+
+
+def test_first_fit_fills_earlier_requests_with_later_messages():
+    chunks = pack_messages(
+        [700, 700, 250, 250], max_count=50, max_bytes=ENVELOPE_BYTES + 1000
+    )
+
+    assert chunks == [[0, 2], [1, 3]]
+
+
+def test_oversized_message_goes_alone(mocker):
+    warning = mocker.patch("email_sender.packing.logger.warning")
+
+    chunks = pack_messages([10, 5000, 10], max_count=50, max_bytes=1000)
+
+    assert chunks == [[0, 2], [1]]
+    warning.assert_called_once()
+
+
+def test_packed_bodies_stay_within_the_byte_limit():
+    rng = random.Random(5)
+    messages = [
+        {
+            "To": [{"Email": f"u{i}@test.com", "Name": "Àdá"}],
+            "HTMLPart": "x" * rng.randrange(50, 4000),
+        }
+        for i in range(300)
+    ]
+    max_bytes = 20_000
+
+    chunks = pack_messages([message_size(m) for m in messages], 50, max_bytes)
+
+    bodies = [_body([messages[i] for i in chunk]) for chunk in chunks]
+    assert all(len(body) <= max_bytes for body in bodies)
+    assert sorted(i for chunk in chunks for i in chunk) == list(range(300))
+    # Fuller than fixed chunks sized for the largest message
+    assert len(chunks) < fixed_chunk_requests(
+        [message_size(m) for m in messages], 50, max_bytes
+    )
+
+
+def test_fixed_chunk_requests():
+    assert fixed_chunk_requests([], 50, 1000) == 0
+    assert fixed_chunk_requests([10] * 120, 50, 10**6) == 3
+    # Largest message fits 4 per request: 10 messages need 3 requests
+    assert fixed_chunk_requests([10] * 9 + [200], 50, ENVELOPE_BYTES + 4 * 201) == 3
+
+
+@pytest.mark.asyncio
+async def test_send_batch_emails_splits_by_size_and_maps_recipients(mocker):
+    mocker.patch.object(mj.settings, "test_mode", False)
+    mocker.patch.object(mj.settings, "test_email_address", None)
+    mocker.patch.object(mj.settings, "mailjet_max_request_bytes", 12_000)
+    learners = [
+        {"_id": str(i), "email": f"u{i}@test.com", "firstName": f"name{i}"}
+        for i in range(10)
+    ]
+    payloads = {}
+
+    async def fake_send_email(client, payload, batch_id):
+        payloads[batch_id] = payload
+        return not batch_id.endswith("_1")  # first request rejected
+
+    mocker.patch("email_sender.mailjet_client._send_email", new=fake_send_email)
+
+    delivered = await mj.send_batch_emails(learners, template_type="inactive")
+
+    assert len(payloads) > 1
+    assert all(len(_body(p["Messages"])) <= 12_000 for p in payloads.values())
+    rejected = {m["To"][0]["Email"] for m in payloads["inactive_batch_1"]["Messages"]}
+    assert {learner["email"] for learner in delivered} == {
+        learner["email"] for learner in learners
+    } - rejected
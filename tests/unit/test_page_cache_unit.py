@@ -0,0 +1,115 @@
+# tests/unit/test_page_cache_unit.py
+import gzip
+import json
+
+import httpx
+import pytest
+
+from data_processing import downloader
+from data_processing.page_cache import PageCache, accept_encoding
+
+pytestmark = pytest.mark.unit
+
+URL = "https://api.test/learners?page=1&limit=2"
+PAGE = {"data": {"info": [{"_id": "1"}, {"_id": "2"}]}}
+
+
+class PageServer:
+    """Serve one page with an ETag, gzip-encoded, honouring If-None-Match."""
+
+    def __init__(self, body: dict, etag: str = '"v1"'):
+        self.body = json.dumps(body).encode()
+        self.etag = etag
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.headers.get("If-None-Match") == self.etag:
+            return httpx.Response(304, headers={"ETag": self.etag})
+        return httpx.Response(
+            200,
+            content=gzip.compress(self.body),
+            headers={"ETag": self.etag, "Content-Encoding": "gzip"},
+        )
+
+
+@pytest.mark.asyncio
+async def test_unchanged_page_is_revalidated_and_served_from_disk(tmp_path):
+    server = PageServer(PAGE)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(server)) as client:
+        first = PageCache(str(tmp_path), scope="biz")
+        data, size = await first.get(client, URL, {"Authorization": "Bearer a"})
+        # Next run: a new cache object over the same directory
+        second = PageCache(str(tmp_path), scope="biz")
+        cached, cached_size = await second.get(client, URL, {"Authorization": "b"})
+
+    assert data == cached == PAGE and size == cached_size == len(server.body)
+    assert "If-None-Match" not in server.requests[0].headers
+    assert server.requests[1].headers["If-None-Match"] == '"v1"'
+    assert "gzip" in server.requests[0].headers["Accept-Encoding"]
+    assert first.stats()["bytes_saved_compression"] > 0
+    assert second.stats()["not_modified"] == 1
+    assert second.stats()["bytes_saved_cache"] == len(server.body)
+
+
+@pytest.mark.asyncio
+async def test_changed_page_replaces_the_entry_and_scopes_are_separate(tmp_path):
+    server = PageServer(PAGE)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(server)) as client:
+        await PageCache(str(tmp_path), scope="biz").get(client, URL, {})
+        server.body, server.etag = json.dumps({"data": {"info": []}}).encode(), '"v2"'
+        data, _ = await PageCache(str(tmp_path), scope="biz").get(client, URL, {})
+        other = PageCache(str(tmp_path), scope="other-biz")
+        await other.get(client, URL, {})
+
+    assert data == {"data": {"info": []}}
+    assert "If-None-Match" not in server.requests[2].headers
+    assert other.stats()["not_modified"] == 0
+
+
+@pytest.mark.asyncio
+async def test_responses_without_validators_are_not_stored(tmp_path):
+    def handler(request):
+        return httpx.Response(200, json=PAGE)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        await PageCache(str(tmp_path)).get(client, URL, {})
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_accept_encoding_lists_only_decodable_encodings(mocker):
+    assert accept_encoding().startswith("gzip, deflate")
+    mocker.patch.dict("sys.modules", {"zstandard": object()})
+    assert accept_encoding().endswith("zstd")
+
+
+@pytest.mark.asyncio
+async def test_stream_learner_pages_uses_the_cache(mocker, settings, tmp_path):
+    pages = {1: PAGE["data"]["info"], 2: []}
+    served = []
+
+    def handler(request):
+        page = int(request.url.params["page"])
+        served.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == f'"p{page}"':
+            return httpx.Response(304)
+        body = {"data": {"info": pages[page]}}
+        return httpx.Response(200, json=body, headers={"ETag": f'"p{page}"'})
+
+    real_client = httpx.AsyncClient
+    mocker.patch(
+        "utils.http.httpx.AsyncClient",
+        side_effect=lambda **kw: real_client(transport=httpx.MockTransport(handler)),
+    )
+    mocker.patch.object(downloader, "get_bearer_token", return_value="token")
+    mocker.patch.object(settings, "page_cache_dir", str(tmp_path))
+
+    for _ in range(2):
+        learners = [
+            learner
+            async for page in downloader.stream_learner_pages(page_size=2)
+            for learner in page
+        ]
+        assert learners == PAGE["data"]["info"]
+    assert served == [None, None, '"p1"', '"p2"']
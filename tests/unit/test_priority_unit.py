@@ -0,0 +1,131 @@
+# tests/unit/test_priority_unit.py
+import pytest
+
+from data_processing.filters import stream_filtered_batches
+from data_processing.priority import SendQueue
+from data_processing.rules import compile_rules
+
+pytestmark = pytest.mark.unit
+
+
+def _ids(batch: list[dict]) -> list[str]:
+    return [learner["_id"] for learner in batch]
+
+
+def test_pop_batch_takes_segment_with_most_urgent_learner():
+    queue = SendQueue(capacity=10)
+    for i, (segment, score) in enumerate(
+        [("inactive", 0.2), ("stalled", 0.9), ("inactive", 0.5), ("stalled", 0.1)]
+    ):
+        queue.push(segment, score, {"_id": str(i)})
+
+    assert len(queue) == 4
+    segment, batch = queue.pop_batch(5)
+    assert (segment, _ids(batch)) == ("stalled", ["1", "3"])
+    assert list(queue.drain(1)) == [
+        ("inactive", [{"_id": "2"}]),
+        ("inactive", [{"_id": "0"}]),
+    ]
+    assert len(queue) == 0
+
+
+def test_pop_batch_prefers_segments_that_fill_a_batch():
+    queue = SendQueue(capacity=3)
+    queue.push("stalled", 0.9, {"_id": "s0"})
+    for i, score in enumerate([0.5, 0.4, 0.3]):
+        queue.push("inactive", score, {"_id": f"i{i}"})
+
+    # "stalled" holds the most urgent learner but only one: it keeps filling
+    assert queue.pop_batch(2) == ("inactive", [{"_id": "i0"}, {"_id": "i1"}])
+    assert list(queue.drain(2)) == [
+        ("stalled", [{"_id": "s0"}]),
+        ("inactive", [{"_id": "i2"}]),
+    ]
+
+
+def test_ties_keep_arrival_order_and_full_is_over_capacity():
+    queue = SendQueue(capacity=2)
+    for i in range(3):
+        queue.push("inactive", 0.5, {"_id": str(i)})
+        assert queue.full == (i == 2)
+    assert _ids(queue.pop_batch(3)[1]) == ["0", "1", "2"]
+
+
+def _learner(i: int, progress: int) -> dict:
+    # Never logged in, no sign-up date: urgency only varies with progress
+    return {
+        "_id": str(i),
+        "email": f"u{i}@test.com",
+        "program_data": {"progress_status": progress},
+    }
+
+
+PAGES = [[_learner(0, 10), _learner(1, 80)], [_learner(2, 95), _learner(3, 40)]]
+CATCH_ALL = [{"segment": "nudge", "template": "inactive", "when": {"completed": False}}]
+
+
+async def _sent_ids(source, **kwargs) -> list[list[str]]:
+    return [
+        _ids(batch)
+        async for batch, _ in stream_filtered_batches(
+            source=source, classifier=compile_rules(CATCH_ALL), **kwargs
+        )
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stream_sends_most_urgent_first_across_pages(
+    mocker, settings, paged_source
+):
+    mocker.patch.object(settings, "send_queue_size", 100)
+    # Everything fits in the queue: one globally ordered drain
+    assert await _sent_ids(paged_source(PAGES)) == [["2", "1", "3", "0"]]
+
+
+@pytest.mark.asyncio
+async def test_stream_releases_when_queue_is_over_capacity(
+    mocker, settings, paged_source
+):
+    mocker.patch.object(settings, "send_queue_size", 1)
+    mocker.patch("data_processing.filters.default_batch_size", return_value=1)
+    # Page 1 overfills the queue: its most urgent learner goes first
+    assert await _sent_ids(paged_source(PAGES)) == [["1"], ["2"], ["3"], ["0"]]
+
+
+@pytest.mark.asyncio
+async def test_stream_releases_full_batches_over_capacity(
+    mocker, settings, paged_source
+):
+    mocker.patch.object(settings, "send_queue_size", 2)
+    mocker.patch("data_processing.filters.default_batch_size", return_value=2)
+    # Learner 0 is the most urgent, but alone in its segment
+    pages = [
+        [{**_learner(0, 99), "last_loggedin_date": "2020-01-01"}],
+        [_learner(1, 80), _learner(2, 95)],
+    ]
+    rules = [
+        {
+            "segment": "never",
+            "template": "inactive",
+            "when": {"never_logged_in": True},
+        },
+        {"segment": "lapsed", "template": "low_score", "when": {"completed": False}},
+    ]
+
+    sent = [
+        (template, _ids(batch))
+        async for batch, template in stream_filtered_batches(
+            source=paged_source(pages), classifier=compile_rules(rules)
+        )
+    ]
+
+    # The lone "lapsed" learner is not sent as a batch of one mid-stream
+    assert sent == [("inactive", ["2", "1"]), ("low_score", ["0"])]
+
+
+@pytest.mark.asyncio
+async def test_stream_keeps_page_order_when_queue_disabled(
+    mocker, settings, paged_source
+):
+    mocker.patch.object(settings, "send_queue_size", 0)
+    assert await _sent_ids(paged_source(PAGES)) == [["0", "1", "2", "3"]]
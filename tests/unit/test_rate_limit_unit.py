@@ -0,0 +1,77 @@
+# tests/unit/test_rate_limit_unit.py
+import asyncio
+
+import pytest
+
+from utils.rate_limit import FairRateLimiter, acquire_budget, use_rate_limiter
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture
+def clock(clock, mocker):
+    """Virtual time: asyncio.sleep in the limiter advances the clock instantly."""
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(delay):
+        clock.now += delay
+        await real_sleep(0)
+
+    mocker.patch("utils.rate_limit.asyncio.sleep", side_effect=fake_sleep)
+    return clock
+
+
+@pytest.mark.asyncio
+async def test_unlimited_rate_never_waits():
+    limiter = FairRateLimiter(rate=0)
+    await limiter.acquire("a", 1000)
+    assert limiter.granted == {"a": 1000}
+
+
+@pytest.mark.asyncio
+async def test_tenants_are_served_round_robin(clock):
+    limiter = FairRateLimiter(rate=10, burst=10, clock=clock)
+    order = []
+
+    async def send(tenant):
+        await limiter.acquire(tenant, 10)
+        order.append(tenant)
+
+    # "big" queues its whole backlog before "small" asks once
+    tasks = [asyncio.create_task(send("big")) for _ in range(4)]
+    tasks.append(asyncio.create_task(send("small")))
+    await asyncio.gather(*tasks)
+
+    assert order[:3] == ["big", "small", "big"]
+    assert limiter.granted == {"big": 40, "small": 10}
+    # 50 tokens at 10/s with a 10-token burst: 4 seconds of waiting
+    assert clock.now == pytest.approx(4.0)
+
+
+@pytest.mark.asyncio
+async def test_cost_above_burst_goes_into_debt(clock):
+    limiter = FairRateLimiter(rate=10, burst=5, clock=clock)
+    await limiter.acquire("a", 50)  # bucket full: granted, 45 tokens owed
+    assert clock.now == 0
+    await limiter.acquire("a", 5)
+    assert clock.now == pytest.approx(5.0)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_is_skipped(clock):
+    limiter = FairRateLimiter(rate=1, burst=1, clock=clock)
+    await limiter.acquire("a")
+    waiting = asyncio.create_task(limiter.acquire("a"))
+    await asyncio.sleep(0)
+    waiting.cancel()
+    await limiter.acquire("b")
+    assert limiter.granted == {"a": 1, "b": 1}
+
+
+@pytest.mark.asyncio
+async def test_acquire_budget_uses_scoped_limiter():
+    limiter = FairRateLimiter(rate=0)
+    await acquire_budget(5)  # no scope: no-op
+    with use_rate_limiter(limiter, "cohort-1"):
+        await acquire_budget(5)
+    assert limiter.granted == {"cohort-1": 5}
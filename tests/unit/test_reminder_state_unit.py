@@ -0,0 +1,127 @@
+# tests/unit/test_reminder_state_unit.py
+from datetime import datetime, timezone
+
+import pytest
+
+from data_processing.filters import stream_filtered_batches
+from data_processing.reminder_state import (
+    ReminderState,
+    ReminderStateStore,
+    ReminderThrottle,
+)
+from utils.timestamps import DAY_SECONDS
+
+pytestmark = pytest.mark.unit
+
+NOW = int(datetime(2025, 9, 1, tzinfo=timezone.utc).timestamp())
+
+
+def _iso(epoch: int) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat()
+
+
+def _learner(learner_id: str, last_login: int | None = None) -> dict:
+    return {
+        "_id": learner_id,
+        "email": f"{learner_id}@test.com",
+        "last_loggedin_date": _iso(last_login) if last_login else None,
+        "program_data": {"progress_status": 10},
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ReminderStateStore(str(tmp_path / "state" / "reminders.db"))
+    yield store
+    store.close()
+
+
+def _days_ago(days: float) -> int:
+    return int(NOW - days * DAY_SECONDS)
+
+
+def test_store_roundtrip_in_bulk(store):
+    rows = [(str(i), NOW, 1, None, "inactive") for i in range(2000)]
+    assert store.save(rows) == 2000
+    states = store.load([str(i) for i in range(0, 2000, 2)] + ["missing"])
+    assert len(states) == 1000
+    assert states["10"] == ReminderState(NOW, 1, None)
+
+
+@pytest.mark.parametrize(
+    "state,activity_days_ago,expected",
+    [
+        (None, 40, True),  # never reminded
+        (ReminderState(_days_ago(10), 1, _days_ago(40)), 40, False),  # cooldown
+        (ReminderState(_days_ago(22), 1, _days_ago(40)), 40, True),  # 21d elapsed
+        (ReminderState(_days_ago(30), 2, _days_ago(60)), 60, False),  # backoff: 42d
+        (ReminderState(_days_ago(43), 2, _days_ago(60)), 60, True),
+        (
+            ReminderState(_days_ago(90), 3, _days_ago(100)),
+            100,
+            False,
+        ),  # max_reminders reached
+        # came back after the last reminder: backoff reset, base cooldown applies
+        (ReminderState(_days_ago(30), 3, _days_ago(100)), 25, True),
+        # never logged in when reminded, has logged in since: backoff reset too
+        (ReminderState(_days_ago(30), 3, None), 25, True),
+        (ReminderState(_days_ago(30), 3, None), None, False),
+    ],
+)
+def test_cooldown_and_backoff(store, state, activity_days_ago, expected):
+    throttle = ReminderThrottle(store, cooldown_days=21, max_reminders=3, now=NOW)
+    activity = None if activity_days_ago is None else _days_ago(activity_days_ago)
+    assert throttle._eligible(state, activity) is expected
+
+
+def test_filter_mark_and_flush_across_runs(store):
+    learners = [_learner("a", _days_ago(30)), _learner("b", _days_ago(30))]
+
+    first = ReminderThrottle(store, now=NOW)
+    kept = first.filter_buckets({"inactive": learners})
+    assert len(kept["inactive"]) == 2
+    first.mark_reminded(kept["inactive"][:1], "inactive")
+    assert store.load(["a"]) == {}  # nothing written until flush
+    assert first.flush() == 1
+
+    # A week later "a" is in cooldown, "b" was never reminded
+    second = ReminderThrottle(store, now=NOW + 7 * DAY_SECONDS)
+    kept = second.filter_buckets({"inactive": learners})
+    assert [learner["_id"] for learner in kept["inactive"]] == ["b"]
+    assert second.skipped == 1
+
+    # "a" logs in again after the reminder and goes inactive again later
+    returned = [_learner("a", NOW + DAY_SECONDS)]
+    third = ReminderThrottle(store, now=NOW + 30 * DAY_SECONDS)
+    kept = third.filter_buckets({"inactive": returned})
+    third.mark_reminded(kept["inactive"], "inactive")
+    third.flush()
+    assert store.load(["a"])["a"].times_reminded == 1  # backoff was reset
+
+
+def test_first_login_after_a_reminder_resets_backoff(store):
+    store.save([("a", _days_ago(30), 3, None, "never_logged_in")])
+    throttle = ReminderThrottle(store, cooldown_days=21, max_reminders=3, now=NOW)
+
+    kept = throttle.filter_buckets({"inactive": [_learner("a", _days_ago(25))]})
+    throttle.mark_reminded(kept["inactive"], "inactive")
+    throttle.flush()
+
+    assert store.load(["a"])["a"] == ReminderState(NOW, 1, _days_ago(25))
+
+
+@pytest.mark.asyncio
+async def test_stream_filtered_batches_applies_throttle(store, paged_source):
+    source = paged_source(
+        [[_learner("a", _days_ago(30)), _learner("b", _days_ago(30))]]
+    )
+
+    store.save([("a", int(datetime.now(timezone.utc).timestamp()), 1, None, "x")])
+    throttle = ReminderThrottle(store)
+
+    batches = [
+        [learner["_id"] for learner in batch]
+        async for batch, _ in stream_filtered_batches(source=source, throttle=throttle)
+    ]
+
+    assert batches == [["b"]]
@@ -0,0 +1,94 @@
+# tests/unit/test_render_cache_unit.py
+import sys
+
+import pytest
+
+import email_sender.mailjet_client as mj
+from email_sender import render_cache as rc
+from email_sender.render_cache import RenderCache
+from email_sender.templates import INACTIVE_TEMPLATE
+
+pytestmark = pytest.mark.unit
+
+TEMPLATE = {
+    "subject": "Hi",
+    "body": "Hello {first_name}",
+    "html": "<b>{first_name}</b>",
+}
+
+
+def test_render_matches_format_and_counts_hits():
+    cache = RenderCache()
+
+    first = cache.render(TEMPLATE, first_name="Ada")
+    second = cache.render(TEMPLATE, first_name="Ada")
+    cache.render(TEMPLATE, first_name="Tunde")
+
+    assert first == second == ("Hello Ada", "<b>Ada</b>")
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+    assert cache.stats()["hit_rate"] == pytest.approx(1 / 3, abs=1e-4)
+
+
+def test_every_variable_and_the_template_text_are_part_of_the_key():
+    cache = RenderCache()
+    other = {"subject": "Hi", "body": "Welcome back {first_name}"}
+    personal = {"subject": "Hi", "body": "{first_name}, {cohort}"}
+
+    assert cache.render(TEMPLATE, first_name="Ada")[0] == "Hello Ada"
+    # Same name, different template text (e.g. another tenant's override)
+    assert cache.render(other, first_name="Ada") == (
+        "Welcome back Ada",
+        "Welcome back Ada",
+    )
+    assert cache.render(personal, first_name="Ada", cohort="3")[0] == "Ada, 3"
+    assert cache.render(personal, cohort="4", first_name="Ada")[0] == "Ada, 4"
+    assert cache.stats()["hits"] == 0
+
+
+def test_evicts_least_recently_used_beyond_the_byte_budget():
+    entry = sys.getsizeof("Hello Ada") + sys.getsizeof("<b>Ada</b>")
+    cache = RenderCache(max_bytes=entry * 2)
+
+    cache.render(TEMPLATE, first_name="Ada")
+    cache.render(TEMPLATE, first_name="Bob")
+    cache.render(TEMPLATE, first_name="Ada")  # Bob is now least recent
+    cache.render(TEMPLATE, first_name="Eve")
+
+    assert len(cache) == 2 and cache.bytes <= cache.max_bytes
+    assert cache.evictions == 1
+    cache.render(TEMPLATE, first_name="Ada")
+    assert cache.hits == 2
+
+
+def test_zero_bytes_disables_caching():
+    cache = RenderCache(max_bytes=0)
+    cache.render(TEMPLATE, first_name="Ada")
+    cache.render(TEMPLATE, first_name="Ada")
+
+    assert len(cache) == 0 and cache.hits == 0 and cache.misses == 2
+
+
+@pytest.mark.asyncio
+async def test_send_batch_emails_renders_each_name_once(mocker):
+    mocker.patch.object(rc, "_cache", None)
+    mocker.patch.object(mj.settings, "test_mode", False)
+    mocker.patch.object(mj.settings, "test_email_address", None)
+    names = ["ada", "Tunde", "Ngozi"]
+    learners = [
+        {"_id": str(i), "email": f"u{i}@test.com", "firstName": names[i % 3]}
+        for i in range(120)
+    ]
+    payloads = []
+
+    async def fake_send_email(client, payload, batch_id):
+        payloads.append(payload)
+        return True
+
+    mocker.patch("email_sender.mailjet_client._send_email", new=fake_send_email)
+
+    await mj.send_batch_emails(learners, template_type="inactive")
+
+    stats = rc.render_cache().stats()
+    assert (stats["misses"], stats["hits"]) == (3, 117)
+    first = payloads[0]["Messages"][0]
+    assert first["TextPart"] == INACTIVE_TEMPLATE["body"].format(first_name="Ada")
@@ -0,0 +1,255 @@
+# tests/unit/test_retry_unit.py
+import httpx
+import pytest
+
+from utils.retry import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryBudget,
+    RetryGuard,
+    is_transient_error,
+    retry_after_seconds,
+    transient_retry,
+    use_retry_guard,
+    wait_configured_exponential,
+)
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture
+def no_wait(mocker, settings):
+    mocker.patch.object(wait_configured_exponential, "__call__", return_value=0)
+    return settings
+
+
+def _status_error(status: int, headers: dict | None = None) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "https://example.com")
+    response = httpx.Response(status, request=request, headers=headers)
+    return httpx.HTTPStatusError("error", request=request, response=response)
+
+
+@pytest.mark.parametrize(
+    "exc,expected",
+    [
+        (httpx.ConnectTimeout("timeout"), True),
+        (httpx.ReadTimeout("timeout"), True),
+        (_status_error(503), True),
+        (_status_error(429), True),
+        (_status_error(400), False),
+        (ValueError("boom"), False),
+    ],
+)
+def test_is_transient_error(exc, expected):
+    assert is_transient_error(exc) is expected
+
+
+@pytest.mark.parametrize("max_retries", [1, 2, 4])
+@pytest.mark.asyncio
+async def test_transient_retry_reads_max_retries_at_call_time(
+    mocker, no_wait, max_retries
+):
+    """Changing settings after decoration changes the attempt count."""
+    calls = []
+
+    @transient_retry()
+    async def flaky():
+        calls.append(1)
+        raise httpx.ConnectTimeout("timeout")
+
+    mocker.patch.object(no_wait, "max_retries", max_retries)
+    with pytest.raises(httpx.ConnectTimeout):
+        await flaky()
+    assert len(calls) == max_retries
+
+
+@pytest.mark.asyncio
+async def test_transient_retry_does_not_retry_client_errors(mocker, no_wait):
+    calls = []
+
+    @transient_retry()
+    async def bad_request():
+        calls.append(1)
+        raise _status_error(400)
+
+    mocker.patch.object(no_wait, "max_retries", 3)
+    with pytest.raises(httpx.HTTPStatusError):
+        await bad_request()
+    assert len(calls) == 1
+
+
+def test_wait_scales_with_configured_delay(mocker, settings):
+    state = mocker.Mock(attempt_number=3)
+    mocker.patch.object(settings, "retry_delay", 2)
+    assert wait_configured_exponential(min=1, max=60)(state) == 8
+    mocker.patch.object(settings, "retry_delay", 5)
+    assert wait_configured_exponential(min=1, max=60)(state) == 20
+
+
+def test_retry_after_header_sets_the_wait(mocker, settings):
+    state = mocker.Mock(attempt_number=1)
+    mocker.patch.object(settings, "retry_delay", 1)
+    state.outcome.exception.return_value = _status_error(429, {"Retry-After": "17"})
+    assert wait_configured_exponential(min=1, max=60)(state) == 17
+    state.outcome.exception.return_value = _status_error(429, {"Retry-After": "600"})
+    assert wait_configured_exponential(min=1, max=60)(state) == 60
+    assert retry_after_seconds(_status_error(503, {"Retry-After": "soon"})) == 0
+
+
+def test_circuit_breaker_opens_fails_fast_and_probes(clock):
+    breaker = CircuitBreaker(
+        "darey", failure_threshold=2, reset_timeout=30, clock=clock
+    )
+
+    breaker.record_failure()
+    assert breaker.state() == "closed"
+    breaker.record_failure()
+    assert breaker.state() == "open"
+    with pytest.raises(CircuitOpenError, match="darey"):
+        breaker.before_call()
+
+    clock.now += 31
+    breaker.before_call()  # the probe
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # only one at a time
+    breaker.record_failure()
+    assert breaker.state() == "open" and breaker.times_opened == 2
+
+    clock.now += 31
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state() == "closed"
+    assert breaker.stats() == {"state": "closed", "times_opened": 2, "rejected": 2}
+
+
+def test_retry_budget_grows_with_requests():
+    budget = RetryBudget(ratio=0.5, min_retries=1)
+
+    assert budget.try_spend() and not budget.try_spend()
+    for _ in range(4):
+        budget.record_request()
+    assert budget.try_spend() and budget.try_spend() and not budget.try_spend()
+    assert budget.stats() == {"requests": 4, "retries": 3, "denied": 2}
+
+
+@pytest.mark.asyncio
+async def test_guarded_calls_share_the_budget_and_fail_fast(mocker, no_wait):
+    mocker.patch.object(no_wait, "max_retries", 5)
+    guard = RetryGuard(RetryBudget(ratio=0, min_retries=3), failure_threshold=10)
+    calls = []
+
+    @transient_retry("mailjet")
+    async def down():
+        calls.append(1)
+        raise httpx.ConnectTimeout("timeout")
+
+    with use_retry_guard(guard):
+        with pytest.raises(httpx.ConnectTimeout):
+            await down()
+        with pytest.raises(httpx.ConnectTimeout):
+            await down()
+    # 3 retries in total, not 4 per call
+    assert len(calls) == 5
+    assert guard.stats()["denied"] == 2
+
+    guard = RetryGuard(RetryBudget(min_retries=100), failure_threshold=2)
+    calls.clear()
+    with use_retry_guard(guard):
+        with pytest.raises(httpx.ConnectTimeout):
+            await down()
+        with pytest.raises(CircuitOpenError):
+            await down()
+    # The circuit opened on the second attempt; later calls never go out
+    assert len(calls) == 2
+    assert guard.stats()["circuits"]["mailjet"]["state"] == "open"
+
+
+@pytest.mark.asyncio
+async def test_client_errors_do_not_trip_the_breaker(no_wait):
+    guard = RetryGuard(RetryBudget(), failure_threshold=1)
+
+    @transient_retry("darey")
+    async def bad_request():
+        raise _status_error(400)
+
+    with use_retry_guard(guard):
+        for _ in range(3):
+            with pytest.raises(httpx.HTTPStatusError):
+                await bad_request()
+    assert guard.breaker("darey").state() == "closed"
+
+
+@pytest.mark.asyncio
+async def test_run_workflow_stops_when_the_mailjet_circuit_opens(
+    mocker, settings, paged_source
+):
+    from email_sender.mailjet_client import BatchSendError
+    from main import run_workflow
+
+    learners = [
+        {"_id": str(i), "email": f"u{i}@test.com", "program_data": {}}
+        for i in range(12)
+    ]
+    mocker.patch(
+        "data_processing.sources.create_learner_source",
+        return_value=paged_source([learners[:6], learners[6:]]),
+    )
+    mocker.patch("data_processing.filters.default_batch_size", return_value=4)
+    calls = []
+
+    async def fake_send(batch, template_type):
+        calls.append(batch)
+        raise BatchSendError([CircuitOpenError("mailjet", 30)], batch[:1])
+
+    mocker.patch("email_sender.mailjet_client.send_batch_emails", new=fake_send)
+    mocker.patch.object(settings, "run_checkpoint_path", None)
+    mocker.patch.object(settings, "reminder_state_path", None)
+    mocker.patch.object(settings, "send_queue_size", 0)
+
+    summary = await run_workflow()
+
+    assert len(calls) == 1
+    assert summary["stop_reason"] == "circuit_open" and summary["emails_sent"] == 1
+    assert summary["retries"]["denied"] == 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_host_is_retried_without_opening_the_circuit(no_wait):
+    guard = RetryGuard(RetryBudget(), failure_threshold=1)
+    attempts = []
+
+    @transient_retry("mailjet:a")
+    async def throttled():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise _status_error(429, {"Retry-After": "1"})
+        return "sent"
+
+    with use_retry_guard(guard):
+        assert await throttled() == "sent"
+    assert guard.breaker("mailjet:a").state() == "closed"
+
+
+@pytest.mark.asyncio
+async def test_breakers_are_keyed_per_account(no_wait):
+    import email_sender.mailjet_client as mj
+
+    guard = RetryGuard(RetryBudget(), failure_threshold=1)
+
+    @transient_retry(lambda account: account)
+    async def send(account):
+        if account == "mailjet:a":
+            raise httpx.ConnectTimeout("timeout")
+        return account
+
+    with use_retry_guard(guard):
+        with pytest.raises(httpx.ConnectTimeout):
+            await send("mailjet:a")
+        with pytest.raises(CircuitOpenError):
+            await send("mailjet:a")
+        # Another account keeps sending while the first one is down
+        assert await send("mailjet:b") == "mailjet:b"
+
+    backend = mj.MailjetBackend("key-b-123456", "secret")
+    assert mj.breaker_key(backend._get_client(), {}, "batch") == "mailjet:key-b-12"
+    await backend.aclose()
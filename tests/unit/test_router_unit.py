@@ -0,0 +1,177 @@
+# tests/unit/test_router_unit.py
+import json
+
+import pytest
+
+import email_sender.mailjet_client as mj
+from email_sender.backends import create_email_backend, use_email_backend
+from email_sender.router import EmailRouter, Provider, load_router
+from email_sender.smtp_backend import SMTPBackend
+
+pytestmark = pytest.mark.unit
+
+
+class FakeBackend:
+    def __init__(self, name, fail=False, reject=False, seconds=0.0, clock=None):
+        self.name = name
+        self.fail = fail
+        self.reject = reject
+        self.seconds = seconds
+        self.clock = clock
+        self.max_messages = 50
+        self.max_request_bytes = 1000
+        self.batches = []
+        self.closed = False
+
+    async def send(self, messages, batch_id):
+        self.batches.append(batch_id)
+        if self.clock is not None:
+            self.clock.now += self.seconds
+        if self.fail:
+            raise ConnectionError(f"{self.name} down")
+        return [not self.reject] * len(messages)
+
+    async def aclose(self):
+        self.closed = True
+
+
+def _router(*backends, weights=None, **kwargs):
+    weights = weights or [1] * len(backends)
+    providers = [Provider(b.name, b, w) for b, w in zip(backends, weights)]
+    return EmailRouter(providers, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_weighted_round_robin_spreads_groups():
+    a, b = FakeBackend("a"), FakeBackend("b")
+    router = _router(a, b, weights=[3, 1])
+
+    for i in range(8):
+        assert await router.send([{}], f"batch_{i}") == [True]
+
+    assert (len(a.batches), len(b.batches)) == (6, 2)
+    # Smooth WRR interleaves rather than sending 3 in a row to `a`
+    assert b.batches == ["batch_2", "batch_6"]
+    assert router.stats()["providers"]["a"]["messages"] == 6
+
+
+@pytest.mark.asyncio
+async def test_failed_group_fails_over_and_provider_is_ejected(clock):
+    down, up = FakeBackend("down", fail=True), FakeBackend("up")
+    router = _router(down, up, cooldown=30, min_requests=2, smoothing=0.5, clock=clock)
+
+    for i in range(6):
+        assert await router.send([{}, {}], f"batch_{i}") == [True, True]
+
+    # After two failures `down` is ejected and no longer tried
+    assert len(down.batches) == 2 and len(up.batches) == 6
+    stats = router.stats()
+    assert stats["failovers"] == 2
+    assert stats["providers"]["down"]["state"] == "ejected"
+    assert stats["providers"]["up"]["state"] == "healthy"
+
+
+@pytest.mark.asyncio
+async def test_half_open_probe_restores_a_recovered_provider(clock):
+    flaky, steady = FakeBackend("flaky", fail=True), FakeBackend("steady")
+    router = _router(
+        flaky, steady, cooldown=30, min_requests=1, smoothing=1.0, clock=clock
+    )
+    await router.send([{}], "b1")
+    assert router.stats()["providers"]["flaky"]["state"] == "ejected"
+
+    clock.now += 31
+    flaky.fail = False
+    for i in range(4):
+        await router.send([{}], f"probe_{i}")
+
+    assert router.stats()["providers"]["flaky"]["state"] == "healthy"
+    assert len(flaky.batches) >= 2
+
+
+@pytest.mark.asyncio
+async def test_slow_provider_is_ejected_on_latency(clock):
+    slow = FakeBackend("slow", seconds=30, clock=clock)
+    fast = FakeBackend("fast", seconds=0.1, clock=clock)
+    router = _router(
+        slow, fast, max_latency=5, min_requests=1, smoothing=1.0, clock=clock
+    )
+
+    for i in range(6):
+        await router.send([{}], f"b{i}")
+
+    assert len(slow.batches) == 1
+    assert router.stats()["providers"]["slow"]["state"] == "ejected"
+
+
+@pytest.mark.asyncio
+async def test_all_providers_failing_raises_the_last_error():
+    router = _router(FakeBackend("a", fail=True), FakeBackend("b", fail=True))
+
+    with pytest.raises(ConnectionError, match="down"):
+        await router.send([{}], "batch")
+
+
+@pytest.mark.asyncio
+async def test_whole_group_rejection_fails_over_partial_does_not():
+    rejecting, accepting = FakeBackend("r", reject=True), FakeBackend("ok")
+    router = _router(rejecting, accepting)
+
+    assert await router.send([{}, {}], "b1") == [True, True]
+    assert rejecting.batches == ["b1"] and accepting.batches == ["b1"]
+
+
+@pytest.mark.asyncio
+async def test_router_behind_send_batch_emails(mocker):
+    mocker.patch.object(mj.settings, "test_mode", False)
+    mocker.patch.object(mj.settings, "test_email_address", None)
+    a, b = FakeBackend("a"), FakeBackend("b")
+    a.max_messages = b.max_messages = 2
+    a.max_request_bytes = b.max_request_bytes = 10**6
+    router = _router(a, b)
+    learners = [{"_id": str(i), "email": f"u{i}@test.com"} for i in range(8)]
+
+    with use_email_backend(router):
+        delivered = await mj.send_batch_emails(learners)
+    await router.aclose()
+
+    assert delivered == learners
+    assert len(a.batches) == len(b.batches) == 2
+    assert a.closed and b.closed
+
+
+def test_load_router_builds_backends_from_overrides(mocker, settings, tmp_path):
+    mocker.patch.dict("os.environ", {"MJ_B_KEY": "key-b"})
+    path = tmp_path / "providers.json"
+    path.write_text(
+        json.dumps(
+            [
+                {"name": "mj-a", "weight": 2},
+                {
+                    "name": "mj-b",
+                    "mailjet_api_key": "${MJ_B_KEY}",
+                    "mailjet_api_secret": "secret-b",
+                },
+                {"name": "relay", "email_backend": "smtp", "smtp_host": "mx.test"},
+            ]
+        )
+    )
+    mocker.patch.object(settings, "email_providers_path", str(path))
+
+    router = create_email_backend()
+
+    assert isinstance(router, EmailRouter)
+    a, b, relay = (p.backend for p in router.providers)
+    assert router.providers[0].weight == 2
+    assert isinstance(a, mj.MailjetBackend) and isinstance(b, mj.MailjetBackend)
+    assert b.auth == ("key-b", "secret-b")
+    assert isinstance(relay, SMTPBackend) and relay._options["host"] == "mx.test"
+    assert router.max_messages == 10  # the SMTP backend's group size
+
+
+def test_load_router_rejects_duplicate_names(tmp_path):
+    path = tmp_path / "providers.json"
+    path.write_text(json.dumps([{"name": "a"}, {"name": "a"}]))
+
+    with pytest.raises(ValueError, match="Duplicate"):
+        load_router(str(path))
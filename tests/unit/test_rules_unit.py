@@ -0,0 +1,210 @@
+# tests/unit/test_rules_unit.py
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from data_processing.rules import (
+    DEFAULT_RULES,
+    compile_rules,
+    learner_facts,
+    load_rules,
+    urgency_score,
+)
+from email_sender.templates import TEMPLATES
+
+pytestmark = pytest.mark.unit
+
+now = datetime.now(timezone.utc)
+
+
+def _learner(days_inactive=None, progress=50, joined_days_ago=None, **extra):
+    learner = {
+        "_id": "1",
+        "email": "a@test.com",
+        "program_data": {"progress_status": progress},
+        **extra,
+    }
+    if days_inactive is not None:
+        learner["last_loggedin_date"] = (
+            now - timedelta(days=days_inactive)
+        ).isoformat()
+    if joined_days_ago is not None:
+        learner["createdAt"] = (now - timedelta(days=joined_days_ago)).isoformat()
+    return learner
+
+
+@pytest.mark.parametrize(
+    "learner,expected",
+    [
+        (_learner(days_inactive=None, joined_days_ago=2), "new_this_week"),
+        (_learner(days_inactive=None, joined_days_ago=30), "never_logged_in"),
+        (_learner(days_inactive=None), "never_logged_in"),
+        (_learner(days_inactive=30, progress=95), "stalled"),
+        (_learner(days_inactive=30, progress=60), "inactive"),
+        (_learner(days_inactive=1, progress=10), "low_score"),
+        (_learner(days_inactive=1, progress=80), None),
+        (_learner(days_inactive=30, progress=100), None),  # completed
+        (_learner(days_inactive=30, progress="100"), None),  # numeric string
+        (_learner(days_inactive=30, progress="n/a"), "inactive"),  # invalid progress
+        (_learner(progress=10, last_loggedin_date="invalid-date"), "low_score"),
+        ({"_id": "1", "email": None, "program_data": {}}, None),
+        ({"_id": None, "email": "a@test.com", "program_data": {}}, None),
+    ],
+)
+def test_default_rules_segments(settings, learner, expected):
+    settings.inactive_days = 14
+    settings.low_score_threshold = 50
+    assert compile_rules().classify(learner) == expected
+
+
+def test_every_default_segment_has_a_template():
+    for rule in compile_rules(DEFAULT_RULES).rules:
+        assert rule.template in TEMPLATES
+
+
+def test_settings_are_resolved_at_compile_time(mocker, settings):
+    learner = _learner(days_inactive=1, progress=40)
+    mocker.patch.object(settings, "low_score_threshold", 30)
+    strict = compile_rules()
+    mocker.patch.object(settings, "low_score_threshold", 50)
+    lenient = compile_rules()
+    assert strict.classify(learner) is None
+    assert lenient.classify(learner) == "low_score"
+
+
+def test_partition_is_single_pass_over_facts(mocker):
+    facts = mocker.patch(
+        "data_processing.rules.learner_facts", side_effect=learner_facts
+    )
+    page = [_learner(days_inactive=d) for d in (1, 20, 40)]
+    buckets = compile_rules().partition(page)
+    assert facts.call_count == len(page)
+    assert len(buckets["inactive"]) == 2
+
+
+def test_custom_rules_file_with_template_mapping(tmp_path):
+    rules = [
+        {
+            "segment": "dormant",
+            "template": "inactive",
+            "when": {"inactive_for_days": 60},
+        },
+        {
+            "segment": "recent",
+            "template": "low_score",
+            "when": {"active_within_days": 7},
+        },
+    ]
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(rules))
+
+    classifier = compile_rules(load_rules(str(path)))
+
+    assert classifier.classify(_learner(days_inactive=90)) == "dormant"
+    assert classifier.classify(_learner(days_inactive=2)) == "recent"
+    assert classifier.classify(_learner(days_inactive=30)) is None
+    assert classifier.templates == {"dormant": "inactive", "recent": "low_score"}
+
+
+def test_unknown_template_is_rejected(mocker, settings, tmp_path):
+    rules = [{"segment": "recent", "when": {"active_within_days": 7}}]
+    with pytest.raises(ValueError, match="unknown template 'recent'"):
+        compile_rules(rules)
+
+    # A tenant's TEMPLATES_PATH may define it
+    path = tmp_path / "templates.json"
+    path.write_text(json.dumps({"recent": {"subject": "Hi", "body": "Hello"}}))
+    mocker.patch.object(settings, "templates_path", str(path))
+    assert compile_rules(rules).templates == {"recent": "recent"}
+
+
+def test_shared_conditions_are_hoisted_and_created_parsed_only_when_used(mocker):
+    facts = mocker.patch(
+        "data_processing.rules.learner_facts", side_effect=learner_facts
+    )
+    classifier = compile_rules(
+        [
+            {
+                "segment": "inactive",
+                "when": {"completed": False, "inactive_for_days": 30},
+            },
+            {"segment": "low_score", "when": {"completed": False, "progress_lt": 50}},
+        ]
+    )
+    assert [len(rule.conditions) for rule in classifier.rules] == [1, 1]
+    assert not classifier.needs_created
+    assert classifier.classify(_learner(days_inactive=40, joined_days_ago=1)) == (
+        "inactive"
+    )
+    assert classifier.classify(_learner(days_inactive=1, progress=100)) is None
+    assert facts.call_args.args[1] is False
+    assert compile_rules().needs_created  # new_this_week uses the sign-up date
+
+
+def test_unknown_condition_is_rejected():
+    with pytest.raises(ValueError):
+        compile_rules([{"segment": "x", "when": {"favourite_colour": "blue"}}])
+
+
+@pytest.mark.parametrize(
+    "more,less",
+    [
+        (
+            _learner(days_inactive=40, progress=50),
+            _learner(days_inactive=20, progress=50),
+        ),
+        (
+            _learner(days_inactive=30, progress=95),
+            _learner(days_inactive=30, progress=20),
+        ),
+        (_learner(days_inactive=None), _learner(days_inactive=None, joined_days_ago=3)),
+    ],
+)
+def test_urgency_ranks_longer_absence_and_further_progress_higher(more, less):
+    ts = now.timestamp()
+    assert urgency_score(learner_facts(more), ts) > urgency_score(
+        learner_facts(less), ts
+    )
+
+
+def test_urgency_is_bounded():
+    ts = now.timestamp()
+    fresh = urgency_score(learner_facts(_learner(days_inactive=0, progress=0)), ts)
+    assert fresh == pytest.approx(0, abs=1e-6)
+    capped = urgency_score(learner_facts(_learner(days_inactive=500, progress=100)), ts)
+    assert capped == pytest.approx(1.0)
+
+
+def test_classifier_urgency_uses_compile_time_and_cap(mocker, settings):
+    mocker.patch.object(settings, "urgency_cap_days", 10)
+    classifier = compile_rules(now=now.timestamp())
+    assert classifier.urgency(_learner(days_inactive=10, progress=0)) == (
+        pytest.approx(0.7)
+    )
+    assert classifier.urgency(_learner(days_inactive=40, progress=0)) == (
+        pytest.approx(0.7)
+    )
+
+
+def test_partition_scores_urgency_from_the_facts_it_parsed(mocker):
+    classifier = compile_rules(
+        [{"segment": "inactive", "when": {"completed": False, "progress_lt": 101}}],
+        now=now.timestamp(),
+    )
+    assert not classifier.needs_created
+    page = [
+        _learner(days_inactive=40, progress=80),
+        _learner(days_inactive=None, joined_days_ago=3),  # counts from sign-up
+    ]
+    expected = [classifier.urgency(learner) for learner in page]
+    facts = mocker.patch(
+        "data_processing.rules.learner_facts", side_effect=learner_facts
+    )
+
+    scores: dict[int, float] = {}
+    buckets = classifier.partition(page, scores)
+
+    assert buckets["inactive"] == page
+    assert [scores[id(learner)] for learner in page] == pytest.approx(expected)
+    assert facts.call_count == len(page)  # parsed once, not again for urgency
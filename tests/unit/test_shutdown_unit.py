@@ -0,0 +1,203 @@
+# tests/unit/test_shutdown_unit.py
+import asyncio
+import json
+import os
+import signal
+
+import pytest
+
+import email_sender.mailjet_client as mj
+from utils.budget import RunBudget, budget_exhausted, use_budget
+from utils.shutdown import drain, install_signal_handlers, shutdown
+
+pytestmark = pytest.mark.unit
+
+
+async def _returns(value, delay=0.0):
+    await asyncio.sleep(delay)
+    return value
+
+
+async def _request_later(delay: float, grace: float) -> None:
+    await asyncio.sleep(delay)
+    shutdown.request("SIGTERM", grace=grace)
+
+
+@pytest.mark.asyncio
+async def test_drain_returns_outcomes_in_order():
+    async def boom():
+        raise ValueError("nope")
+
+    tasks = [asyncio.create_task(c) for c in (_returns(1, 0.01), boom(), _returns(3))]
+    outcomes = await drain(tasks)
+
+    assert outcomes[0] == 1 and outcomes[2] == 3
+    assert isinstance(outcomes[1], ValueError)
+
+
+@pytest.mark.asyncio
+async def test_drain_cancels_stragglers_at_the_shutdown_deadline():
+    tasks = [
+        asyncio.create_task(_returns("fast", 0.02)),
+        asyncio.create_task(_returns("slow", 30)),
+    ]
+    asyncio.create_task(_request_later(0.01, grace=0.05))
+
+    outcomes = await asyncio.wait_for(drain(tasks), timeout=2)
+
+    assert outcomes[0] == "fast"
+    assert isinstance(outcomes[1], asyncio.CancelledError)
+
+
+def test_shutdown_exhausts_budgets():
+    budget = RunBudget()
+    assert budget_exhausted() is None
+    shutdown.request("SIGINT", grace=0)
+
+    assert budget_exhausted() == "shutdown"
+    with use_budget(budget):
+        assert budget_exhausted() == "shutdown"
+    assert budget.email_allowance(10) == 0
+    assert budget.summary()["stop_reason"] == "shutdown"
+    assert shutdown.remaining() == 0
+
+
+@pytest.mark.asyncio
+async def test_sigterm_requests_a_graceful_shutdown():
+    install_signal_handlers()
+    loop = asyncio.get_running_loop()
+    try:
+        os.kill(os.getpid(), signal.SIGTERM)
+        await asyncio.wait_for(shutdown.wait(), timeout=2)
+        assert shutdown.signal_name == "SIGTERM"
+    finally:
+        loop.remove_signal_handler(signal.SIGTERM)
+        loop.remove_signal_handler(signal.SIGINT)
+
+
+@pytest.fixture
+def live_send(mocker):
+    mocker.patch.object(mj.settings, "test_mode", False)
+    mocker.patch.object(mj.settings, "test_email_address", None)
+
+
+@pytest.mark.asyncio
+async def test_send_batch_returns_only_chunks_delivered_before_the_deadline(
+    mocker, live_send
+):
+    learners = [{"_id": str(i), "email": f"u{i}@test.com"} for i in range(60)]
+
+    async def fake_send_email(client, payload, batch_id):
+        # The second chunk is still in flight when the deadline passes
+        await asyncio.sleep(0.01 if batch_id.endswith("_1") else 30)
+        return True
+
+    mocker.patch("email_sender.mailjet_client._send_email", new=fake_send_email)
+    asyncio.create_task(_request_later(0.005, grace=0.05))
+
+    delivered = await asyncio.wait_for(mj.send_batch_emails(learners), timeout=2)
+
+    assert delivered == learners[:50]
+
+
+@pytest.mark.asyncio
+async def test_send_batch_error_carries_delivered_learners(mocker, live_send):
+    learners = [{"_id": str(i), "email": f"u{i}@test.com"} for i in range(120)]
+
+    async def fake_send_email(client, payload, batch_id):
+        if batch_id.endswith("_2"):
+            raise RuntimeError("mailjet down")
+        return not batch_id.endswith("_3")  # non-200: not delivered, no raise
+
+    mocker.patch("email_sender.mailjet_client._send_email", new=fake_send_email)
+
+    with pytest.raises(mj.BatchSendError) as info:
+        await mj.send_batch_emails(learners)
+
+    assert info.value.delivered == learners[:50]
+    assert isinstance(info.value.errors[0], RuntimeError)
+
+
+@pytest.mark.asyncio
+async def test_run_workflow_stops_on_shutdown_and_checkpoints(
+    mocker, settings, tmp_path, paged_source
+):
+    from main import run_workflow
+
+    learners = [
+        {"_id": str(i), "email": f"u{i}@test.com", "program_data": {}}
+        for i in range(250)
+    ]
+    pages = [learners[i : i + 50] for i in range(0, 250, 50)]
+    mocker.patch(
+        "data_processing.sources.create_learner_source",
+        return_value=paged_source(pages),
+    )
+    mocker.patch.object(settings, "adaptive_min_size", 100)
+    mocker.patch.object(settings, "adaptive_max_size", 100)
+    sent = []
+
+    async def fake_send(batch, template_type):
+        sent.extend(batch)
+        shutdown.request("SIGTERM", grace=0)
+        return batch
+
+    mocker.patch("email_sender.mailjet_client.send_batch_emails", new=fake_send)
+    checkpoint = tmp_path / "last_run.json"
+    mocker.patch.object(settings, "run_checkpoint_path", str(checkpoint))
+    mocker.patch.object(settings, "reminder_state_path", None)
+    mocker.patch.object(settings, "send_queue_size", 0)
+
+    summary = await run_workflow()
+
+    # The batch in flight when the signal came went out; nothing after it
+    assert len(sent) == 100
+    assert summary["stop_reason"] == "shutdown" and summary["emails_sent"] == 100
+    assert json.loads(checkpoint.read_text())["stop_reason"] == "shutdown"
+
+
+@pytest.mark.asyncio
+async def test_run_workflow_saves_reminder_state_when_the_run_fails(
+    mocker, settings, tmp_path, paged_source
+):
+    from data_processing.reminder_state import ReminderStateStore
+    from main import run_workflow
+
+    class FailingSource(paged_source):
+        async def pages(self):
+            async for page in super().pages():
+                yield page
+            raise RuntimeError("download failed")
+
+    learners = [
+        {"_id": str(i), "email": f"u{i}@test.com", "program_data": {}}
+        for i in range(100)
+    ]
+    mocker.patch(
+        "data_processing.sources.create_learner_source",
+        return_value=FailingSource([learners]),
+    )
+    mocker.patch.object(settings, "adaptive_min_size", 100)
+    mocker.patch.object(settings, "adaptive_max_size", 100)
+
+    async def fake_send(batch, template_type):
+        return batch[:60]  # the rest was rejected by Mailjet
+
+    mocker.patch("email_sender.mailjet_client.send_batch_emails", new=fake_send)
+    state_path = str(tmp_path / "reminders.db")
+    mocker.patch.object(settings, "reminder_state_path", state_path)
+    mocker.patch.object(settings, "run_checkpoint_path", None)
+    mocker.patch.object(settings, "send_queue_size", 0)
+    mocker.patch.object(settings, "test_mode", False)
+
+    with pytest.raises(RuntimeError, match="download failed"):
+        await run_workflow()
+
+    store = ReminderStateStore(state_path)
+    try:
+        # Only the learners Mailjet accepted are recorded, despite the failure
+        assert set(store.load([str(i) for i in range(100)])) == {
+            str(i) for i in range(60)
+        }
+    finally:
+        store.close()
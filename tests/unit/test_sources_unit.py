@@ -0,0 +1,217 @@
+# tests/unit/test_sources_unit.py
+import pytest
+
+from data_processing import sources
+from data_processing.filters import stream_filtered_batches
+from data_processing.sources import (
+    DareyHttpSource,
+    LearnerSource,
+    NdjsonSnapshotSource,
+    ParquetSnapshotSource,
+    SQLiteLearnerStore,
+    create_learner_source,
+)
+
+pytestmark = pytest.mark.unit
+
+
+async def _collect(source) -> list[list[dict]]:
+    return [page async for page in source.pages()]
+
+
+def _learners(n: int) -> list[dict]:
+    return [
+        {
+            "_id": str(i),
+            "email": f"u{i}@test.com",
+            "program_data": {"progress_status": i},
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_ndjson_snapshot_pages(tmp_path):
+    path = str(tmp_path / "learners.ndjson")
+    assert NdjsonSnapshotSource.write(path, _learners(5)) == 5
+    with open(path, "a") as f:
+        f.write("not json\n\n")
+
+    pages = await _collect(NdjsonSnapshotSource(path, page_size=2))
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert pages[2][0]["program_data"] == {"progress_status": 4}
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_upsert_and_pages(tmp_path):
+    store = SQLiteLearnerStore(str(tmp_path / "learners.db"), page_size=3)
+    assert store.upsert(_learners(7) + [{"_id": None, "email": "x@test.com"}]) == 7
+    # Re-upserting an _id replaces it instead of duplicating
+    store.upsert([{"_id": "0", "email": "new@test.com"}])
+
+    pages = await _collect(store)
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    emails = {learner["email"] for page in pages for learner in page}
+    assert "new@test.com" in emails and "u0@test.com" not in emails
+
+
+@pytest.mark.asyncio
+async def test_parquet_snapshot_pages(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "learners.parquet")
+    pq.write_table(pa.Table.from_pylist(_learners(5)), path)
+
+    pages = await _collect(ParquetSnapshotSource(path, page_size=4))
+
+    assert [len(page) for page in pages] == [4, 1]
+    assert pages[0][1]["program_data"] == {"progress_status": 1}
+
+
+@pytest.mark.asyncio
+async def test_http_source_delegates_to_downloader(mocker):
+    async def fake_pages(page_size, controller, report):
+        yield [{"_id": "1"}]
+        yield [{"_id": "2"}, {"_id": "3"}]
+        report.failed_pages.append(3)
+
+    mocker.patch.object(sources, "stream_learner_pages", new=fake_pages)
+    source = DareyHttpSource(page_size=2, workers=1)
+
+    pages = await _collect(source)
+
+    assert pages == [[{"_id": "1"}], [{"_id": "2"}, {"_id": "3"}]]
+    assert source.complete is False
+
+
+@pytest.mark.parametrize(
+    "kind,path,expected",
+    [
+        ("http", None, DareyHttpSource),
+        ("ndjson", "x.ndjson", NdjsonSnapshotSource),
+        ("parquet", "x.parquet", ParquetSnapshotSource),
+        ("sqlite", "x.db", SQLiteLearnerStore),
+    ],
+)
+def test_create_learner_source(mocker, settings, kind, path, expected):
+    mocker.patch.object(settings, "learner_source", kind)
+    mocker.patch.object(settings, "learner_source_path", path)
+    source = create_learner_source(page_size=10)
+    assert isinstance(source, expected)
+    assert isinstance(source, LearnerSource)
+
+
+@pytest.mark.parametrize("kind,path", [("ndjson", None), ("s3", "x")])
+def test_create_learner_source_rejects_bad_config(mocker, settings, kind, path):
+    mocker.patch.object(settings, "learner_source", kind)
+    mocker.patch.object(settings, "learner_source_path", path)
+    with pytest.raises(ValueError):
+        create_learner_source()
+
+
+@pytest.mark.asyncio
+async def test_stream_filtered_batches_reads_from_source(tmp_path, learners):
+    path = str(tmp_path / "learners.ndjson")
+    NdjsonSnapshotSource.write(path, learners)
+
+    results = {
+        category: [learner["_id"] for learner in batch]
+        async for batch, category in stream_filtered_batches(
+            source=NdjsonSnapshotSource(path, page_size=2)
+        )
+    }
+
+    assert results == {"inactive": ["1", "4"], "low_score": ["2"]}
+
+
+class _CountingSource:
+    def __init__(self, pages):
+        self._pages = pages
+        self.reads = 0
+
+    async def pages(self):
+        self.reads += 1
+        for page in self._pages:
+            yield page
+
+
+@pytest.mark.asyncio
+async def test_cached_source_mirrors_upstream_until_stale(tmp_path):
+    path = str(tmp_path / "cache" / "learners.db")
+    upstream = _CountingSource([_learners(3), _learners(5)[3:]])
+    cached = sources.CachedLearnerSource(upstream, path, max_age=3600, page_size=4)
+
+    first = await _collect(cached)
+    second = await _collect(cached)
+
+    assert upstream.reads == 1
+    assert [len(page) for page in first] == [3, 2]
+    assert [learner["_id"] for page in second for learner in page] == [
+        str(i) for i in range(5)
+    ]
+
+    cached.max_age = 0  # stale: read upstream again
+    await _collect(cached)
+    assert upstream.reads == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_source_keeps_old_mirror_on_abandoned_refresh(tmp_path):
+    path = str(tmp_path / "learners.db")
+    SQLiteLearnerStore(path).upsert(_learners(2))
+    cached = sources.CachedLearnerSource(
+        _CountingSource([_learners(9)]), path, max_age=0
+    )
+
+    pages = cached.pages()
+    await pages.__anext__()
+    await pages.aclose()
+
+    store_pages = await _collect(SQLiteLearnerStore(path))
+    assert sum(len(page) for page in store_pages) == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_source_keeps_old_mirror_on_incomplete_download(tmp_path):
+    path = str(tmp_path / "learners.db")
+    SQLiteLearnerStore(path).upsert(_learners(2))
+    upstream = _CountingSource([_learners(9)[:4]])
+    upstream.complete = False  # e.g. a page failed and was skipped
+    cached = sources.CachedLearnerSource(upstream, path, max_age=0)
+
+    assert sum(len(page) for page in await _collect(cached)) == 4
+
+    store_pages = await _collect(SQLiteLearnerStore(path))
+    assert sum(len(page) for page in store_pages) == 2
+    assert not (tmp_path / "learners.db.tmp").exists()
+
+
+def test_create_learner_source_wraps_http_with_cache(mocker, settings):
+    mocker.patch.object(settings, "learner_source", "http")
+    mocker.patch.object(settings, "learner_cache_path", "state/learners.db")
+    source = create_learner_source(page_size=10)
+    assert isinstance(source, sources.CachedLearnerSource)
+    assert isinstance(source.upstream, DareyHttpSource)
+
+
+@pytest.mark.asyncio
+async def test_cached_source_is_scoped_per_tenant(mocker, settings, tmp_path):
+    from campaigns import tenant_settings
+    from config import settings_scope
+
+    mocker.patch.object(settings, "learner_source", "http")
+    mocker.patch.object(settings, "learner_cache_path", str(tmp_path / "learners.db"))
+    sources_by_tenant = {}
+    for business_id in ("biz-a", "biz-b"):
+        with settings_scope(tenant_settings({"business_id": business_id})):
+            source = create_learner_source(page_size=10)
+            source.upstream = _CountingSource([_learners(2)])
+            if business_id == "biz-a":
+                await _collect(source)  # A's mirror is fresh from now on
+            sources_by_tenant[business_id] = source
+
+    a, b = sources_by_tenant["biz-a"], sources_by_tenant["biz-b"]
+    assert a.path != b.path
+    assert a.is_fresh() and not b.is_fresh()  # B never reads A's learners
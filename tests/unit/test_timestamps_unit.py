@@ -0,0 +1,77 @@
+# tests/unit/test_timestamps_unit.py
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from utils.timestamps import cutoff_epoch, parse_epoch, to_epoch
+
+pytestmark = pytest.mark.unit
+
+
+def _expected(value: str) -> int:
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "2025-08-20T10:15:30.123Z",
+        "2025-08-20T10:15:30Z",
+        "1970-01-01T00:00:00.000Z",
+        "2024-02-29T23:59:59.999Z",  # leap day
+        "2000-03-01T00:00:00Z",
+        "2100-12-31T12:00:00Z",
+    ],
+)
+def test_fast_path_matches_fromisoformat(value):
+    assert parse_epoch(value) == _expected(value)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "2025-08-20T10:15:30+01:00",
+        "2025-08-20T10:15:30.123456+00:00",
+        "2025-08-20T10:15:30",  # naive → UTC
+        "2025-08-20",
+    ],
+)
+def test_fallback_formats(value):
+    assert parse_epoch(value) == _expected(value)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "invalid-date",
+        "2023-02-29T00:00:00Z",  # not a leap year
+        "2025-13-01T00:00:00Z",
+        "2025-01-01T24:00:00Z",
+        "2025-01-01T00:00:00.abcZ",
+        "Z",
+    ],
+)
+def test_invalid_values(value):
+    assert parse_epoch(value) is None
+
+
+@pytest.mark.parametrize("value", [None, "", 1700000000, ["2025-01-01"]])
+def test_to_epoch_non_strings(value):
+    assert to_epoch(value) is None
+
+
+def test_parse_epoch_caches_repeated_strings():
+    parse_epoch.cache_clear()
+    for _ in range(3):
+        parse_epoch("2025-08-20T10:15:30.123Z")
+    info = parse_epoch.cache_info()
+    assert info.misses == 1 and info.hits == 2
+
+
+def test_cutoff_epoch_matches_timedelta():
+    now = datetime(2025, 8, 20, tzinfo=timezone.utc)
+    expected = int((now - timedelta(days=14)).timestamp())
+    assert cutoff_epoch(14, now.timestamp()) == expected
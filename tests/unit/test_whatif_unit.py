@@ -0,0 +1,194 @@
+# tests/unit/test_whatif_unit.py
+import copy
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from data_processing.filters import stream_filtered_batches  # noqa: E402
+from data_processing.rules import _condition, compile_rules, learner_facts  # noqa: E402
+from data_processing.sources import NdjsonSnapshotSource  # noqa: E402
+from data_processing.whatif import (  # noqa: E402
+    SnapshotArrays,
+    condition_mask,
+    load_snapshot,
+    open_snapshot,
+    simulate,
+    snapshot_time,
+    sweep,
+)
+from simulate import format_table  # noqa: E402
+
+pytestmark = pytest.mark.unit
+
+
+def _learners(count: int, now: float, seed: int = 3) -> list[dict]:
+    rng = random.Random(seed)
+    base = datetime.fromtimestamp(now, timezone.utc)
+    learners = []
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.1:
+            login = None
+        elif roll < 0.12:
+            login = "not-a-date"
+        else:
+            # Half-day offsets keep logins away from whole-day cutoffs
+            login = (base - timedelta(days=rng.randrange(90) + 0.5)).isoformat()
+        email = f"u{i}@test.com"
+        if roll > 0.97:
+            email = None
+        elif roll > 0.95:
+            email = f"u{i}@mailinator.com"  # disposable: rejected
+        learners.append(
+            {
+                "_id": str(i),
+                "email": email,
+                "last_loggedin_date": login,
+                "createdAt": (
+                    base - timedelta(days=rng.randrange(30) + 0.5)
+                ).isoformat(),
+                "program_data": {
+                    "progress_status": rng.choice([0, 15, 45, 60, 92, 100, "n/a"])
+                },
+            }
+        )
+    return learners
+
+
+@pytest.mark.parametrize(
+    "name,values",
+    [
+        ("completed", [True, False]),
+        ("progress_lt", [0, 45, 100]),
+        ("progress_gte", [15, 90]),
+        ("never_logged_in", [True, False]),
+        ("inactive_for_days", [7, 30]),
+        ("active_within_days", [14]),
+        ("joined_within_days", [7]),
+    ],
+)
+def test_condition_masks_match_the_compiled_conditions(name, values):
+    now = time.time()
+    facts = [learner_facts(learner) for learner in _learners(300, now)]
+    snapshot = SnapshotArrays(
+        now,
+        np.array([np.nan if f.progress is None else f.progress for f in facts]),
+        np.array([np.nan if f.last_login is None else f.last_login for f in facts]),
+        np.array([f.never_logged_in for f in facts]),
+        np.array([np.nan if f.created is None else f.created for f in facts]),
+    )
+    for value in values:
+        expected = [_condition(name, value, now)(f) for f in facts]
+        assert condition_mask(name, value, now, snapshot).tolist() == expected
+
+
+@pytest.mark.asyncio
+async def test_sweep_matches_the_classifier_for_every_setting(
+    mocker, settings, paged_source
+):
+    now = time.time()
+    learners = _learners(600, now)
+    days, thresholds = [7, 14, 30], [20, 50, 70]
+
+    matrix = sweep(
+        await load_snapshot(paged_source([copy.deepcopy(learners)]), now),
+        days,
+        thresholds,
+    )
+
+    assert list(matrix.segments) == [
+        "new_this_week",
+        "never_logged_in",
+        "stalled",
+        "inactive",
+        "low_score",
+    ]
+    for row, inactive_days in enumerate(days):
+        for col, threshold in enumerate(thresholds):
+            mocker.patch.object(settings, "inactive_days", inactive_days)
+            mocker.patch.object(settings, "low_score_threshold", threshold)
+            buckets = compile_rules(now=now).partition(copy.deepcopy(learners))
+            for segment, volumes in matrix.segments.items():
+                assert volumes[row, col] == len(buckets[segment])
+            assert matrix.total[row, col] == sum(map(len, buckets.values()))
+
+
+@pytest.mark.asyncio
+async def test_simulated_volumes_match_a_pipeline_run(mocker, settings, tmp_path):
+    now = time.time()
+    learners = _learners(500, now)
+    # Repeated records and a shared address: mailed once in a run
+    learners += copy.deepcopy(learners[:20])
+    learners.append({**learners[30], "_id": "dup-email"})
+    path = tmp_path / "learners.ndjson"
+    NdjsonSnapshotSource.write(str(path), learners)
+    mocker.patch.object(settings, "send_queue_size", 0)
+
+    sent: dict[str, int] = {}
+    async for batch, template in stream_filtered_batches(
+        source=NdjsonSnapshotSource(str(path), page_size=64),
+        classifier=compile_rules(now=now),
+    ):
+        sent[template] = sent.get(template, 0) + len(batch)
+
+    snapshot = await load_snapshot(NdjsonSnapshotSource(str(path), page_size=64), now)
+    matrix = sweep(snapshot, [settings.inactive_days], [settings.low_score_threshold])
+
+    simulated = {
+        segment: int(volumes[0, 0])
+        for segment, volumes in matrix.segments.items()
+        if volumes[0, 0]
+    }
+    assert simulated == sent
+    assert sent["new_this_week"] > 0  # active new learners are counted too
+
+
+def test_snapshot_time_prefers_a_date_in_the_name(tmp_path):
+    dated = tmp_path / "learners-2025-09-01.ndjson"
+    plain = tmp_path / "learners.ndjson"
+    dated.write_text("")
+    plain.write_text("")
+    os.utime(plain, (1_000_000, 1_000_000))
+
+    assert (
+        snapshot_time(str(dated))
+        == datetime(2025, 9, 1, tzinfo=timezone.utc).timestamp()
+    )
+    assert snapshot_time(str(plain)) == 1_000_000
+
+
+def test_open_snapshot_rejects_unknown_formats():
+    assert isinstance(open_snapshot("x.jsonl"), NdjsonSnapshotSource)
+    with pytest.raises(ValueError, match="Unknown snapshot format"):
+        open_snapshot("learners.csv")
+
+
+@pytest.mark.asyncio
+async def test_simulate_reads_snapshots_oldest_first(tmp_path):
+    as_of = datetime(2025, 9, 8, tzinfo=timezone.utc).timestamp()
+    paths = []
+    for day, count in (("2025-09-08", 40), ("2025-09-01", 25)):
+        path = tmp_path / f"learners-{day}.ndjson"
+        NdjsonSnapshotSource.write(str(path), _learners(count, as_of))
+        paths.append(str(path))
+
+    results = await simulate(paths, [14], [50])
+
+    assert [path for path, _, _ in results] == paths[::-1]
+    assert results[1][1] == as_of
+    assert all(matrix.total.shape == (1, 1) for _, _, matrix in results)
+
+
+def test_format_table_marks_the_current_settings():
+    volumes = np.array([[1200.0, 1500.0], [900.0, 1000.0]])
+
+    table = format_table([7.0, 14.0], [40.0, 50.0], volumes, (14.0, 50.0))
+
+    lines = table.splitlines()
+    assert lines[0].split()[-2:] == ["40", "50"]
+    assert lines[2].split() == ["14", "900", "1,000*"]
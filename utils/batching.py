@@ -1,13 +1,18 @@
 # utils/batching.py
-import psutil
 import math
 
+from utils.memory import MemoryBudget, total_memory
+
+# Estimate average learner size (roughly 500 bytes = 0.0005 MB)
+DEFAULT_LEARNER_SIZE_BYTES = 500
+
 
 def get_adaptive_batch_size(
     min_batch: int = 200, max_batch: int = 1000, target_memory_fraction: float = 0.05
 ) -> int:
     """
-    Dynamically compute a safe batch size based on system memory.
+    Dynamically compute a safe batch size based on the memory this process
+    may use (the container/cgroup limit when one is set).
 
     Args:
         min_batch (int): Smallest batch size allowed.
@@ -17,11 +22,10 @@ def get_adaptive_batch_size(
     Returns:
         int: Chosen batch size within [min_batch, max_batch].
     """
-    # Estimate average learner size (roughly 500 bytes = 0.0005 MB)
-    avg_learner_size_mb = 0.0005
+    avg_learner_size_mb = DEFAULT_LEARNER_SIZE_BYTES / (1024 * 1024)
 
-    # Total system memory in MB
-    total_mb = psutil.virtual_memory().total / (1024 * 1024)
+    # Effective memory limit in MB
+    total_mb = total_memory() / (1024 * 1024)
 
     # Target memory budget for one batch
     budget_mb = total_mb * target_memory_fraction
@@ -31,3 +35,123 @@ def get_adaptive_batch_size(
 
     # Clamp to range
     return max(min_batch, min(learners_fit, max_batch))
+
+
+def aligned_page_size(offset: int, target: int, step: int) -> int:
+    """
+    Return the largest multiple of `step` <= `target` that divides `offset`.
+
+    The Darey API paginates with `page` and `limit`, so a page size can only
+    change when the records already read land exactly on a page boundary of
+    the new size. Every full page is a multiple of `step`, so `step` itself
+    always qualifies.
+    """
+    size = max(step, (target // step) * step)
+    while size > step and offset % size:
+        size -= step
+    return size
+
+
+class AdaptiveBatchController:
+    """
+    AIMD controller for the downloader page size and the sender batch size.
+
+    Each stage reports its observed latency per learner. While latency stays
+    within `latency_tolerance` of its moving average the size grows by `step`
+    (additive increase); a latency spike or a failure halves it
+    (multiplicative decrease). Both sizes are also capped so that one page
+    plus the buffered send batches fit in the live memory headroom, using
+    the observed bytes per learner rather than a fixed guess.
+    """
+
+    def __init__(
+        self,
+        page_size: int,
+        batch_size: int,
+        min_size: int = 50,
+        max_size: int = 5000,
+        step: int = 50,
+        target_memory_fraction: float = 0.05,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 1.5,
+        smoothing: float = 0.2,
+        memory: MemoryBudget | None = None,
+    ) -> None:
+        self.min_size = min_size
+        self.max_size = max_size
+        self.step = step
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self.memory = memory or MemoryBudget(fraction=target_memory_fraction)
+
+        self.bytes_per_learner: float = float(DEFAULT_LEARNER_SIZE_BYTES)
+        self._page_latency: float | None = None
+        self._send_latency: float | None = None
+        self._page_size = self._clamp(page_size)
+        self._batch_size = self._clamp(batch_size)
+
+    @property
+    def page_size(self) -> int:
+        return self._page_size
+
+    @property
+    def batch_size(self) -> int:
+        return self._batch_size
+
+    @property
+    def memory_cap(self) -> int:
+        """Max learners held at once: one page plus two pending send batches."""
+        return int(self.memory.headroom() / max(self.bytes_per_learner, 1.0))
+
+    def _clamp(self, size: int) -> int:
+        upper = min(self.max_size, max(self.min_size, self.memory_cap // 3))
+        return max(self.min_size, min(int(size), upper))
+
+    def _ewma(self, current: float | None, sample: float) -> float:
+        if current is None:
+            return sample
+        return (1 - self.smoothing) * current + self.smoothing * sample
+
+    def _adjust(self, size: int, latency: float | None, sample: float) -> int:
+        if latency is not None and sample > latency * self.latency_tolerance:
+            return self._clamp(size * self.decrease_factor)
+        return self._clamp(size + self.step)
+
+    def record_page(self, n_learners: int, n_bytes: int, elapsed: float) -> None:
+        """Feed back one downloaded page (record count, body size, fetch time)."""
+        if n_learners <= 0:
+            return
+        if n_bytes > 0:
+            self.bytes_per_learner = self._ewma(
+                self.bytes_per_learner, n_bytes / n_learners
+            )
+        sample = elapsed / n_learners
+        self._page_size = self._adjust(self._page_size, self._page_latency, sample)
+        self._page_latency = self._ewma(self._page_latency, sample)
+        self._batch_size = self._clamp(self._batch_size)
+
+    def record_send(self, n_learners: int, elapsed: float) -> None:
+        """Feed back one sent batch (record count, send time)."""
+        if n_learners <= 0:
+            return
+        sample = elapsed / n_learners
+        self._batch_size = self._adjust(self._batch_size, self._send_latency, sample)
+        self._send_latency = self._ewma(self._send_latency, sample)
+
+    def record_failure(self, stage: str) -> None:
+        """Back off after a failed page fetch ("page") or send ("send")."""
+        if stage == "page":
+            self._page_size = self._clamp(self._page_size * self.decrease_factor)
+        else:
+            self._batch_size = self._clamp(self._batch_size * self.decrease_factor)
+
+    def snapshot(self) -> dict:
+        """Current sizes and measurements, for structured logging."""
+        return {
+            "page_size": self._page_size,
+            "batch_size": self._batch_size,
+            "bytes_per_learner": round(self.bytes_per_learner, 1),
+            "memory_cap": self.memory_cap,
+            **self.memory.snapshot(),
+        }
@@ -0,0 +1,146 @@
+# utils/budget.py
+import contextvars
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Iterator
+
+from config import settings
+from log import logger
+from utils.shutdown import shutdown
+
+
+class RunBudget:
+    """
+    Wall-clock, email and API-call limits for one run (0 = unlimited).
+
+    Stages ask `exhausted()` before starting new work (a page request, a
+    send batch) and stop gracefully when it returns a reason; work already
+    in flight is allowed to finish. API calls are counted by `charge_api_call`
+    wherever a request is made, emails by `record_emails` once sent. A
+    SIGTERM (see utils.shutdown) exhausts every budget with "shutdown".
+    """
+
+    def __init__(
+        self,
+        max_seconds: float = 0,
+        max_emails: int = 0,
+        max_api_calls: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_seconds = max_seconds
+        self.max_emails = max_emails
+        self.max_api_calls = max_api_calls
+        self._clock = clock
+        self._started = clock()
+        self.emails = 0
+        self.api_calls = 0
+        self.stop_reason: str | None = None
+
+    @property
+    def elapsed(self) -> float:
+        return self._clock() - self._started
+
+    def exhausted(self) -> str | None:
+        """Why to stop ("shutdown", "time", "api_calls", "emails"), or None."""
+        if self.stop_reason is None:
+            if shutdown.requested:
+                self.stop_reason = "shutdown"
+            elif self.max_seconds and self.elapsed >= self.max_seconds:
+                self.stop_reason = "time"
+            elif self.max_api_calls and self.api_calls >= self.max_api_calls:
+                self.stop_reason = "api_calls"
+            elif self.max_emails and self.emails >= self.max_emails:
+                self.stop_reason = "emails"
+            if self.stop_reason is not None:
+                logger.warning(f"Stopping the run gracefully ({self.stop_reason})")
+        return self.stop_reason
+
+    def charge_api_call(self, calls: int = 1) -> None:
+        self.api_calls += calls
+
+    def record_emails(self, count: int) -> None:
+        self.emails += count
+
+    def email_allowance(self, wanted: int, per_call: int = 50) -> int:
+        """How many of `wanted` emails may still go out (in calls of `per_call`)."""
+        if self.exhausted():
+            return 0
+        allowed = wanted
+        if self.max_emails:
+            allowed = min(allowed, self.max_emails - self.emails)
+        if self.max_api_calls:
+            allowed = min(allowed, (self.max_api_calls - self.api_calls) * per_call)
+        return max(allowed, 0)
+
+    def summary(self) -> dict:
+        return {
+            "completed": self.stop_reason is None,
+            "stop_reason": self.stop_reason,
+            "elapsed_s": round(self.elapsed, 3),
+            "emails_sent": self.emails,
+            "api_calls": self.api_calls,
+            "max_seconds": self.max_seconds,
+            "max_emails": self.max_emails,
+            "max_api_calls": self.max_api_calls,
+        }
+
+
+_budget: contextvars.ContextVar[RunBudget | None] = contextvars.ContextVar(
+    "run_budget", default=None
+)
+
+
+@contextmanager
+def use_budget(budget: RunBudget) -> Iterator[RunBudget]:
+    """Charge API calls made in this context (and tasks it spawns) to `budget`."""
+    token = _budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _budget.reset(token)
+
+
+def charge_api_call(calls: int = 1) -> None:
+    """Count a request against the active budget (no-op without one)."""
+    budget = _budget.get()
+    if budget is not None:
+        budget.charge_api_call(calls)
+
+
+def budget_exhausted() -> str | None:
+    """Stop reason of the active budget; without one only a shutdown stops work."""
+    budget = _budget.get()
+    if budget is None:
+        return "shutdown" if shutdown.requested else None
+    return budget.exhausted()
+
+
+def create_run_budget() -> RunBudget:
+    return RunBudget(
+        max_seconds=settings.run_max_seconds,
+        max_emails=settings.run_max_emails,
+        max_api_calls=settings.run_max_api_calls,
+    )
+
+
+def read_checkpoint(path: str) -> dict | None:
+    """The previous run's checkpoint, or None when missing or unreadable."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_checkpoint(path: str, summary: dict) -> None:
+    """Atomically record a run summary for the next run to read."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    staging = f"{path}.tmp"
+    with open(staging, "w", encoding="utf-8") as f:
+        json.dump({**summary, "finished_at": datetime.now(timezone.utc).isoformat()}, f)
+    os.replace(staging, path)
@@ -0,0 +1,124 @@
+# utils/hedging.py
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+from config import settings
+from log import logger
+
+T = TypeVar("T")
+
+
+class Hedger:
+    """
+    Hedged requests for idempotent calls (learner page GETs).
+
+    Latencies of completed calls are tracked over a sliding `window`. Once
+    `min_samples` are in, a call still running after the observed
+    `quantile` (p95 by default) gets a duplicate, and whichever finishes
+    first wins; the other is cancelled. Duplicates are capped at
+    `max_extra` of all calls, so a slow server is not hit with twice the
+    load: only the tail is hedged.
+    """
+
+    def __init__(
+        self,
+        quantile: float = 0.95,
+        max_extra: float = 0.1,
+        min_samples: int = 20,
+        window: int = 200,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self.quantile = quantile
+        self.max_extra = max_extra
+        self.min_samples = min_samples
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._clock = clock
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def threshold(self) -> float | None:
+        """The observed `quantile` latency, once `min_samples` are in."""
+        if len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
+
+    def delay(self) -> float | None:
+        """Seconds to wait before hedging, or None when no hedge is allowed."""
+        if self.hedged + 1 > self.max_extra * self.calls:
+            return None
+        return self.threshold()
+
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        """`call()`, duplicated once if it outlives the tail-latency delay."""
+        self.calls += 1
+        started = self._clock()
+        primary = asyncio.ensure_future(call())
+        tasks = [primary]
+        try:
+            delay = self.delay()
+            if delay is not None:
+                await asyncio.wait({primary}, timeout=delay)
+            if delay is None or primary.done():
+                result = await primary
+                self._latencies.append(self._clock() - started)
+                return result
+
+            self.hedged += 1
+            hedge_started = self._clock()
+            hedge = asyncio.ensure_future(call())
+            tasks.append(hedge)
+            pending = set(tasks)
+            error: BaseException | None = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                        continue
+                    if task is hedge:
+                        self.hedge_wins += 1
+                        self._latencies.append(self._clock() - hedge_started)
+                    else:
+                        self._latencies.append(self._clock() - started)
+                    return task.result()
+            raise error
+        finally:
+            # The loser (or both, when the caller is cancelled)
+            leftover = [task for task in tasks if not task.done()]
+            for task in leftover:
+                task.cancel()
+            if leftover:
+                await asyncio.gather(*leftover, return_exceptions=True)
+
+    def stats(self) -> dict:
+        threshold = self.threshold()
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "threshold_ms": round(threshold * 1000, 1) if threshold else None,
+        }
+
+    def log_stats(self) -> None:
+        if self.hedged:
+            logger.bind(hedging=self.stats()).info(
+                f"Hedged {self.hedged} of {self.calls} page requests; "
+                f"the duplicate won {self.hedge_wins}"
+            )
+
+
+def create_hedger() -> Hedger | None:
+    """Hedger configured by HEDGE_*; None when HEDGE_MAX_EXTRA is 0."""
+    if settings.hedge_max_extra <= 0:
+        return None
+    return Hedger(
+        quantile=settings.hedge_quantile,
+        max_extra=settings.hedge_max_extra,
+        min_samples=settings.hedge_min_samples,
+    )
@@ -0,0 +1,154 @@
+# utils/memory.py
+import os
+import time
+
+try:
+    import psutil
+except ImportError:  # psutil is optional; /proc and sysconf cover Linux runners
+    psutil = None
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+# cgroup v1 reports "unlimited" as a huge page-aligned number
+_V1_UNLIMITED = 1 << 60
+
+
+def _read_int(path: str) -> int | None:
+    """Read a single integer from a (cgroup/proc) file, None if absent or 'max'."""
+    try:
+        with open(path) as f:
+            raw = f.read().strip()
+    except OSError:
+        return None
+    if not raw or raw == "max":
+        return None
+    try:
+        return int(raw)
+    except ValueError:
+        return None
+
+
+def cgroup_memory_limit(root: str = CGROUP_ROOT) -> int | None:
+    """Memory limit of the current cgroup in bytes (v2, then v1), None if unlimited."""
+    limit = _read_int(os.path.join(root, "memory.max"))
+    if limit is not None:
+        return limit
+    limit = _read_int(os.path.join(root, "memory", "memory.limit_in_bytes"))
+    if limit is not None and limit < _V1_UNLIMITED:
+        return limit
+    return None
+
+
+def cgroup_memory_usage(root: str = CGROUP_ROOT) -> int | None:
+    """Memory currently charged to the cgroup in bytes (v2, then v1)."""
+    usage = _read_int(os.path.join(root, "memory.current"))
+    if usage is not None:
+        return usage
+    return _read_int(os.path.join(root, "memory", "memory.usage_in_bytes"))
+
+
+def physical_memory() -> int:
+    """Total physical memory of the host in bytes."""
+    if psutil is not None:
+        return psutil.virtual_memory().total
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return 1 << 30  # conservative 1 GB when nothing can be read
+
+
+def available_memory() -> int:
+    """Memory the host can still hand out in bytes (MemAvailable)."""
+    if psutil is not None:
+        return psutil.virtual_memory().available
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return physical_memory()
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        import resource
+
+        # ru_maxrss is the peak, in KB on Linux; an upper bound is good enough here
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except (ImportError, OSError):
+        return 0
+
+
+def total_memory(root: str = CGROUP_ROOT) -> int:
+    """Memory this process can use: the cgroup limit when set, else host memory."""
+    physical = physical_memory()
+    limit = cgroup_memory_limit(root)
+    return min(limit, physical) if limit is not None else physical
+
+
+class MemoryBudget:
+    """
+    Live memory headroom for buffering learners.
+
+    The budget is `fraction` of the effective memory limit (cgroup-aware).
+    `headroom()` shrinks it further when the cgroup, the host, or this
+    process is already close to the limit, so callers can size their
+    buffers down before the kernel OOM-kills the run. Readings are cached
+    for `refresh_interval` seconds to keep per-page queries cheap.
+    """
+
+    def __init__(
+        self,
+        fraction: float = 0.05,
+        reserve_fraction: float = 0.1,
+        refresh_interval: float = 1.0,
+        root: str = CGROUP_ROOT,
+    ) -> None:
+        self.fraction = fraction
+        self.root = root
+        self.refresh_interval = refresh_interval
+        self.limit = total_memory(root)
+        self.reserve = int(self.limit * reserve_fraction)
+        self._cached: int | None = None
+        self._cached_at = 0.0
+
+    @property
+    def budget(self) -> int:
+        """Static budget in bytes: `fraction` of the effective limit."""
+        return int(self.limit * self.fraction)
+
+    def _free(self) -> int:
+        usage = cgroup_memory_usage(self.root)
+        if usage is None or cgroup_memory_limit(self.root) is None:
+            usage = current_rss()
+            free = min(self.limit - usage, available_memory())
+        else:
+            free = self.limit - usage
+        return max(0, free - self.reserve)
+
+    def headroom(self) -> int:
+        """Bytes that may still be buffered right now, never above `budget`."""
+        now = time.monotonic()
+        if self._cached is None or now - self._cached_at >= self.refresh_interval:
+            self._cached = min(self.budget, self._free())
+            self._cached_at = now
+        return self._cached
+
+    def snapshot(self) -> dict:
+        """Current readings, for structured logging."""
+        return {
+            "memory_limit": self.limit,
+            "memory_budget": self.budget,
+            "memory_headroom": self.headroom(),
+            "rss": current_rss(),
+        }
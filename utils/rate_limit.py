@@ -0,0 +1,101 @@
+# utils/rate_limit.py
+import asyncio
+import contextvars
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+
+class FairRateLimiter:
+    """
+    Token bucket shared by several tenants, granted round-robin.
+
+    `rate` tokens (e.g. Mailjet messages) accrue per second up to `burst`.
+    Waiters queue per tenant and one dispatcher serves the tenants in turn,
+    one request each, so a tenant with a large backlog cannot starve the
+    others. A request costing more than `burst` is granted once the bucket
+    is full and leaves it in debt, which keeps the long-run rate exact.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst or max(rate, 1)
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._waiters: dict[str, deque[tuple[float, asyncio.Future]]] = defaultdict(
+            deque
+        )
+        self._turns: deque[str] = deque()  # tenants with waiters, in serving order
+        self._dispatcher: asyncio.Task | None = None
+        self.granted: dict[str, float] = defaultdict(float)
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tenant: str, cost: float = 1) -> None:
+        """Wait for this tenant's turn and `cost` tokens."""
+        if self.rate <= 0:
+            self.granted[tenant] += cost
+            return
+        future = asyncio.get_running_loop().create_future()
+        waiters = self._waiters[tenant]
+        if not waiters:
+            self._turns.append(tenant)
+        waiters.append((cost, future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    async def _dispatch(self) -> None:
+        while self._turns:
+            tenant = self._turns.popleft()
+            waiters = self._waiters[tenant]
+            while waiters and waiters[0][1].done():  # cancelled while queued
+                waiters.popleft()
+            if not waiters:
+                continue
+            cost, future = waiters[0]
+            self._refill()
+            needed = min(cost, self.burst)
+            while self._tokens < needed:
+                await asyncio.sleep((needed - self._tokens) / self.rate)
+                self._refill()
+            waiters.popleft()
+            if not future.done():
+                self._tokens -= cost
+                self.granted[tenant] += cost
+                future.set_result(None)
+            if waiters:
+                self._turns.append(tenant)
+
+
+_scope: contextvars.ContextVar[tuple[FairRateLimiter, str] | None] = (
+    contextvars.ContextVar("rate_limit_scope", default=None)
+)
+
+
+@contextmanager
+def use_rate_limiter(limiter: FairRateLimiter, tenant: str) -> Iterator[None]:
+    """Charge `acquire_budget` calls in this context to `tenant` on `limiter`."""
+    token = _scope.set((limiter, tenant))
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+async def acquire_budget(cost: float = 1) -> None:
+    """Wait on the active limiter, if any (a no-op for single-tenant runs)."""
+    scope = _scope.get()
+    if scope is not None:
+        limiter, tenant = scope
+        await limiter.acquire(tenant, cost)
@@ -1,5 +1,16 @@
 # utils/retry.py
-from tenacity import RetryCallState
+import contextvars
+import functools
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Callable, Iterator
+
+from tenacity import RetryCallState, retry, retry_if_exception, wait_exponential
+from tenacity.stop import stop_base
+from tenacity.wait import wait_base
+
+from config import settings
 from log import logger
 import httpx
 
@@ -15,10 +26,218 @@ TRANSIENT_EXCEPTIONS = (
 def is_transient_error(exc: BaseException) -> bool:
     """Return True if exception is considered transient and worth retrying."""
     if isinstance(exc, httpx.HTTPStatusError):
-        return 500 <= exc.response.status_code < 600
+        status = exc.response.status_code
+        return status == 429 or 500 <= status < 600
     return isinstance(exc, TRANSIENT_EXCEPTIONS)
 
 
+def retry_after_seconds(exc: BaseException | None) -> float:
+    """Seconds asked for by a 429/503 `Retry-After` header, else 0."""
+    if not isinstance(exc, httpx.HTTPStatusError):
+        return 0.0
+    value = exc.response.headers.get("Retry-After")
+    if not value:
+        return 0.0
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class CircuitOpenError(Exception):
+    """A call refused without a request because its host's circuit is open."""
+
+    def __init__(self, host: str, retry_in: float) -> None:
+        super().__init__(f"Circuit for {host} is open; next probe in {retry_in:.0f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker.
+
+    Closed: calls go through; `failure_threshold` consecutive transient
+    failures open it. Open: calls fail fast with CircuitOpenError for
+    `reset_timeout` seconds. Half-open: one probe call is let through; its
+    success closes the circuit, its failure opens it again. Responses that
+    are not transient errors (e.g. a 400) show the host is up and count as
+    successes, and so does a 429: the host is up, only this account is
+    throttled, and the retry waits for its Retry-After instead.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.host = host
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.failures = 0  # consecutive
+        self.opened_at: float | None = None
+        self.probing = False
+        self.times_opened = 0
+        self.rejected = 0
+
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self._clock() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half-open"
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go out now."""
+        state = self.state()
+        if state == "closed":
+            return
+        if state == "half-open" and not self.probing:
+            self.probing = True
+            return
+        self.rejected += 1
+        retry_in = self.opened_at + self.reset_timeout - self._clock()
+        raise CircuitOpenError(self.host, max(0.0, retry_in))
+
+    def record_success(self) -> None:
+        if self.opened_at is not None:
+            logger.info(f"Circuit for {self.host} closed again")
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.probing or (
+            self.opened_at is None and self.failures >= self.failure_threshold
+        ):
+            self.opened_at = self._clock()
+            self.probing = False
+            self.times_opened += 1
+            logger.warning(
+                f"Circuit for {self.host} opened after {self.failures} failures; "
+                f"failing fast for {self.reset_timeout:g}s"
+            )
+
+    def release(self) -> None:
+        """A call ended without a verdict (cancelled): free the probe slot."""
+        self.probing = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state(),
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
+
+
+class RetryBudget:
+    """
+    Retries shared by every call in a run: at most `min_retries` plus
+    `ratio` of the requests made so far. During an outage each call would
+    otherwise retry on its own, in parallel, multiplying load and sleeping
+    for minutes; with the budget spent, failures surface on the first
+    attempt.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 10) -> None:
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.requests = 0
+        self.retries = 0
+        self.denied = 0
+
+    def record_request(self) -> None:
+        self.requests += 1
+
+    def try_spend(self) -> bool:
+        """Take one retry from the budget; False when none is left."""
+        if self.retries >= self.min_retries + self.ratio * self.requests:
+            self.denied += 1
+            return False
+        self.retries += 1
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "denied": self.denied,
+        }
+
+
+class RetryGuard:
+    """The retry budget and per-host circuit breakers shared by a run."""
+
+    def __init__(
+        self,
+        budget: RetryBudget,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.budget = budget
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.breakers: dict[str, CircuitBreaker] = {}
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        breaker = self.breakers.get(host)
+        if breaker is None:
+            breaker = self.breakers[host] = CircuitBreaker(
+                host, self.failure_threshold, self.reset_timeout, self._clock
+            )
+        return breaker
+
+    def stats(self) -> dict:
+        return {
+            **self.budget.stats(),
+            "circuits": {host: b.stats() for host, b in self.breakers.items()},
+        }
+
+
+_guard: contextvars.ContextVar[RetryGuard | None] = contextvars.ContextVar(
+    "retry_guard", default=None
+)
+
+
+def current_retry_guard() -> RetryGuard | None:
+    """The guard active in this context, if any."""
+    return _guard.get()
+
+
+@contextmanager
+def use_retry_guard(guard: RetryGuard) -> Iterator[RetryGuard]:
+    """Share `guard` with every retried call in this context (and its tasks)."""
+    token = _guard.set(guard)
+    try:
+        yield guard
+    finally:
+        _guard.reset(token)
+
+
+def create_retry_guard() -> RetryGuard:
+    return RetryGuard(
+        RetryBudget(settings.retry_budget_ratio, settings.retry_budget_min),
+        failure_threshold=settings.circuit_failure_threshold,
+        reset_timeout=settings.circuit_reset_timeout,
+    )
+
+
+def circuit_breaker(host: str) -> CircuitBreaker | None:
+    """The active guard's breaker for `host` (None without a guard)."""
+    guard = _guard.get()
+    return guard.breaker(host) if guard is not None else None
+
+
 def log_before_retry(retry_state: RetryCallState):
     """Log information before retrying."""
     exc = retry_state.outcome.exception() if retry_state.outcome is not None else None
@@ -30,3 +249,113 @@ def log_before_retry(retry_state: RetryCallState):
         logger.warning(
             f"Retrying: attempt {retry_state.attempt_number} (no exception info)"
         )
+
+
+# --- Retry policy resolved at call time ---
+# A breaker key, or a function of the call's arguments returning one (e.g.
+# one breaker per Mailjet account)
+BreakerKey = str | Callable[..., str]
+
+
+def _breaker_key(host: BreakerKey, args: tuple, kwargs: dict) -> str:
+    return host(*args, **kwargs) if callable(host) else host
+
+
+def _is_throttled(exc: BaseException) -> bool:
+    return isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code == 429
+
+
+class stop_after_configured_attempts(stop_base):
+    """
+    Stop after `settings.max_retries` attempts, read when each call retries,
+    or earlier when the active guard's retry budget is spent or `host`'s
+    circuit has opened.
+    """
+
+    def __init__(self, host: BreakerKey | None = None) -> None:
+        self.host = host
+
+    def __call__(self, retry_state: RetryCallState) -> bool:
+        if retry_state.attempt_number >= settings.max_retries:
+            return True
+        guard = _guard.get()
+        if guard is None:
+            return False
+        if self.host is not None:
+            key = _breaker_key(self.host, retry_state.args, retry_state.kwargs)
+            if guard.breaker(key).state() == "open":
+                return True
+        if not guard.budget.try_spend():
+            logger.warning("Retry budget spent; not retrying")
+            return True
+        return False
+
+
+class wait_configured_exponential(wait_base):
+    """Exponential backoff scaled by `settings.retry_delay`, read per retry."""
+
+    def __init__(self, min: float = 1, max: float = 60) -> None:
+        self.min = min
+        self.max = max
+
+    def __call__(self, retry_state: RetryCallState) -> float:
+        wait = wait_exponential(
+            multiplier=settings.retry_delay, min=self.min, max=self.max
+        )
+        exc = retry_state.outcome.exception() if retry_state.outcome else None
+        # A 429/503 saying when to come back outranks the backoff schedule
+        return min(max(wait(retry_state), retry_after_seconds(exc)), self.max)
+
+
+def _guarded(host: BreakerKey, fn):
+    """Run coroutine function `fn` through `host`'s breaker and the budget."""
+
+    @functools.wraps(fn)
+    async def call(*args, **kwargs):
+        guard = _guard.get()
+        if guard is None:
+            return await fn(*args, **kwargs)
+        breaker = guard.breaker(_breaker_key(host, args, kwargs))
+        breaker.before_call()
+        guard.budget.record_request()
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception as e:
+            if is_transient_error(e) and not _is_throttled(e):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        breaker.record_success()
+        return result
+
+    return call
+
+
+def transient_retry(host: BreakerKey | None = None):
+    """
+    Tenacity decorator retrying transient errors with the configured policy.
+
+    Unlike passing `settings.max_retries` to `stop_after_attempt` directly,
+    nothing is read at import time, and changing `settings.max_retries` or
+    `settings.retry_delay` at runtime affects the next call.
+
+    With a `host` (a coroutine function is required) and a RetryGuard
+    active, every attempt goes through that host's circuit breaker, and
+    retries draw on the guard's shared budget. `host` may be a function of
+    the call's arguments returning the breaker key. CircuitOpenError is not
+    transient: a call to a host known to be down fails at once.
+    """
+    policy = retry(
+        stop=stop_after_configured_attempts(host),
+        wait=wait_configured_exponential(min=1, max=60),
+        retry=retry_if_exception(is_transient_error),
+        before_sleep=log_before_retry,
+        reraise=True,
+    )
+    if host is None:
+        return policy
+    return lambda fn: policy(_guarded(host, fn))
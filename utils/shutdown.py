@@ -0,0 +1,107 @@
+# utils/shutdown.py
+import asyncio
+import signal
+import time
+from typing import Callable
+
+from config import settings
+from log import logger
+
+
+class ShutdownRequest:
+    """
+    Process-wide graceful-stop flag, set by SIGTERM / SIGINT.
+
+    Once requested, run budgets report "shutdown" so no new page is pulled
+    and no new batch is sent; sends already in flight get until `deadline`
+    to finish (`drain`) and are cancelled after that. The run then flushes
+    reminder state and writes its checkpoint as for any early stop.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self.reset()
+
+    def reset(self) -> None:
+        self.signal_name: str | None = None
+        self.deadline: float | None = None
+        self._event: asyncio.Event | None = None
+
+    @property
+    def requested(self) -> bool:
+        return self.signal_name is not None
+
+    def _get_event(self) -> asyncio.Event:
+        if self._event is None:
+            self._event = asyncio.Event()
+        return self._event
+
+    def request(self, signal_name: str = "SIGTERM", grace: float | None = None) -> None:
+        if self.requested:
+            return
+        grace = settings.shutdown_grace_seconds if grace is None else grace
+        self.signal_name = signal_name
+        self.deadline = self._clock() + grace
+        logger.warning(
+            f"{signal_name} received: stopping after in-flight sends (up to {grace:g}s)"
+        )
+        self._get_event().set()
+
+    def remaining(self) -> float | None:
+        """Seconds left before in-flight work is cancelled (None: no stop yet)."""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - self._clock(), 0.0)
+
+    async def wait(self) -> None:
+        await self._get_event().wait()
+
+
+shutdown = ShutdownRequest()
+
+
+def _on_signal(loop: asyncio.AbstractEventLoop, sig: signal.Signals) -> None:
+    # A second signal of the same kind falls back to the default (hard stop)
+    loop.remove_signal_handler(sig)
+    shutdown.request(sig.name)
+
+
+def install_signal_handlers() -> None:
+    """Turn SIGTERM / SIGINT on the running loop into a graceful shutdown."""
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, _on_signal, loop, sig)
+        except (NotImplementedError, RuntimeError):
+            # Windows event loops, or not running in the main thread
+            logger.debug(f"Cannot handle {sig.name} here; default behaviour kept")
+
+
+async def drain(tasks: list[asyncio.Task]) -> list:
+    """
+    Outcomes of `tasks`, exceptions included, in order.
+
+    Tasks run to completion normally; once a shutdown is requested they
+    have until its deadline, then the stragglers are cancelled and show up
+    as CancelledError.
+    """
+    if not tasks:
+        return []
+    gathered = asyncio.gather(*tasks, return_exceptions=True)
+    stop = asyncio.ensure_future(shutdown.wait())
+    try:
+        await asyncio.wait({gathered, stop}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        gathered.cancel()
+        raise
+    finally:
+        stop.cancel()
+    if not gathered.done():
+        _, pending = await asyncio.wait(tasks, timeout=shutdown.remaining())
+        if pending:
+            logger.warning(
+                f"Cancelling {len(pending)} in-flight tasks at the shutdown deadline"
+            )
+            for task in pending:
+                task.cancel()
+    return await gathered
@@ -0,0 +1,45 @@
+# utils/timestamps.py
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+
+DAY_SECONDS = 86400
+
+_fromisoformat = datetime.fromisoformat
+
+
+@lru_cache(maxsize=65536)
+def parse_epoch(value: str) -> int | None:
+    """
+    Parse an ISO-8601 timestamp to integer epoch seconds (UTC), or None.
+
+    Fast path: the API's UTC form ("...Z", e.g. `toISOString()` output) goes
+    straight to the C parser, which accepts "Z" since Python 3.11, with no
+    string rewriting or offset handling. Other forms fall back to a full
+    parse where naive values are treated as UTC. Results are cached, so
+    repeated strings are parsed once.
+    """
+    if value[-1:] == "Z":
+        try:
+            return int(_fromisoformat(value).timestamp())
+        except ValueError:
+            return None
+    try:
+        dt = _fromisoformat(value)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def to_epoch(value: object) -> int | None:
+    """`parse_epoch` for arbitrary field values: non-strings and "" are None."""
+    if not value or not isinstance(value, str):
+        return None
+    return parse_epoch(value)
+
+
+def cutoff_epoch(days: float, now: float | None = None) -> int:
+    """Epoch seconds `days` before `now` (defaults to the current time)."""
+    return int((time.time() if now is None else now) - days * DAY_SECONDS)